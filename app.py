@@ -1,7 +1,5 @@
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import pandas as pd
-from fpdf import FPDF
 from datetime import datetime, time
 import os
 import uuid
@@ -17,11 +15,22 @@ import pytz
 import time
 import pandas as pd
 
+from resilience import CircuitOpenError
+from storage import ConflictError, get_connection
+from write_queue import append_or_enqueue, get_write_queue
+from delta_sync import get_delta_sync
+from sheet_index import get_attendance_index, patch_attendance
+from reference_data import load_reference_data
+from sales_tables import invoice_lines, log_invoice, patch_sales_lines, read_sales_view
+from invoice_summary import INVOICE_PAGE_SIZE, get_invoice_summary
+from pricing import price_invoice
+from invoice_pdf import InvoiceDocument, render_invoice
+from batch_invoices import invoice_jobs, render_invoices_zip, select_invoices
 
 
 def log_location_history(conn, employee_name, lat, lng):
-    employee_code = Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0]
-    designation = Person[Person['Employee Name'] == employee_name]['Designation'].values[0]
+    employee_code = REFERENCE.employee(employee_name).code
+    designation = REFERENCE.employee(employee_name).designation
     ist = pytz.timezone('Asia/Kolkata')
     now = datetime.now(ist)
     date_str = now.strftime("%d-%m-%Y")
@@ -38,11 +47,8 @@ def log_location_history(conn, employee_name, lat, lng):
         "Google Maps Link": gmaps_link
     }
     try:
-        existing = conn.read(worksheet="LocationHistory", usecols=list(range(len(LOCATION_HISTORY_COLUMNS))), ttl=5)
-        existing = existing.dropna(how="all")
         new_df = pd.DataFrame([entry], columns=LOCATION_HISTORY_COLUMNS)
-        updated = pd.concat([existing, new_df], ignore_index=True)
-        conn.update(worksheet="LocationHistory", data=updated)
+        get_write_queue(conn).enqueue("LocationHistory", new_df)
         return True, None
     except Exception as e:
         return False, str(e)
@@ -150,51 +156,43 @@ def validate_data_before_write(df, expected_columns):
     return True
 
 def backup_sheet(conn, worksheet_name):
-    """Create a timestamped backup of the worksheet"""
+    """Take a full backup of the worksheet and its monthly partitions
+
+    Every write is already recorded as it happens; this only starts a fresh base.
+    """
     try:
-        data = conn.read(worksheet=worksheet_name, ttl=1)
-        timestamp = get_ist_time().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"{worksheet_name}_backup_{timestamp}"
-        conn.update(worksheet=backup_name, data=data)
+        for sheet in conn.partitions(worksheet_name, refresh=True):
+            conn.backup(sheet)
     except Exception as e:
         st.error(f"Warning: Failed to create backup - {str(e)}")
 
-def attempt_data_recovery(conn, worksheet_name):
-    """Attempt to recover from the most recent backup"""
+def attempt_data_recovery(conn, worksheet_name, restore_to=None):
+    """Restore the worksheet as of restore_to (default: the latest backup)"""
     try:
-        # Get list of all worksheets
-        all_sheets = conn.list_worksheets()
-        backups = [s for s in all_sheets if s.startswith(f"{worksheet_name}_backup")]
-        
-        if backups:
-            # Sort backups by timestamp (newest first)
-            backups.sort(reverse=True)
-            latest_backup = backups[0]
-            
-            # Restore from backup
-            backup_data = conn.read(worksheet=latest_backup)
-            conn.update(worksheet=worksheet_name, data=backup_data)
-            return True
+        # Each partition is restored on its own, refused if someone writes to it meanwhile
+        restored = [conn.restore(sheet, restore_to) for sheet in conn.partitions(worksheet_name, refresh=True)]
+        return any(restored)
+    except ConflictError:
+        st.error("Recovery skipped: the sheet was changed by another user")
         return False
     except Exception as e:
         st.error(f"Recovery failed: {str(e)}")
         return False
 
 def safe_sheet_operation(operation, *args, **kwargs):
-    """Wrapper for safe sheet operations with retry logic"""
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            return operation(*args, **kwargs)
-        except Exception as e:
-            if attempt == max_retries - 1:
-                st.error(f"Operation failed after {max_retries} attempts: {str(e)}")
-                if "Sales" in str(args) or "Visits" in str(args) or "Attendance" in str(args):
-                    worksheet_name = [a for a in args if isinstance(a, str) and ("Sales" in a or "Visits" in a or "Attendance" in a)][0]
-                    if attempt_data_recovery(conn, worksheet_name):
-                        st.success("Data recovery attempted from backup")
-                raise
-            time.sleep(1 * (attempt + 1))  # Exponential backoff
+    """Run a sheet operation, reporting failures to the user
+
+    Retries and circuit breaking happen in the storage layer, so nothing sleeps here, and
+    a failure never restores a backup on its own; use attempt_data_recovery deliberately.
+    """
+    try:
+        return operation(*args, **kwargs)
+    except CircuitOpenError as e:
+        st.error(f"Google Sheets is temporarily unavailable: {str(e)}")
+        raise
+    except Exception as e:
+        st.error(f"Operation failed: {str(e)}")
+        raise
 
 # Constants
 SALES_SHEET_COLUMNS = [
@@ -206,6 +204,7 @@ SALES_SHEET_COLUMNS = [
     "Discount Category",
     "Transaction Type",
     "Outlet Name",
+    "GST Number",
     "Outlet Contact",
     "Outlet Address",
     "Outlet State",
@@ -369,30 +368,15 @@ PRIORITY_LEVELS = ["Low", "Medium", "High", "Critical"]
 TRAVEL_MODES = ["Bus", "Train", "Flight", "Taxi", "Other"]
 REQUEST_TYPES = ["Hotel", "Travel", "Travel & Hotel"]
 
-# Establishing a Google Sheets connection
-conn = st.connection("gsheets", type=GSheetsConnection)
-
-# Load data
-Products = pd.read_csv('Invoice - Products.csv')
-Outlet = pd.read_csv('Invoice - Outlet.csv')
-Person = pd.read_csv('Invoice - Person.csv')
-Distributors = pd.read_csv('Invoice - Distributors.csv')
-
-# Company Details with ALLGEN TRADING logo
-company_name = "BIOLUME SKIN SCIENCE PRIVATE LIMITED"
-company_address = """Ground Floor Rampal Awana Complex,
-Rampal Awana Complex, Indra Market,
-Sector-27, Atta, Noida, Gautam Buddha Nagar,
-Uttar Pradesh 201301
-GSTIN/UIN: 09AALCB9426H1ZA
-State Name: Uttar Pradesh, Code: 09
-"""
-company_logo = 'ALLGEN TRADING logo.png'
-bank_details = """
-Disclaimer: This Proforma Invoice is for estimation purposes only and is not a demand for payment. 
-Prices, taxes, and availability are subject to change. Final billing may vary. 
-Goods/services will be delivered only after confirmation and payment. No legal obligation is created by this document.
-"""
+# Establishing the storage connection (Google Sheets unless configured otherwise)
+conn = get_connection()
+
+# Load data (indexed once per process for keyed lookups)
+REFERENCE = load_reference_data()
+Products = REFERENCE.products
+Outlet = REFERENCE.outlets
+Person = REFERENCE.persons
+Distributors = REFERENCE.distributors
 
 # Create directories for storing uploads
 os.makedirs("employee_selfies", exist_ok=True)
@@ -400,25 +384,6 @@ os.makedirs("payment_receipts", exist_ok=True)
 os.makedirs("invoices", exist_ok=True)
 os.makedirs("visit_selfies", exist_ok=True)
 
-# Custom PDF class
-class PDF(FPDF):
-    def header(self):
-        if company_logo:
-            try:
-                self.image(company_logo, 10, 8, 33)
-            except:
-                pass
-        
-        self.set_font('Arial', 'B', 16)
-        self.cell(0, 10, company_name, ln=True, align='C')
-        self.set_font('Arial', '', 10)
-        self.multi_cell(0, 5, company_address, align='C')
-        
-        self.set_font('Arial', 'B', 14)
-        self.cell(0, 10, 'Proforma Invoice', ln=True, align='C')
-        self.line(10, 50, 200, 50)
-        self.ln(1)
-
 def generate_invoice_number():
     return f"INV-{get_ist_time().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
 
@@ -456,18 +421,18 @@ def demo_page():
         st.subheader("Partner Employee")
         partner_employee = st.selectbox(
             "Select Partner Employee",
-            [n for n in Person['Employee Name'] if n != selected_employee],
+            [n for n in REFERENCE.employee_names if n != selected_employee],
             key="partner_employee"
         )
 
         st.subheader("Outlet Details")
         outlet_option = st.radio("Outlet Selection", ["Enter manually", "Select from list"], key="demo_outlet_option")
         if outlet_option == "Select from list":
-            outlet_names = Outlet['Shop Name'].tolist()
+            outlet_names = REFERENCE.outlet_names
             selected_outlet = st.selectbox("Select Outlet", outlet_names, key="demo_outlet_select")
-            od = Outlet[Outlet['Shop Name'] == selected_outlet].iloc[0]
-            outlet_name, outlet_contact = selected_outlet, od['Contact']
-            outlet_address, outlet_state, outlet_city = od['Address'], od['State'], od['City']
+            od = REFERENCE.outlet(selected_outlet)
+            outlet_name, outlet_contact = selected_outlet, od.contact
+            outlet_address, outlet_state, outlet_city = od.address, od.state, od.city
             st.text_input("Contact", value=outlet_contact, disabled=True, key="demo_outlet_contact_display")
             st.text_input("Address", value=outlet_address, disabled=True, key="demo_outlet_address_display")
             st.text_input("State", value=outlet_state, disabled=True, key="demo_outlet_state_display")
@@ -492,7 +457,7 @@ def demo_page():
             check_out_time = st.time_input("Check-out Time", value=None, key="demo_check_out_time")
 
         st.subheader("Products Demonstrated")
-        product_names      = Products['Product Name'].tolist()
+        product_names      = REFERENCE.product_names
         selected_products  = st.multiselect("Select Products Demonstrated", product_names, key="demo_product_selection")
         quantities         = []
         if selected_products:
@@ -515,10 +480,10 @@ def demo_page():
                 demo_data = {
                     "Demo ID": demo_id,
                     "Employee Name": selected_employee,
-                    "Employee Code": Person.loc[Person['Employee Name']==selected_employee,'Employee Code'].iat[0],
-                    "Designation": Person.loc[Person['Employee Name']==selected_employee,'Designation'].iat[0],
+                    "Employee Code": REFERENCE.employee(selected_employee).code,
+                    "Designation": REFERENCE.employee(selected_employee).designation,
                     "Partner Employee": partner_employee,
-                    "Partner Employee Code": Person.loc[Person['Employee Name']==partner_employee,'Employee Code'].iat[0],
+                    "Partner Employee Code": REFERENCE.employee(partner_employee).code,
                     "Outlet Name": outlet_name,
                     "Outlet Contact": outlet_contact,
                     "Outlet Address": outlet_address,
@@ -537,9 +502,8 @@ def demo_page():
                 }
 
                 try:
-                    existing = conn.read(worksheet="Demos", usecols=list(range(len(DEMO_SHEET_COLUMNS))), ttl=5).dropna(how="all")
                     df_new   = pd.DataFrame([demo_data], columns=DEMO_SHEET_COLUMNS)
-                    conn.update(worksheet="Demos", data=pd.concat([existing, df_new], ignore_index=True))
+                    append_or_enqueue(conn, "Demos", df_new)
                     st.success(f"Demo {demo_id} recorded successfully!")
                     st.balloons()
                 except Exception as e:
@@ -551,15 +515,14 @@ def demo_page():
     with tab2:
         st.subheader("Demo History")
 
-        @st.cache_data(ttl=300)
         def load_demo_data():
             try:
-                df = conn.read(worksheet="Demos", usecols=list(range(len(DEMO_SHEET_COLUMNS))), ttl=5)
+                df = get_delta_sync(conn, "Demos").read().reindex(columns=DEMO_SHEET_COLUMNS)
                 df = df.dropna(how="all")
                 # parse dates & cast duration to float
                 df['Demo Date']         = pd.to_datetime(df['Demo Date'], dayfirst=True, errors='coerce')
                 df['Duration (minutes)']= pd.to_numeric(df['Duration (minutes)'], errors='coerce')
-                code = Person.loc[Person['Employee Name']==selected_employee,'Employee Code'].iat[0]
+                code = REFERENCE.employee(selected_employee).code
                 return df[df['Employee Code']==code].sort_values('Demo Date', ascending=False)
             except Exception as e:
                 st.error(f"Error loading demo data: {e}")
@@ -644,8 +607,8 @@ def support_ticket_page():
     hourly_location_auto_log(conn, st.session_state.employee_name)
     st.title("Support Ticket Management")
     selected_employee = st.session_state.employee_name
-    employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
-    designation = Person[Person['Employee Name'] == selected_employee]['Designation'].values[0]
+    employee_code = REFERENCE.employee(selected_employee).code
+    designation = REFERENCE.employee(selected_employee).designation
     
     tab1, tab2 = st.tabs(["Raise New Ticket", "My Support Requests"])
     
@@ -750,7 +713,7 @@ def support_ticket_page():
     with tab2:
         st.subheader("My Support Tickets")
         try:
-            tickets_data = conn.read(worksheet="Tickets", usecols=list(range(len(TICKET_SHEET_COLUMNS))), ttl=5)
+            tickets_data = get_delta_sync(conn, "Tickets").read().reindex(columns=TICKET_SHEET_COLUMNS)
             tickets_data = tickets_data.dropna(how="all")
             
             if not tickets_data.empty:
@@ -852,8 +815,8 @@ def travel_hotel_page():
     hourly_location_auto_log(conn, st.session_state.employee_name)
     st.title("Travel & Hotel Booking")
     selected_employee = st.session_state.employee_name
-    employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
-    designation = Person[Person['Employee Name'] == selected_employee]['Designation'].values[0]
+    employee_code = REFERENCE.employee(selected_employee).code
+    designation = REFERENCE.employee(selected_employee).designation
     
     tab1, tab2, tab3 = st.tabs(["Travel Request", "Hotel Booking Request", "My Booking Requests"])
     
@@ -1047,7 +1010,7 @@ def travel_hotel_page():
     with tab3:
         st.subheader("My Travel & Hotel Requests")
         try:
-            requests_data = conn.read(worksheet="TravelHotelRequests", usecols=list(range(len(TRAVEL_HOTEL_COLUMNS))), ttl=5)
+            requests_data = get_delta_sync(conn, "TravelHotelRequests").read().reindex(columns=TRAVEL_HOTEL_COLUMNS)
             requests_data = requests_data.dropna(how="all")
             
             if not requests_data.empty:
@@ -1146,88 +1109,63 @@ def travel_hotel_page():
 
 def log_ticket_to_gsheet(conn, ticket_data):
     try:
-        existing_data = conn.read(worksheet="Tickets", usecols=list(range(len(TICKET_SHEET_COLUMNS))), ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        updated_data = pd.concat([existing_data, ticket_data], ignore_index=True)
-        conn.update(worksheet="Tickets", data=updated_data)
+        append_or_enqueue(conn, "Tickets", ticket_data, columns=TICKET_SHEET_COLUMNS)
         return True, None
     except Exception as e:
         return False, str(e)
 
 def log_travel_hotel_request(conn, request_data):
     try:
-        existing_data = conn.read(worksheet="TravelHotelRequests", usecols=list(range(len(TRAVEL_HOTEL_COLUMNS))), ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        updated_data = pd.concat([existing_data, request_data], ignore_index=True)
-        conn.update(worksheet="TravelHotelRequests", data=updated_data)
+        append_or_enqueue(conn, "TravelHotelRequests", request_data, columns=TRAVEL_HOTEL_COLUMNS)
         return True, None
     except Exception as e:
         return False, str(e)
 
 def log_sales_to_gsheet(conn, sales_data):
     try:
-        # Read all existing data first
-        existing_sales_data = conn.read(worksheet="Sales", ttl=5)
-        existing_sales_data = existing_sales_data.dropna(how="all")
-        
         # Ensure columns match (in case sheet structure changes)
         sales_data = sales_data.reindex(columns=SALES_SHEET_COLUMNS)
         
-        # Concatenate and drop any potential duplicates
-        updated_sales_data = pd.concat([existing_sales_data, sales_data], ignore_index=True)
-        updated_sales_data = updated_sales_data.drop_duplicates(subset=["Invoice Number", "Product Name"], keep="last")
+        # Drop any potential duplicates within the new invoice
+        sales_data = sales_data.drop_duplicates(subset=["Invoice Number", "Product Name"], keep="last")
         
-        # Write back all data
-        conn.update(worksheet="Sales", data=updated_sales_data)
-        st.success("Sales data successfully logged to Google Sheets!")
+        # One header row plus the line items, instead of repeating the header on every line
+        log_invoice(conn, sales_data)
+        st.success("Sales data recorded and queued for Google Sheets!")
     except Exception as e:
         st.error(f"Error logging sales data: {e}")
         st.stop()
 
 def update_delivery_status(conn, invoice_number, product_name, new_status):
     try:
-        # Read all existing data
-        sales_data = conn.read(worksheet="Sales", ttl=5)
-        sales_data = sales_data.dropna(how="all")
-        
-        # Update the delivery status for the specific record
-        mask = (sales_data['Invoice Number'] == invoice_number) & (sales_data['Product Name'] == product_name)
-        sales_data.loc[mask, 'Delivery Status'] = new_status
-        
-        # Write back the updated data
-        conn.update(worksheet="Sales", data=sales_data)
-        return True
+        # Update only the Delivery Status cells of this invoice line
+        success, error = patch_sales_lines(
+            conn, invoice_number, {"Delivery Status": new_status}, product_name=product_name
+        )
+        if not success:
+            st.error(f"Error updating delivery status: {error}")
+        return success
     except Exception as e:
         st.error(f"Error updating delivery status: {e}")
         return False
 
 def log_visit_to_gsheet(conn, visit_data):
     try:
-        existing_visit_data = conn.read(worksheet="Visits", ttl=5)
-        existing_visit_data = existing_visit_data.dropna(how="all")
-        
         visit_data = visit_data.reindex(columns=VISIT_SHEET_COLUMNS)
+        visit_data = visit_data.drop_duplicates(subset=["Visit ID"], keep="last")
         
-        updated_visit_data = pd.concat([existing_visit_data, visit_data], ignore_index=True)
-        updated_visit_data = updated_visit_data.drop_duplicates(subset=["Visit ID"], keep="last")
-        
-        conn.update(worksheet="Visits", data=updated_visit_data)
-        st.success("Visit data successfully logged to Google Sheets!")
+        get_write_queue(conn).enqueue("Visits", visit_data)
+        st.success("Visit data recorded and queued for Google Sheets!")
     except Exception as e:
         st.error(f"Error logging visit data: {e}")
         st.stop()
 
 def log_attendance_to_gsheet(conn, attendance_data):
     try:
-        existing_data = conn.read(worksheet="Attendance", ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        
         attendance_data = attendance_data.reindex(columns=ATTENDANCE_SHEET_COLUMNS)
+        attendance_data = attendance_data.drop_duplicates(subset=["Attendance ID"], keep="last")
         
-        updated_data = pd.concat([existing_data, attendance_data], ignore_index=True)
-        updated_data = updated_data.drop_duplicates(subset=["Attendance ID"], keep="last")
-        
-        conn.update(worksheet="Attendance", data=updated_data)
+        get_write_queue(conn).enqueue("Attendance", attendance_data)
         return True, None
     except Exception as e:
         return False, str(e)
@@ -1236,190 +1174,73 @@ def log_attendance_to_gsheet(conn, attendance_data):
 def generate_invoice(customer_name, gst_number, contact_number, address, state, city, selected_products, quantities, product_discounts,
                     discount_category, employee_name, payment_status, amount_paid, employee_selfie_path, payment_receipt_path, invoice_number,
                     transaction_type, distributor_firm_name="", distributor_id="", distributor_contact_person="",
-                    distributor_contact_number="", distributor_email="", distributor_territory="", remarks="", invoice_date=None):
-    pdf = PDF()
-    pdf.alias_nb_pages()
-    pdf.add_page()
+                    distributor_contact_number="", distributor_email="", distributor_territory="", remarks="", invoice_date=None,
+                    pricing=None):
     current_date = invoice_date if invoice_date else get_ist_time().strftime("%d-%m-%Y")  # Use provided date or current date
 
-
-    # Transaction Type
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, f"Transaction Type: {transaction_type.upper()}", ln=True)
-    
-    # Sales Person
-    pdf.ln(0)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(0, 10, f"Sales Person: {employee_name}", ln=True, align='L')
-    
-    # Distributor details if available
-    if distributor_firm_name:
-        pdf.cell(0, 10, f"Distributor: {distributor_firm_name} ({distributor_id})", ln=True, align='L')
-        pdf.cell(0, 10, f"Contact: {distributor_contact_person} | {distributor_contact_number}", ln=True, align='L')
-        pdf.cell(0, 10, f"Territory: {distributor_territory}", ln=True, align='L')
-    
-    pdf.ln(5)
-
-    # Customer details
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Bill To:", ln=True)
-    pdf.set_font("Arial", '', 10)
-    pdf.cell(100, 6, f"Name: {customer_name}")
-    pdf.cell(90, 6, f"Date: {current_date}", ln=True, align='R')
-    pdf.cell(100, 6, f"GSTIN/UN: {gst_number}")
-    pdf.cell(90, 6, f"Contact: {contact_number}", ln=True, align='R')
-    pdf.cell(100, 6, "Address: ", ln=True)
-    pdf.multi_cell(0, 6, address)
-    pdf.ln(1)
-    
-    # Invoice number
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(0, 10, f"Invoice Number: {invoice_number}", ln=True)
-    pdf.ln(5)
+    # Every line priced in one pass (the preview's result when sales_page passes it in)
+    if pricing is None:
+        pricing = price_invoice(REFERENCE.prices, selected_products, quantities, product_discounts, discount_category)
+
+    # Only the invoice's own content is laid out; the header and logo come from the process's template
+    document = InvoiceDocument(
+        invoice_number, current_date, transaction_type, employee_name, customer_name, gst_number,
+        contact_number, address, list(selected_products), list(quantities), list(product_discounts),
+        payment_status, amount_paid, distributor_firm_name, distributor_id, distributor_contact_person,
+        distributor_contact_number, distributor_territory
+    )
+    pdf = render_invoice(document, pricing)
     
-    # Table header
-    pdf.set_fill_color(200, 220, 255)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(10, 10, "S.No", border=1, align='C', fill=True)
-    pdf.cell(70, 10, "Product Name", border=1, align='C', fill=True)
-    pdf.cell(20, 10, "HSN/SAC", border=1, align='C', fill=True)
-    pdf.cell(20, 10, "Qty", border=1, align='C', fill=True)
-    pdf.cell(25, 10, "Rate (INR)", border=1, align='C', fill=True)
-    pdf.cell(25, 10, "Discount (%)", border=1, align='C', fill=True)
-    pdf.cell(25, 10, "Amount (INR)", border=1, align='C', fill=True)
-    pdf.ln()
-
-    # Table rows
-    pdf.set_font('Arial', '', 10)
-    sales_data = []
-    tax_rate = 0.18  # 18% GST
-    
-    # Calculate subtotal with product discounts
-    subtotal = 0
-    for idx, (product, quantity, prod_discount) in enumerate(zip(selected_products, quantities, product_discounts)):
-        product_data = Products[Products['Product Name'] == product].iloc[0]
-        
-        if discount_category in product_data:
-            unit_price = float(product_data[discount_category])
-        else:
-            unit_price = float(product_data['Price'])
-        
-        # Apply product discount
-        discounted_unit_price = unit_price * (1 - prod_discount/100)
-        item_total = discounted_unit_price * quantity
-        subtotal += item_total
-        
-        pdf.cell(10, 8, str(idx + 1), border=1)
-        pdf.cell(70, 8, product, border=1)
-        pdf.cell(20, 8, "3304", border=1, align='C')
-        pdf.cell(20, 8, str(quantity), border=1, align='C')
-        pdf.cell(25, 8, f"{unit_price:.2f}", border=1, align='R')
-        pdf.cell(25, 8, f"{prod_discount:.2f}%", border=1, align='R')
-        pdf.cell(25, 8, f"{item_total:.2f}", border=1, align='R')
-        pdf.ln()
-
-    # Calculate taxes
-    tax_amount = subtotal * tax_rate
-    cgst_amount = tax_amount / 2
-    sgst_amount = tax_amount / 2
-    grand_total = subtotal + tax_amount
-
-    # Display totals
-    pdf.ln(10)
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(160, 10, "Subtotal", border=0, align='R')
-    pdf.cell(30, 10, f"{subtotal:.2f}", border=1, align='R')
-    pdf.ln()
-    
-    pdf.cell(160, 10, "Taxable Amount", border=0, align='R')
-    pdf.cell(30, 10, f"{subtotal:.2f}", border=1, align='R')
-    pdf.ln()
-    
-    pdf.cell(160, 10, "CGST (9%)", border=0, align='R')
-    pdf.cell(30, 10, f"{cgst_amount:.2f}", border=1, align='R')
-    pdf.ln()
-    
-    pdf.cell(160, 10, "SGST (9%)", border=0, align='R')
-    pdf.cell(30, 10, f"{sgst_amount:.2f}", border=1, align='R')
-    pdf.ln()
-    
-    pdf.cell(160, 10, "Grand Total", border=0, align='R')
-    pdf.cell(30, 10, f"{grand_total:.2f} INR", border=1, align='R', fill=True)
-    pdf.ln(10)
-    
-    # Payment Status
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, f"Payment Status: {payment_status.upper()}", ln=True)
-    if payment_status == "paid":
-        pdf.cell(0, 10, f"Amount Paid: {amount_paid} INR", ln=True)
-    pdf.ln(10)
-    
-    # Details
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Details:", ln=True)
-    pdf.set_font("Arial", '', 10)
-    pdf.multi_cell(0, 5, bank_details)
-    
-    # Prepare sales data for logging
-    for idx, (product, quantity, prod_discount) in enumerate(zip(selected_products, quantities, product_discounts)):
-        product_data = Products[Products['Product Name'] == product].iloc[0]
-        
-        if discount_category in product_data:
-            unit_price = float(product_data[discount_category])
-        else:
-            unit_price = float(product_data['Price'])
-            
-        # Apply product discount
-        discounted_unit_price = unit_price * (1 - prod_discount/100)
-        item_total = discounted_unit_price * quantity
-        
-        sales_data.append({
-            "Invoice Number": invoice_number,
-            "Invoice Date": current_date,
-            "Employee Name": employee_name,
-            "Employee Code": Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0],
-            "Designation": Person[Person['Employee Name'] == employee_name]['Designation'].values[0],
-            "Discount Category": discount_category,
-            "Transaction Type": transaction_type,
-            "Outlet Name": customer_name,
-            "Outlet Contact": contact_number,
-            "Outlet Address": address,
-            "Outlet State": state,
-            "Outlet City": city,
-            "Distributor Firm Name": distributor_firm_name,
-            "Distributor ID": distributor_id,
-            "Distributor Contact Person": distributor_contact_person,
-            "Distributor Contact Number": distributor_contact_number,
-            "Distributor Email": distributor_email,
-            "Distributor Territory": distributor_territory,
-            "Product ID": product_data['Product ID'],
-            "Product Name": product,
-            "Product Category": product_data['Product Category'],
-            "Quantity": quantity,
-            "Unit Price": unit_price,
-            "Product Discount (%)": prod_discount,
-            "Discounted Unit Price": discounted_unit_price,
-            "Total Price": item_total,
-            "GST Rate": "18%",
-            "CGST Amount": (item_total * tax_rate) / 2,
-            "SGST Amount": (item_total * tax_rate) / 2,
-            "Grand Total": item_total + (item_total * tax_rate),
-            "Payment Status": payment_status,
-            "Amount Paid": amount_paid if payment_status == "paid" else 0,
-            "Payment Receipt Path": payment_receipt_path if payment_status == "paid" else "",
-            "Employee Selfie Path": employee_selfie_path,
-            "Invoice PDF Path": f"invoices/{invoice_number}.pdf",
-            "Remarks": remarks,
-            "Delivery Status": "pending"  # Default status is pending
-        })
+    # Prepare sales data for logging: one row per line, built column-wise from the pricing arrays
+    employee = REFERENCE.employee(employee_name)
+    products = [REFERENCE.product(product) for product in selected_products]
+    sales_data = pd.DataFrame({
+        "Invoice Number": invoice_number,
+        "Invoice Date": current_date,
+        "Employee Name": employee_name,
+        "Employee Code": employee.code,
+        "Designation": employee.designation,
+        "Discount Category": discount_category,
+        "Transaction Type": transaction_type,
+        "Outlet Name": customer_name,
+        "GST Number": gst_number,
+        "Outlet Contact": contact_number,
+        "Outlet Address": address,
+        "Outlet State": state,
+        "Outlet City": city,
+        "Distributor Firm Name": distributor_firm_name,
+        "Distributor ID": distributor_id,
+        "Distributor Contact Person": distributor_contact_person,
+        "Distributor Contact Number": distributor_contact_number,
+        "Distributor Email": distributor_email,
+        "Distributor Territory": distributor_territory,
+        "Product ID": [product.product_id for product in products],
+        "Product Name": list(selected_products),
+        "Product Category": [product.category for product in products],
+        "Quantity": list(quantities),
+        "Unit Price": pricing.unit_price,
+        "Product Discount (%)": list(product_discounts),
+        "Discounted Unit Price": pricing.discounted_unit_price,
+        "Total Price": pricing.line_total,
+        "GST Rate": "18%",
+        "CGST Amount": pricing.cgst,
+        "SGST Amount": pricing.sgst,
+        "Grand Total": pricing.grand_total,
+        "Payment Status": payment_status,
+        "Amount Paid": amount_paid if payment_status == "paid" else 0,
+        "Payment Receipt Path": payment_receipt_path if payment_status == "paid" else "",
+        "Employee Selfie Path": employee_selfie_path,
+        "Invoice PDF Path": f"invoices/{invoice_number}.pdf",
+        "Remarks": remarks,
+        "Delivery Status": "pending"  # Default status is pending
+    })
 
     # Save the PDF
     pdf_path = f"invoices/{invoice_number}.pdf"
     pdf.output(pdf_path)
     
     # Log sales data to Google Sheets
-    sales_df = pd.DataFrame(sales_data)
-    log_sales_to_gsheet(conn, sales_df)
+    log_sales_to_gsheet(conn, sales_data)
 
     return pdf, pdf_path
 
@@ -1433,8 +1254,8 @@ def record_visit(employee_name, outlet_name, outlet_contact, outlet_address, out
     visit_data = {
         "Visit ID": visit_id,
         "Employee Name": employee_name,
-        "Employee Code": Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0],
-        "Designation": Person[Person['Employee Name'] == employee_name]['Designation'].values[0],
+        "Employee Code": REFERENCE.employee(employee_name).code,
+        "Designation": REFERENCE.employee(employee_name).designation,
         "Outlet Name": outlet_name,
         "Outlet Contact": outlet_contact,
         "Outlet Address": outlet_address,
@@ -1458,8 +1279,8 @@ def record_visit(employee_name, outlet_name, outlet_contact, outlet_address, out
 
 def record_attendance(employee_name, status, location_link="", leave_reason=""):
     try:
-        employee_code = Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0]
-        designation = Person[Person['Employee Name'] == employee_name]['Designation'].values[0]
+        employee_code = REFERENCE.employee(employee_name).code
+        designation = REFERENCE.employee(employee_name).designation
         current_date = get_ist_time().strftime("%d-%m-%Y")
         current_datetime = get_ist_time().strftime("%d-%m-%Y %H:%M:%S")
         check_in_time = get_ist_time().strftime("%H:%M:%S")
@@ -1487,6 +1308,7 @@ def record_attendance(employee_name, status, location_link="", leave_reason=""):
         success, error = log_attendance_to_gsheet(conn, attendance_df)
         
         if success:
+            get_attendance_index(conn).record_check_in(attendance_data)
             return attendance_id, None
         else:
             return None, error
@@ -1496,21 +1318,10 @@ def record_attendance(employee_name, status, location_link="", leave_reason=""):
 
 def check_existing_attendance(employee_name):
     try:
-        existing_data = conn.read(worksheet="Attendance", usecols=list(range(len(ATTENDANCE_SHEET_COLUMNS))), ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        
-        if existing_data.empty:
-            return False
-        
         current_date = get_ist_time().strftime("%d-%m-%Y")
-        employee_code = Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0]
-        
-        existing_records = existing_data[
-            (existing_data['Employee Code'] == employee_code) & 
-            (existing_data['Date'] == current_date)
-        ]
+        employee_code = REFERENCE.employee(employee_name).code
         
-        return not existing_records.empty
+        return get_attendance_index(conn).confirm(current_date, employee_code, get_write_queue(conn)) is not None
         
     except Exception as e:
         st.error(f"Error checking existing attendance: {str(e)}")
@@ -1518,7 +1329,7 @@ def check_existing_attendance(employee_name):
 
 def authenticate_employee(employee_name, passkey):
     try:
-        employee_code = Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0]
+        employee_code = REFERENCE.employee(employee_name).code
         return str(passkey) == str(employee_code)
     except:
         return False
@@ -1530,26 +1341,16 @@ def checkout_page():
 
     # Check if user has checked in today
     try:
-        existing_data = conn.read(worksheet="Attendance", usecols=list(range(len(ATTENDANCE_SHEET_COLUMNS))), ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        
-        if existing_data.empty:
-            st.error("Please check in first before checking out")
-            return
-        
         current_date = get_ist_time().strftime("%d-%m-%Y")
-        employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
+        employee_code = REFERENCE.employee(selected_employee).code
         
-        checkin_records = existing_data[
-            (existing_data['Employee Code'] == employee_code) & 
-            (existing_data['Date'] == current_date)
-        ]
+        checkin_record = get_attendance_index(conn).confirm(current_date, employee_code, get_write_queue(conn))
         
-        if checkin_records.empty:
+        if checkin_record is None:
             st.error("Please check in first before checking out")
             return
             
-        if 'Check-out Time' in checkin_records.columns and not checkin_records['Check-out Time'].isna().all():
+        if checkin_record["Check-out Time"]:
             st.warning("You have already checked out for today")
             return
     except Exception as e:
@@ -1587,35 +1388,28 @@ def checkout_page():
     if lat and lng and st.button("Check Out", key="checkout_button"):
         with st.spinner("Recording checkout..."):
             try:
-                # Update the existing attendance record
-                existing_data = conn.read(worksheet="Attendance", ttl=5)
-                existing_data = existing_data.dropna(how="all")
-                
                 current_date = get_ist_time().strftime("%d-%m-%Y")
-                employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
+                employee_code = REFERENCE.employee(selected_employee).code
                 
-                # Find the record to update
-                mask = (
-                    (existing_data['Employee Code'] == employee_code) & 
-                    (existing_data['Date'] == current_date)
-                )
-                
-                if not mask.any():
-                    st.error("No check-in record found for today")
-                    return
-                
-                # Update the record
-                existing_data.loc[mask, 'Check-out Time'] = get_ist_time().strftime("%H:%M:%S")
-                existing_data.loc[mask, 'Check-out Location Link'] = gmaps_link
+                checkout_values = {
+                    "Check-out Time": get_ist_time().strftime("%H:%M:%S"),
+                    "Check-out Location Link": gmaps_link,
+                }
                 
                 # Calculate duration
-                checkin_time = pd.to_datetime(existing_data.loc[mask, 'Check-in Time'].iloc[0])
-                checkout_time = pd.to_datetime(get_ist_time().strftime("%H:%M:%S"))
+                checkin_time = pd.to_datetime(checkin_record['Check-in Time'])
+                checkout_time = pd.to_datetime(checkout_values["Check-out Time"])
                 duration = (checkout_time - checkin_time).total_seconds() / 3600  # in hours
-                existing_data.loc[mask, 'Duration (hours)'] = round(duration, 2)
+                checkout_values["Duration (hours)"] = round(duration, 2)
                 
-                # Write back to sheet
-                conn.update(worksheet="Attendance", data=existing_data)
+                # Patch only the checkout cells of today's row
+                success, error = patch_attendance(
+                    conn, get_attendance_index(conn), get_write_queue(conn),
+                    current_date, employee_code, checkout_values
+                )
+                if not success:
+                    st.error(error)
+                    return
                 st.success("Checkout recorded successfully!")
                 st.balloons()
             except Exception as e:
@@ -1695,7 +1489,7 @@ def main():
         # Display the centered logo and heading
         display_login_header()
 
-        employee_names = Person['Employee Name'].tolist()
+        employee_names = REFERENCE.employee_names
 
         # Create centered form
         form_col1, form_col2, form_col3 = st.columns([1, 2, 1])
@@ -1802,7 +1596,7 @@ def sales_page():
     tab1, tab2 = st.tabs(["New Sale", "Sales History"])
     
     with tab1:
-        discount_category = Person[Person['Employee Name'] == selected_employee]['Discount Category'].values[0]
+        discount_category = REFERENCE.employee(selected_employee).discount_category
     
         st.subheader("Transaction Details")
         transaction_type = st.selectbox(
@@ -1811,8 +1605,28 @@ def sales_page():
             key="transaction_type"
         )
     
+        with st.expander(f"📋 Price List ({discount_category or 'list price'})"):
+            # Every product priced for this employee's category in one lookup
+            price_list = REFERENCE.prices.quote(discount_category)
+            st.dataframe(
+                price_list,
+                column_config={
+                    "List Price": st.column_config.NumberColumn(format="₹%.2f"),
+                    "Unit Price": st.column_config.NumberColumn(format="₹%.2f")
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+            st.download_button(
+                "Download Price List",
+                price_list.to_csv(index=False),
+                f"price_list_{discount_category or 'list'}.csv",
+                "text/csv",
+                key="download-price-list"
+            )
+        
         st.subheader("Product Details")
-        product_names     = Products['Product Name'].tolist()
+        product_names     = REFERENCE.product_names
         selected_products = st.multiselect(
             "Select Products",
             product_names,
@@ -1821,6 +1635,7 @@ def sales_page():
     
         quantities = []
         product_discounts = []
+        pricing = None
     
         if selected_products:
             st.markdown("### Product Prices & Discounts")
@@ -1834,11 +1649,8 @@ def sales_page():
             with price_cols[3]:
                 st.markdown("**Quantity**")
     
-            subtotal = 0.0
-            for product in selected_products:
-                product_data = Products[Products['Product Name'] == product].iloc[0]
-                unit_price = float(product_data.get(discount_category, product_data['Price']))
-    
+            unit_prices = REFERENCE.prices.unit_prices(selected_products, discount_category)
+            for product, unit_price in zip(selected_products, unit_prices):
                 cols = st.columns(4)
                 with cols[0]:
                     st.text(product)
@@ -1873,16 +1685,13 @@ def sales_page():
                         qty = 1
                     quantities.append(qty)
     
-                # accumulate subtotal
-                subtotal += unit_price * (1 - prod_discount / 100) * qty
-    
-            # Final amount calculation
+            # Final amount calculation, reused by generate_invoice for the PDF and the sheet
+            pricing = price_invoice(REFERENCE.prices, selected_products, quantities, product_discounts, discount_category)
             st.markdown("---")
             st.markdown("### Final Amount Calculation")
-            st.markdown(f"Subtotal: ₹{subtotal:.2f}")
-            tax_amount = subtotal * 0.18
-            st.markdown(f"GST (18%): ₹{tax_amount:.2f}")
-            st.markdown(f"**Grand Total: ₹{subtotal + tax_amount:.2f}**")
+            st.markdown(f"Subtotal: ₹{pricing.subtotal:.2f}")
+            st.markdown(f"GST (18%): ₹{pricing.tax_total:.2f}")
+            st.markdown(f"**Grand Total: ₹{pricing.invoice_total:.2f}**")
     
         st.subheader("Payment Details")
         payment_status = st.selectbox("Payment Status", ["pending", "paid"], key="payment_status")
@@ -1902,15 +1711,15 @@ def sales_page():
         distributor_contact_number = distributor_email = distributor_territory = ""
     
         if distributor_option == "Select from list":
-            distributor_names = Distributors['Firm Name'].tolist()
+            distributor_names = REFERENCE.distributor_names
             selected_distributor = st.selectbox("Select Distributor", distributor_names, key="distributor_select")
-            dd = Distributors[Distributors['Firm Name'] == selected_distributor].iloc[0]
+            dd = REFERENCE.distributor(selected_distributor)
             distributor_firm_name      = selected_distributor
-            distributor_id             = dd['Distributor ID']
-            distributor_contact_person = dd['Contact Person']
-            distributor_contact_number = dd['Contact Number']
-            distributor_email          = dd['Email ID']
-            distributor_territory      = dd['Territory']
+            distributor_id             = dd.distributor_id
+            distributor_contact_person = dd.contact_person
+            distributor_contact_number = dd.contact_number
+            distributor_email          = dd.email
+            distributor_territory      = dd.territory
     
             st.text_input("Distributor ID", value=distributor_id, disabled=True, key="distributor_id_display")
             st.text_input("Contact Person", value=distributor_contact_person, disabled=True, key="distributor_contact_person_display")
@@ -1921,12 +1730,12 @@ def sales_page():
         st.subheader("Outlet Details")
         outlet_option = st.radio("Outlet Selection", ["Enter manually", "Select from list"], key="outlet_option")
         if outlet_option == "Select from list":
-            outlet_names = Outlet['Shop Name'].tolist()
+            outlet_names = REFERENCE.outlet_names
             chosen_outlet = st.selectbox("Select Outlet", outlet_names, key="outlet_select")
-            od = Outlet[Outlet['Shop Name'] == chosen_outlet].iloc[0]
-            customer_name, gst_number = chosen_outlet, od['GST']
-            contact_number, address = od['Contact'], od['Address']
-            state, city = od['State'], od['City']
+            od = REFERENCE.outlet(chosen_outlet)
+            customer_name, gst_number = chosen_outlet, od.gst
+            contact_number, address = od.contact, od.address
+            state, city = od.state, od.city
     
             st.text_input("GST Number", value=gst_number, disabled=True, key="outlet_gst_display")
             st.text_input("Contact Number", value=contact_number, disabled=True, key="outlet_contact_display")
@@ -1952,6 +1761,7 @@ def sales_page():
                     distributor_firm_name, distributor_id, distributor_contact_person,
                     distributor_contact_number, distributor_email, distributor_territory,
                     "",  # remarks
+                    pricing=pricing,
                 )
                 with open(pdf_path, "rb") as f:
                     st.download_button(
@@ -1970,48 +1780,6 @@ def sales_page():
     with tab2:
         st.subheader("Your Sales History")
         
-        @st.cache_data(ttl=300)
-        def load_sales_data():
-            try:
-                sales_data = conn.read(worksheet="Sales", ttl=5)
-                sales_data = sales_data.dropna(how='all')
-                
-                # Convert columns to proper types
-                sales_data = sales_data.copy()
-                sales_data['Outlet Name'] = sales_data['Outlet Name'].astype(str)
-                sales_data['Invoice Number'] = sales_data['Invoice Number'].astype(str)
-                
-                # Convert Invoice Date properly
-                try:
-                    sales_data['Invoice Date'] = pd.to_datetime(sales_data['Invoice Date'], dayfirst=True, errors='coerce')
-                except:
-                    # Fallback if date parsing fails
-                    sales_data['Invoice Date'] = pd.to_datetime(sales_data['Invoice Date'], errors='coerce')
-                
-                # Convert numeric columns properly
-                numeric_cols = ['Grand Total', 'Unit Price', 'Total Price', 'Product Discount (%)', 'Quantity']
-                for col in numeric_cols:
-                    if col in sales_data.columns:
-                        sales_data[col] = pd.to_numeric(sales_data[col], errors='coerce')
-                
-                # Filter for current employee
-                employee_code = Person[Person['Employee Name'] == st.session_state.employee_name]['Employee Code'].values[0]
-                filtered_data = sales_data[sales_data['Employee Code'] == employee_code]
-                
-                # Ensure we have valid dates
-                filtered_data = filtered_data[filtered_data['Invoice Date'].notna()]
-                
-                return filtered_data
-            except Exception as e:
-                st.error(f"Error loading sales data: {e}")
-                return pd.DataFrame()
-    
-        sales_data = load_sales_data()
-        
-        if sales_data.empty:
-            st.warning("No sales records found for your account")
-            return
-            
         with st.expander("🔍 Search Filters", expanded=True):
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -2024,42 +1792,72 @@ def sales_page():
             if st.button("Apply Filters", key="search_sales_button"):
                 st.rerun()
         
-        filtered_data = sales_data.copy()
-        
-        # Apply filters
-        if invoice_number_search:
-            filtered_data = filtered_data[
-                filtered_data['Invoice Number'].str.contains(invoice_number_search, case=False, na=False)
-            ]
+        with st.expander("🖨️ Batch Reprint"):
+            col1, col2 = st.columns(2)
+            with col1:
+                reprint_start = st.date_input("From", key="reprint_start")
+            with col2:
+                reprint_end = st.date_input("To", key="reprint_end")
+            
+            if st.button("Reprint Invoices", key="reprint_button"):
+                try:
+                    employee_code = REFERENCE.employee(st.session_state.employee_name).code
+                    sales_rows = read_sales_view(conn, reprint_start, reprint_end)
+                    jobs = invoice_jobs(select_invoices(
+                        sales_rows, start_date=reprint_start, end_date=reprint_end, employee_code=employee_code
+                    ))
+                    if not jobs:
+                        st.warning("No invoices found in this date range")
+                    else:
+                        progress_bar = st.progress(0.0, text=f"Rendering {len(jobs)} invoices...")
+                        archive, failed = render_invoices_zip(
+                            jobs,
+                            progress=lambda done, total: progress_bar.progress(
+                                done / total, text=f"Rendered {done} of {total} invoices"
+                            )
+                        )
+                        st.download_button(
+                            "📥 Download Invoices (ZIP)",
+                            archive,
+                            file_name=f"invoices_{reprint_start:%d-%m-%Y}_{reprint_end:%d-%m-%Y}.zip",
+                            mime="application/zip",
+                            key="reprint_download"
+                        )
+                        if failed:
+                            st.warning(
+                                f"{len(failed)} invoice(s) could not be rendered: "
+                                + ", ".join(invoice_number for invoice_number, _ in failed)
+                            )
+                except Exception as e:
+                    st.error(f"Error reprinting invoices: {e}")
         
-        if invoice_date_search:
-            date_str = invoice_date_search.strftime("%d-%m-%Y")
-            filtered_data = filtered_data[
-                filtered_data['Invoice Date'].dt.strftime('%d-%m-%Y') == date_str
-            ]
+        def load_invoice_page(page_number):
+            # One pre-aggregated row per invoice, kept current as invoices and statuses are written
+            employee_code = REFERENCE.employee(st.session_state.employee_name).code
+            return get_invoice_summary(conn).page(
+                employee_code,
+                page=page_number,
+                invoice_number=invoice_number_search,
+                invoice_date=invoice_date_search,
+                outlet_name=outlet_name_search
+            )
         
-        if outlet_name_search:
-            filtered_data = filtered_data[
-                filtered_data['Outlet Name'].str.contains(outlet_name_search, case=False, na=False)
-            ]
+        try:
+            invoice_summary, invoice_count = load_invoice_page(st.session_state.get("invoice_page", 1))
+            page_count = max(1, -(-invoice_count // INVOICE_PAGE_SIZE))
+            if st.session_state.get("invoice_page", 1) > page_count:
+                # The filters narrowed the list below the page being shown
+                st.session_state.invoice_page = page_count
+                invoice_summary, invoice_count = load_invoice_page(page_count)
+        except Exception as e:
+            st.error(f"Error loading sales data: {e}")
+            return
         
-        if filtered_data.empty:
+        if invoice_count == 0:
             st.warning("No matching records found")
             return
-            
-        # Calculate correct grand total by invoice
-        invoice_summary = filtered_data.groupby('Invoice Number').agg({
-            'Invoice Date': 'first',
-            'Outlet Name': 'first',
-            'Grand Total': 'sum',
-            'Payment Status': 'first',
-            'Delivery Status': 'first'
-        }).reset_index()
         
-        # Sort by date descending
-        invoice_summary = invoice_summary.sort_values('Invoice Date', ascending=False)
-        
-        st.write(f"📄 Showing {len(invoice_summary)} of your invoices")
+        st.write(f"📄 Showing {len(invoice_summary)} of your {invoice_count} invoices")
         
         # Display the summary table
         st.dataframe(
@@ -2078,6 +1876,9 @@ def sales_page():
             hide_index=True
         )
         
+        if page_count > 1:
+            st.number_input("Page", min_value=1, max_value=page_count, step=1, key="invoice_page")
+        
         selected_invoice = st.selectbox(
             "Select invoice to view details",
             invoice_summary['Invoice Number'],
@@ -2087,8 +1888,9 @@ def sales_page():
         # Delivery Status Section
         st.subheader("Delivery Status Management")
         
-        # Get all products for the selected invoice
-        invoice_details = filtered_data[filtered_data['Invoice Number'] == selected_invoice]
+        # Get all products for the selected invoice, from the partition of its date only
+        selected_date = invoice_summary.loc[invoice_summary['Invoice Number'] == selected_invoice, 'Invoice Date'].iloc[0]
+        invoice_details = invoice_lines(conn, selected_invoice, selected_date)
         
         if not invoice_details.empty:
             # Create a form for delivery status updates
@@ -2111,19 +1913,16 @@ def sales_page():
                 if submitted:
                     with st.spinner("Updating delivery status..."):
                         try:
-                            # Get all sales data
-                            all_sales_data = conn.read(worksheet="Sales", ttl=5)
-                            all_sales_data = all_sales_data.dropna(how='all')
-                            
-                            # Update the status for all rows with this invoice number
-                            mask = all_sales_data['Invoice Number'] == selected_invoice
-                            all_sales_data.loc[mask, 'Delivery Status'] = new_status
-                            
-                            # Write back the updated data
-                            conn.update(worksheet="Sales", data=all_sales_data)
+                            # Update the status cells of this invoice's rows only
+                            success, error = patch_sales_lines(
+                                conn, selected_invoice, {"Delivery Status": new_status}
+                            )
                             
-                            st.success(f"Delivery status updated to '{new_status}' for invoice {selected_invoice}!")
-                            st.rerun()
+                            if success:
+                                st.success(f"Delivery status updated to '{new_status}' for invoice {selected_invoice}!")
+                                st.rerun()
+                            else:
+                                st.error(f"Error updating delivery status: {error}")
                         except Exception as e:
                             st.error(f"Error updating delivery status: {e}")
         
@@ -2230,15 +2029,15 @@ def visit_page():
         outlet_option = st.radio("Outlet Selection", ["Enter manually", "Select from list"], key="visit_outlet_option")
         
         if outlet_option == "Select from list":
-            outlet_names = Outlet['Shop Name'].tolist()
+            outlet_names = REFERENCE.outlet_names
             selected_outlet = st.selectbox("Select Outlet", outlet_names, key="visit_outlet_select")
-            outlet_details = Outlet[Outlet['Shop Name'] == selected_outlet].iloc[0]
+            outlet_details = REFERENCE.outlet(selected_outlet)
             
             outlet_name = selected_outlet
-            outlet_contact = outlet_details['Contact']
-            outlet_address = outlet_details['Address']
-            outlet_state = outlet_details['State']
-            outlet_city = outlet_details['City']
+            outlet_contact = outlet_details.contact
+            outlet_address = outlet_details.address
+            outlet_state = outlet_details.state
+            outlet_city = outlet_details.city
             
             # Show outlet details like distributor details
             st.text_input("Outlet Contact", value=outlet_contact, disabled=True, key="outlet_contact_display")
@@ -2301,10 +2100,13 @@ def visit_page():
             
         if st.button("Search Visits", key="search_visits_button"):
             try:
-                visit_data = conn.read(worksheet="Visits", ttl=5)
+                # Only the monthly Visits partitions overlapping the search date are read
+                visit_data = get_write_queue(conn).with_pending(
+                    "Visits", get_delta_sync(conn, "Visits").read(visit_date_search or None, visit_date_search or None)
+                )
                 visit_data = visit_data.dropna(how="all")
                 
-                employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
+                employee_code = REFERENCE.employee(selected_employee).code
                 filtered_data = visit_data[visit_data['Employee Code'] == employee_code]
                 
                 if visit_id_search:
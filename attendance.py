@@ -7,10 +7,11 @@ from pyzbar.pyzbar import decode
 import numpy as np
 from datetime import datetime
 import pandas as pd
-from streamlit_gsheets import GSheetsConnection
+from storage import get_connection
+from write_queue import append_or_enqueue
 
-# Initialize Google Sheets connection
-conn = st.connection("gsheets", type=GSheetsConnection)
+# Initialize the storage connection
+conn = get_connection()
 
 # Constants
 ATTENDANCE_COLS = [
@@ -65,25 +66,22 @@ def scan_qr_code():
 def mark_attendance(emp_code, method="QR Code"):
     try:
         # Get employee data
-        emp_data = conn.read(worksheet="Employees", ttl=5)
-        emp_data = emp_data.dropna(how="all")
-        employee = emp_data[emp_data["Employee Code"] == emp_code]
+        employee = conn.read(
+            worksheet="Employees", ttl=5,
+            columns=["Employee Name", "Employee Code"], where={"Employee Code": emp_code}
+        )
         
         if employee.empty:
             return False, "Employee not found"
         
         # Check if already marked today
         date, time = get_current_datetime()
-        attendance = conn.read(worksheet="Attendance", ttl=5)
-        attendance = attendance.dropna(how="all")
-        
-        if not attendance.empty:
-            today_attendance = attendance[
-                (attendance["Employee Code"] == emp_code) & 
-                (attendance["Date"] == date)
-            ]
-            if not today_attendance.empty:
-                return False, "Attendance already marked today"
+        today_attendance = conn.read(
+            worksheet="Attendance", ttl=5,
+            columns=["Employee Code"], where={"Employee Code": emp_code, "Date": date}
+        )
+        if not today_attendance.empty:
+            return False, "Attendance already marked today"
         
         # Record attendance
         new_record = pd.DataFrame([{
@@ -96,9 +94,8 @@ def mark_attendance(emp_code, method="QR Code"):
             "Method": method
         }])
         
-        # Update sheet
-        updated = pd.concat([attendance, new_record], ignore_index=True)
-        conn.update(worksheet="Attendance", data=updated)
+        # Append to sheet
+        append_or_enqueue(conn, "Attendance", new_record, columns=ATTENDANCE_COLS)
         
         return True, "Attendance marked successfully"
     
@@ -116,19 +113,16 @@ def user_view(emp_code, emp_name):
     
     # Check today's attendance
     date, _ = get_current_datetime()
-    attendance = conn.read(worksheet="Attendance", ttl=5)
-    attendance = attendance.dropna(how="all")
+    today_attendance = conn.read(
+        worksheet="Attendance", ttl=5,
+        columns=["Time"], where={"Employee Code": emp_code, "Date": date}
+    )
     
-    if not attendance.empty:
-        today_attendance = attendance[
-            (attendance["Employee Code"] == emp_code) & 
-            (attendance["Date"] == date)
-        ]
-        if not today_attendance.empty:
-            st.success("Your attendance is already marked for today")
-            st.write(f"Time: {today_attendance['Time'].values[0]}")
-        else:
-            st.info("Your attendance is not marked yet for today")
+    if not today_attendance.empty:
+        st.success("Your attendance is already marked for today")
+        st.write(f"Time: {today_attendance['Time'].values[0]}")
+    else:
+        st.info("Your attendance is not marked yet for today")
 
 # Admin View
 def admin_view():
@@ -141,8 +135,11 @@ def admin_view():
         success, message = mark_attendance(scanned_data)
         if success:
             # Get employee name
-            emp_data = conn.read(worksheet="Employees", ttl=5)
-            emp_name = emp_data[emp_data["Employee Code"] == scanned_data]["Employee Name"].values[0]
+            emp_data = conn.read(
+                worksheet="Employees", ttl=5,
+                columns=["Employee Name"], where={"Employee Code": scanned_data}
+            )
+            emp_name = emp_data["Employee Name"].values[0]
             st.success(f"Attendance marked for {emp_name}")
             st.balloons()
         else:
@@ -169,9 +166,10 @@ def main():
             
             if st.button("Login"):
                 try:
-                    emp_data = conn.read(worksheet="Employees", ttl=5)
-                    emp_data = emp_data.dropna(how="all")
-                    employee = emp_data[emp_data["Employee Code"] == emp_code]
+                    employee = conn.read(
+                        worksheet="Employees", ttl=5,
+                        columns=["Employee Name", "Employee Code"], where={"Employee Code": emp_code}
+                    )
                     
                     if not employee.empty:
                         st.session_state.authenticated = True
@@ -0,0 +1,423 @@
+# backups.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import pandas as pd
+import streamlit as st
+
+from storage import sheet_values, storage_setting
+
+BACKUP_PATH = "data/backups.db"
+BACKUP_RETENTION_DAYS = 30
+# Changes recorded on top of a base before compaction folds them into a new one
+BACKUP_MAX_CHAIN = 500
+# Retention and rebasing run in the background at most this often per worksheet
+BACKUP_COMPACT_INTERVAL_SECONDS = 3600
+# A base that was started but never finished (its process died) is dropped after this long
+BACKUP_PENDING_TIMEOUT_SECONDS = 86400
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, default=str).encode("utf-8"))
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _row_hash(row):
+    return hashlib.sha1(json.dumps(row, default=str).encode("utf-8")).hexdigest()
+
+
+def _positions(columns, rows, names):
+    """Index of each named column, adding the ones the state lacks (blank in existing rows)"""
+    positions = []
+    for name in names:
+        if name not in columns:
+            columns.append(name)
+            for row in rows:
+                if row is not None:
+                    row.append("")
+        positions.append(columns.index(name))
+    return positions
+
+
+class BackupStore:
+    """Worksheet backups kept as a change log in a local content-addressed store
+
+    Every write is recorded as it happens: a base (every row of the sheet, after a full
+    replace or an explicit backup()), an append (the new rows) or a patch (cells set on
+    a row range). Rows are stored once, zlib-compressed under the hash of their values,
+    so recording a write costs what the write carried, never a read of the sheet. The
+    sheet as of any time is its last base before then with the later changes replayed;
+    appended rows are replayed at the position the sheet gave them, so rows a base
+    already holds, or appends recorded out of order, land where they are on the sheet.
+    compact() drops changes past the retention window (folding them into a base),
+    rebases chains longer than max_chain and deletes rows nothing refers to.
+    """
+
+    def __init__(self, path=BACKUP_PATH, retention_days=BACKUP_RETENTION_DAYS, max_chain=BACKUP_MAX_CHAIN,
+                 compact_interval=BACKUP_COMPACT_INTERVAL_SECONDS):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_chain = max_chain
+        self.compact_interval = compact_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS objects (hash TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS backups ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, worksheet TEXT NOT NULL, taken_at REAL NOT NULL, "
+            "kind TEXT NOT NULL, chain INTEGER NOT NULL, revision TEXT, columns TEXT NOT NULL, "
+            "row_count INTEGER NOT NULL, manifest BLOB NOT NULL, position INTEGER)"
+        )
+        try:
+            self._db.execute("ALTER TABLE backups ADD COLUMN position INTEGER")
+        except sqlite3.OperationalError:
+            pass  # created with it, or another process added it first
+        self._db.execute("CREATE INDEX IF NOT EXISTS backups_by_sheet ON backups (worksheet, taken_at)")
+        self._lock = threading.Lock()
+        self._compacted_at = {}  # worksheet -> monotonic time compaction last ran (or was first due)
+
+    def _store_rows(self, rows):
+        hashes = [_row_hash(row) for row in rows]
+        self._db.executemany(
+            "INSERT OR IGNORE INTO objects (hash, data) VALUES (?, ?)",
+            [(h, _pack(row)) for h, row in dict(zip(hashes, rows)).items()],
+        )
+        return hashes
+
+    def _load_rows(self, hashes):
+        blobs = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            blobs.update(self._db.execute(f"SELECT hash, data FROM objects WHERE hash IN ({marks})", chunk).fetchall())
+        return [_unpack(blobs[h]) for h in hashes]
+
+    def _record(self, worksheet, kind, columns, rows=None, manifest=None, position=None):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if rows is not None:
+                    manifest = self._store_rows(rows)
+                last = self._db.execute(
+                    "SELECT chain FROM backups WHERE worksheet = ? AND kind != 'pending' ORDER BY id DESC LIMIT 1",
+                    (worksheet,),
+                ).fetchone()
+                chain = 0 if kind == "base" or last is None else last[0] + 1
+                cursor = self._db.execute(
+                    "INSERT INTO backups (worksheet, taken_at, kind, chain, columns, row_count, manifest, position) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (worksheet, time.time(), kind, chain, json.dumps([str(c) for c in columns]),
+                     len(rows) if rows is not None else 0, _pack(manifest), position),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return cursor.lastrowid
+
+    def record_base(self, worksheet, data):
+        """Record a worksheet's full contents, e.g. after it was replaced"""
+        return self._record(worksheet, "base", list(data.columns), rows=sheet_values(data))
+
+    def record_append(self, worksheet, data, position=None):
+        """Record rows appended to a worksheet, the first of them at data-row `position` if known"""
+        if data.empty:
+            return None
+        return self._record(worksheet, "append", list(data.columns), rows=sheet_values(data), position=position)
+
+    def record_patch(self, worksheet, start, stop, values):
+        """Record named cells set to the same values on data rows start..stop-1"""
+        cells = sheet_values(pd.DataFrame([list(values.values())], columns=list(values)))[0]
+        return self._record(worksheet, "patch", list(values), manifest=[start, stop, cells])
+
+    def has_base(self, worksheet):
+        """Whether a base exists (or is being taken) to replay the worksheet's changes on"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM backups WHERE worksheet = ? AND kind IN ('base', 'pending') LIMIT 1", (worksheet,)
+            ).fetchone() is not None
+
+    def backup(self, reader, worksheet):
+        """Take a base from the sheet itself (reader.read_rows); returns its id
+
+        The base's place in the log is claimed before the read, so a write that lands
+        after the read is recorded after the base and replayed on top of it. An append
+        that reached the sheet before the read but is recorded after the claim is
+        replayed at its position, which the base already fills, so it is not doubled.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO backups (worksheet, taken_at, kind, chain, columns, row_count, manifest) "
+                "VALUES (?, ?, 'pending', 0, '[]', 0, ?)",
+                (worksheet, time.time(), _pack(None)),
+            )
+        backup_id = cursor.lastrowid
+        try:
+            data = reader.read_rows(worksheet, start=0)
+            rows = sheet_values(data)
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    hashes = self._store_rows(rows)
+                    self._db.execute(
+                        "UPDATE backups SET kind = 'base', columns = ?, row_count = ?, manifest = ? WHERE id = ?",
+                        (json.dumps([str(c) for c in data.columns]), len(rows), _pack(hashes), backup_id),
+                    )
+                    self._db.execute("COMMIT")
+                except Exception:
+                    self._db.execute("ROLLBACK")
+                    raise
+        except Exception:
+            with self._lock:
+                self._db.execute("DELETE FROM backups WHERE id = ?", (backup_id,))
+            raise
+        return backup_id
+
+    def _state(self, worksheet, upto_id=None, before=None):
+        """(columns, rows) of a worksheet after its changes up to an id or a time, or None without a base"""
+        limits, params = "", [worksheet]
+        if upto_id is not None:
+            limits += " AND id <= ?"
+            params.append(upto_id)
+        if before is not None:
+            limits += " AND taken_at <= ?"
+            params.append(before)
+        base = self._db.execute(
+            f"SELECT MAX(id) FROM backups WHERE worksheet = ? AND kind = 'base'{limits}", params
+        ).fetchone()[0]
+        if base is None:
+            return None
+        entries = self._db.execute(
+            f"SELECT kind, columns, manifest, position FROM backups WHERE worksheet = ? AND kind != 'pending'{limits} "
+            "AND id >= ? ORDER BY id",
+            params + [base],
+        ).fetchall()
+        # Rows are None where an append that has not been replayed yet belongs
+        columns, rows = [], []
+        for kind, entry_columns, manifest, at in entries:
+            entry_columns, manifest = json.loads(entry_columns), _unpack(manifest)
+            if kind == "base":
+                columns, rows = list(entry_columns), [list(row) for row in self._load_rows(manifest)]
+            elif kind == "append":
+                positions = _positions(columns, rows, entry_columns)
+                if at is None:
+                    at = len(rows)
+                for offset, values in enumerate(self._load_rows(manifest)):
+                    row = [""] * len(columns)
+                    for position, value in zip(positions, values):
+                        row[position] = value
+                    if at + offset >= len(rows):
+                        rows.extend([None] * (at + offset - len(rows) + 1))
+                    if rows[at + offset] is None:
+                        rows[at + offset] = row
+                    # otherwise the base already holds it: the append landed before the base was read
+            elif kind == "patch":
+                start, stop, cells = manifest
+                positions = _positions(columns, rows, entry_columns)
+                for row in rows[start:stop]:
+                    if row is not None:
+                        for position, value in zip(positions, cells):
+                            row[position] = value
+        # A gap left by an append whose recording failed is dropped
+        return columns, [row for row in rows if row is not None]
+
+    def history(self, worksheet):
+        """Recorded changes of a worksheet, newest first"""
+        with self._lock:
+            frame = pd.read_sql_query(
+                "SELECT id, taken_at, kind, row_count FROM backups WHERE worksheet = ? AND kind != 'pending' "
+                "ORDER BY taken_at DESC, id DESC",
+                self._db, params=(worksheet,),
+            )
+        frame["taken_at"] = pd.to_datetime(frame["taken_at"], unit="s")
+        return frame
+
+    def snapshot_at(self, worksheet, when=None):
+        """The worksheet as of `when` (a datetime or epoch seconds; default now), or None if no base is that old"""
+        if when is not None and not isinstance(when, (int, float)):
+            when = pd.Timestamp(when).timestamp()
+        with self._lock:
+            state = self._state(worksheet, before=when)
+        if state is None:
+            return None
+        columns, rows = state
+        return pd.DataFrame(rows, columns=columns)
+
+    def _rebase(self, worksheet, entry_id):
+        """Turn an entry into a base holding the state after it"""
+        columns, rows = self._state(worksheet, upto_id=entry_id)
+        self._db.execute(
+            "UPDATE backups SET kind = 'base', chain = 0, columns = ?, row_count = ?, manifest = ? WHERE id = ?",
+            (json.dumps(columns), len(rows), _pack(self._store_rows(rows)), entry_id),
+        )
+
+    def compact(self, worksheet, retention_days=None):
+        """Fold changes past the retention window into a base, rebase a long chain and drop unreferenced rows
+
+        Returns the number of entries dropped.
+        """
+        retention_days = self.retention_days if retention_days is None else retention_days
+        cutoff = time.time() - retention_days * 86400
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "DELETE FROM backups WHERE worksheet = ? AND kind = 'pending' AND taken_at < ?",
+                    (worksheet, time.time() - BACKUP_PENDING_TIMEOUT_SECONDS),
+                )
+                dropped = 0
+                # The newest expired entry keeps the state it left, so restores inside the window still work
+                last_expired = self._db.execute(
+                    "SELECT MAX(id) FROM backups WHERE worksheet = ? AND kind != 'pending' AND taken_at < ?",
+                    (worksheet, cutoff),
+                ).fetchone()[0]
+                has_base = self._db.execute(
+                    "SELECT 1 FROM backups WHERE worksheet = ? AND kind = 'base' AND id <= ? LIMIT 1",
+                    (worksheet, last_expired),
+                ).fetchone() if last_expired is not None else None
+                if has_base:
+                    self._rebase(worksheet, last_expired)
+                    dropped = self._db.execute(
+                        "DELETE FROM backups WHERE worksheet = ? AND kind != 'pending' AND id < ?",
+                        (worksheet, last_expired),
+                    ).rowcount
+                latest = self._db.execute(
+                    "SELECT id, chain FROM backups WHERE worksheet = ? AND kind != 'pending' ORDER BY id DESC LIMIT 1",
+                    (worksheet,),
+                ).fetchone()
+                if latest is not None and latest[1] >= self.max_chain and self._state(worksheet, upto_id=latest[0]):
+                    self._rebase(worksheet, latest[0])
+                referenced = set()
+                for kind, manifest in self._db.execute("SELECT kind, manifest FROM backups WHERE kind IN ('base', 'append')"):
+                    referenced.update(_unpack(manifest))
+                stored = [row[0] for row in self._db.execute("SELECT hash FROM objects")]
+                self._db.executemany("DELETE FROM objects WHERE hash = ?", [(h,) for h in stored if h not in referenced])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return dropped
+
+    def maybe_compact(self, worksheet):
+        """Start compact() in the background if it has not run for compact_interval seconds"""
+        now = time.monotonic()
+        with self._lock:
+            due_at = self._compacted_at.setdefault(worksheet, now)
+            if now - due_at < self.compact_interval:
+                return False
+            self._compacted_at[worksheet] = now
+        threading.Thread(target=self.compact, args=(worksheet,), name="backup-compact", daemon=True).start()
+        return True
+
+
+class BackedUpBackend:
+    """Wraps a storage backend so every write it carries is also recorded in a BackupStore
+
+    It sits below the partition layer, so it sees physical sheets and the row positions
+    patches address. A sheet first written with no base backup gets one taken from the
+    sheet in the background. Recording never fails a write; errors land in last_error.
+    """
+
+    def __init__(self, backend, store):
+        self.backend = backend
+        self.store = store
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._based = set()  # sheets known to have a base
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def _record(self, worksheet, record, *args):
+        try:
+            record(worksheet, *args)
+            self._ensure_base(worksheet)
+            self.store.maybe_compact(worksheet)
+        except Exception as e:
+            self.last_error = f"{worksheet}: {e}"
+
+    def _ensure_base(self, worksheet):
+        with self._lock:
+            if worksheet in self._based:
+                return
+            self._based.add(worksheet)
+        if not self.store.has_base(worksheet):
+            threading.Thread(target=self._take_base, args=(worksheet,), name="backup-base", daemon=True).start()
+
+    def _take_base(self, worksheet):
+        try:
+            self.store.backup(self.backend, worksheet)
+        except Exception as e:
+            self.last_error = f"{worksheet}: {e}"
+            with self._lock:
+                self._based.discard(worksheet)
+
+    def update(self, worksheet=None, data=None, **options):
+        result = self.backend.update(worksheet=worksheet, data=data, **options)
+        self._record(worksheet, self.store.record_base, data)
+        return result
+
+    def append(self, worksheet=None, data=None, **options):
+        position = self.backend.append(worksheet=worksheet, data=data, **options)
+        self._record(worksheet, self.store.record_append, data, position)
+        return position
+
+    def update_cells(self, worksheet, row, values, match=None):
+        result = self.backend.update_cells(worksheet, row, values, match=match)
+        self._record(worksheet, self.store.record_patch, row, row + 1, values)
+        return result
+
+    def update_range(self, worksheet, start, stop, values, match=None):
+        result = self.backend.update_range(worksheet, start, stop, values, match=match)
+        self._record(worksheet, self.store.record_patch, start, stop, values)
+        return result
+
+    def backup(self, worksheet):
+        """Take a base of a physical sheet now"""
+        backup_id = self.store.backup(self.backend, worksheet)
+        with self._lock:
+            self._based.add(worksheet)
+        return backup_id
+
+    def restore(self, worksheet, when=None):
+        """Write a physical sheet back as of `when`, against the version read just before the write
+
+        A write landing in between raises ConflictError; when the backend retries conflicts
+        the restore starts over against the new version, otherwise the error is raised.
+        Returns False when there is no backup that old.
+        """
+        snapshot = self.store.snapshot_at(worksheet, when)
+        if snapshot is None:
+            return False
+
+        def attempt():
+            version = self.backend.version(worksheet)
+            self.update(worksheet=worksheet, data=snapshot, expected_version=version)
+
+        retry_conflicts = getattr(self.backend, "retry_conflicts", None)
+        if retry_conflicts is None:
+            attempt()
+        else:
+            retry_conflicts(attempt)
+        return True
+
+
+@st.cache_resource
+def get_backup_store():
+    """Return the backup store shared by every session in this process"""
+    return BackupStore(
+        storage_setting("backup_path", BACKUP_PATH),
+        retention_days=float(storage_setting("backup_retention_days", BACKUP_RETENTION_DAYS)),
+        max_chain=int(storage_setting("backup_max_chain", BACKUP_MAX_CHAIN)),
+        compact_interval=float(storage_setting("backup_compact_interval", BACKUP_COMPACT_INTERVAL_SECONDS)),
+    )
@@ -0,0 +1,178 @@
+# batch_invoices.py
+import io
+import math
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from invoice_pdf import InvoiceDocument, get_invoice_template, render_invoice
+from pricing import GST_RATE, InvoicePricing
+
+# Batches this small render in the calling process: one process renders ~350 invoices/s,
+# and starting a pool of workers costs well over half a second
+BATCH_INLINE_MAX = 200
+# Invoices per task sent to a worker: enough to amortise the round trip, small enough to spread the load
+BATCH_CHUNK_MAX = 25
+
+_worker_template = None
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _text(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    return str(value)
+
+
+def _number(value, default=0.0):
+    number = pd.to_numeric(value, errors="coerce")
+    return default if pd.isna(number) else float(number)
+
+
+def _quantity(value):
+    number = _number(value)
+    return int(number) if number.is_integer() else number
+
+
+def _money(lines, column):
+    return pd.to_numeric(lines[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def select_invoices(sales_rows, invoice_numbers=None, start_date=None, end_date=None, employee_code=None):
+    """Sales rows of the invoices to reprint: the given numbers and/or an inclusive Invoice Date range"""
+    mask = pd.Series(True, index=sales_rows.index)
+    if invoice_numbers is not None:
+        mask &= sales_rows["Invoice Number"].astype(str).isin({str(number) for number in invoice_numbers})
+    if employee_code is not None:
+        mask &= sales_rows["Employee Code"].astype(str) == str(employee_code)
+    dates = sales_rows["Invoice Date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format="%d-%m-%Y", errors="coerce")
+    if start_date is not None:
+        mask &= dates >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= dates < pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    return sales_rows[mask]
+
+
+def invoice_jobs(sales_rows):
+    """(InvoiceDocument, InvoicePricing) per invoice, rebuilt from its Sales rows
+
+    Prices are the ones stored with the invoice, not today's price list, so a reprint
+    shows what was billed. The GSTIN is read from the invoice's header; invoices logged
+    before it was stored there reprint without one.
+    """
+    jobs = []
+    for invoice_number, lines in sales_rows.groupby("Invoice Number", sort=False, observed=True):
+        first = lines.iloc[0]
+        invoice_date = first["Invoice Date"]
+        if isinstance(invoice_date, pd.Timestamp):
+            invoice_date = invoice_date.strftime("%d-%m-%Y")
+        document = InvoiceDocument(
+            _text(invoice_number), _text(invoice_date), _text(first.get("Transaction Type")),
+            _text(first.get("Employee Name")), _text(first.get("Outlet Name")), _text(first.get("GST Number")),
+            _text(first.get("Outlet Contact")), _text(first.get("Outlet Address")),
+            [_text(product) for product in lines["Product Name"]],
+            [_quantity(quantity) for quantity in lines["Quantity"]],
+            [_number(discount) for discount in lines["Product Discount (%)"]],
+            _text(first.get("Payment Status")), _number(first.get("Amount Paid")),
+            _text(first.get("Distributor Firm Name")), _text(first.get("Distributor ID")),
+            _text(first.get("Distributor Contact Person")), _text(first.get("Distributor Contact Number")),
+            _text(first.get("Distributor Territory")),
+        )
+        line_total = _money(lines, "Total Price")
+        subtotal = float(np.cumsum(np.nan_to_num(line_total))[-1])
+        pricing = InvoicePricing(
+            _money(lines, "Unit Price"), _money(lines, "Discounted Unit Price"), line_total,
+            _money(lines, "CGST Amount"), _money(lines, "SGST Amount"), _money(lines, "Grand Total"),
+            subtotal, subtotal * GST_RATE, subtotal + subtotal * GST_RATE,
+        )
+        jobs.append((document, pricing))
+    return jobs
+
+
+def _pool_context():
+    # forkserver where available: workers fork from a clean server process that has already imported
+    # this module, so they start in milliseconds after the first batch, and nothing is forked from the
+    # app's threaded server process. spawn elsewhere.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _render(job, template):
+    document, pricing = job
+    data = render_invoice(document, pricing, template).output(dest="S")
+    # fpdf 1.7 returns the document as a latin-1 str
+    return data.encode("latin-1") if isinstance(data, str) else bytes(data)
+
+
+def _init_worker(template):
+    global _worker_template
+    _worker_template = template
+
+
+def _render_chunk(jobs):
+    """Worker task: [(invoice number, PDF bytes or None, error or None)]"""
+    results = []
+    for job in jobs:
+        try:
+            results.append((job[0].invoice_number, _render(job, _worker_template), None))
+        except Exception as e:
+            results.append((job[0].invoice_number, None, str(e)))
+    return results
+
+
+def render_invoices_zip(jobs, max_workers=None, progress=None):
+    """Render invoices across a process pool into a ZIP; returns (BytesIO at offset 0, [(invoice, error)])
+
+    The pool has one worker per available core (or max_workers), each given this
+    process's invoice template so no worker decodes the logo again. progress(done,
+    total) is called from the calling thread as invoices finish.
+    """
+    template = get_invoice_template()
+    total = len(jobs)
+    workers = max(1, min(max_workers or _cpu_count(), total))
+    buffer = io.BytesIO()
+    failed = []
+    done = 0
+    # PDF streams are already deflated, so the archive just stores them
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        def collect(results):
+            nonlocal done
+            for invoice_number, data, error in results:
+                if error is None:
+                    archive.writestr(f"{invoice_number}.pdf", data)
+                else:
+                    failed.append((invoice_number, error))
+            done += len(results)
+            if progress is not None:
+                progress(done, total)
+
+        if workers == 1 or total <= BATCH_INLINE_MAX:
+            _init_worker(template)
+            for job in jobs:
+                collect(_render_chunk([job]))
+        else:
+            size = max(1, min(BATCH_CHUNK_MAX, math.ceil(total / (workers * 4))))
+            chunks = [jobs[start:start + size] for start in range(0, total, size)]
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=_pool_context(),
+                initializer=_init_worker, initargs=(template,),
+            ) as pool:
+                for future in as_completed([pool.submit(_render_chunk, chunk) for chunk in chunks]):
+                    collect(future.result())
+    buffer.seek(0)
+    return buffer, failed
@@ -0,0 +1,70 @@
+# benchmarks/bench_append.py
+"""Compare the read-concat-rewrite write path with the append-only path on the local backends.
+
+Run from the repository root:  python benchmarks/bench_append.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import MemoryBackend, SQLiteBackend, append_rows
+
+N_COLUMNS = 39  # width of the Sales sheet
+SHEET_SIZES = [1_000, 10_000, 50_000]
+INVOICE_LINES = 5
+REPEATS = 20
+
+
+def make_rows(n, start=0):
+    columns = [f"col_{i}" for i in range(N_COLUMNS)]
+    values = np.arange(start, start + n).astype(str)
+    return pd.DataFrame({col: values for col in columns})
+
+
+def rewrite_path(conn, new_rows):
+    existing = conn.read(worksheet="Sales", ttl=5).dropna(how="all")
+    conn.update(worksheet="Sales", data=pd.concat([existing, new_rows], ignore_index=True))
+
+
+def append_path(conn, new_rows):
+    append_rows(conn, "Sales", new_rows)
+
+
+def memory_backend(tmpdir, size):
+    return MemoryBackend({"Sales": make_rows(size)})
+
+
+def sqlite_backend(tmpdir, size):
+    conn = SQLiteBackend(os.path.join(tmpdir, f"bench_{size}_{time.time_ns()}.db"))
+    conn.update(worksheet="Sales", data=make_rows(size))
+    return conn
+
+
+def run(make_backend, path, size, tmpdir):
+    conn = make_backend(tmpdir, size)
+    start = time.perf_counter()
+    for i in range(REPEATS):
+        path(conn, make_rows(INVOICE_LINES, start=size + i * INVOICE_LINES))
+    elapsed = (time.perf_counter() - start) / REPEATS
+    assert conn.row_count("Sales") == size + REPEATS * INVOICE_LINES
+    return elapsed * 1000
+
+
+def main():
+    print(f"{'backend':>8} {'rows':>8} {'path':>8} {'ms/invoice':>12}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for backend_name, make_backend in (("memory", memory_backend), ("sqlite", sqlite_backend)):
+            for size in SHEET_SIZES:
+                for name, path in (("rewrite", rewrite_path), ("append", append_path)):
+                    ms = run(make_backend, path, size, tmpdir)
+                    print(f"{backend_name:>8} {size:>8} {name:>8} {ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
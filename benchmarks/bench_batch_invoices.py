@@ -0,0 +1,85 @@
+# benchmarks/bench_batch_invoices.py
+"""Batch reprint throughput: 20-line invoices rendered into a ZIP with 1, 2, 4 ... workers up to the core count.
+
+Invoices are rebuilt from synthetic Sales rows as the reprint does. Scaling is only
+measurable on a machine with several cores. Run from the repository root:
+python benchmarks/bench_batch_invoices.py [invoice count, default 1000]
+"""
+import os
+import sys
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pandas as pd
+
+from batch_invoices import _cpu_count, invoice_jobs, render_invoices_zip
+from invoice_pdf import get_invoice_template
+from pricing import price_invoice
+from reference_data import build_registry_from_csv
+
+LINES = 20
+
+
+def make_sales_rows(registry, invoices):
+    products = registry.product_names[:LINES]
+    quantities = [2] * LINES
+    discounts = [5.0] * LINES
+    pricing = price_invoice(registry.prices, products, quantities, discounts, "S2")
+    lines = pd.DataFrame({
+        "Product Name": products,
+        "Quantity": quantities,
+        "Product Discount (%)": discounts,
+        "Unit Price": pricing.unit_price,
+        "Discounted Unit Price": pricing.discounted_unit_price,
+        "Total Price": pricing.line_total,
+        "CGST Amount": pricing.cgst,
+        "SGST Amount": pricing.sgst,
+        "Grand Total": pricing.grand_total,
+    })
+    frames = []
+    for number in range(invoices):
+        frames.append(lines.assign(**{
+            "Invoice Number": f"INV-20250101-{number:08d}",
+            "Invoice Date": "01-01-2025",
+            "Transaction Type": "Sold",
+            "Employee Name": "Bench Employee",
+            "Outlet Name": f"Salon {number % 50}",
+            "Outlet Contact": "9999999999",
+            "Outlet Address": "1 Market Road, Noida",
+            "Payment Status": "pending",
+            "Amount Paid": 0,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    jobs = invoice_jobs(make_sales_rows(build_registry_from_csv(), invoices))
+    get_invoice_template()  # built once, before timing, as in a running server
+    cores = _cpu_count()
+    workers = [1]
+    while workers[-1] * 2 <= cores:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != cores:
+        workers.append(cores)
+
+    print(f"{invoices} invoices, {cores} cores")
+    baseline = None
+    for count in workers:
+        began = time.perf_counter()
+        archive, failed = render_invoices_zip(jobs, max_workers=count)
+        elapsed = time.perf_counter() - began
+        assert not failed, failed[:3]
+        assert len(zipfile.ZipFile(archive).namelist()) == invoices
+        rate = invoices / elapsed
+        baseline = baseline or rate
+        size = archive.getbuffer().nbytes / 2 ** 20
+        print(f"{count:>3} workers {elapsed:>7.2f} s {rate:>8.1f} invoices/s {rate / baseline:>5.2f}x  ({size:.0f} MiB ZIP)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_cold_start.py
+"""Time to the first reference registry on a cold start: sequential reads, concurrent reads, Parquet snapshots.
+
+The four reference sheets are served from the Invoice CSVs by an in-memory backend with
+simulated Google Sheets latency. Run from the repository root:
+python benchmarks/bench_cold_start.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reference_data import (
+    DISTRIBUTORS_CSV, OUTLET_CSV, PERSON_CSV, PRODUCTS_CSV, ReferenceRegistry, SheetReferenceLoader,
+)
+from schemas import apply_schema
+from snapshots import SnapshotStore
+from storage import MemoryBackend, load_worksheets
+
+WORKSHEETS = ["Products", "Outlet", "Person", "Distributors"]
+FETCH_LATENCY = 0.8  # a Sheets round-trip per worksheet
+REVISION_LATENCY = 0.3
+
+
+class SlowBackend(MemoryBackend):
+    """Memory backend with simulated network latency"""
+
+    def read(self, *args, **kwargs):
+        time.sleep(FETCH_LATENCY)
+        return super().read(*args, **kwargs)
+
+    def revision(self, worksheet=None):
+        time.sleep(REVISION_LATENCY)
+        return super().revision(worksheet)
+
+
+def make_backend():
+    csvs = [PRODUCTS_CSV, OUTLET_CSV, PERSON_CSV, DISTRIBUTORS_CSV]
+    return SlowBackend({name: pd.read_csv(path) for name, path in zip(WORKSHEETS, csvs)})
+
+
+def direct_start(conn):
+    """Four sequential reads, as load_gsheet_data did before the snapshots"""
+    frames = [apply_schema(worksheet, conn.read(worksheet=worksheet, ttl=5)) for worksheet in WORKSHEETS]
+    return SheetReferenceLoader(conn, lambda: frames).get()
+
+
+def snapshot_start(conn, directory):
+    """load_gsheet_data today: snapshots, with missing ones fetched concurrently"""
+    store = SnapshotStore(conn, directory=directory, refresh_seconds=0)
+
+    def load_frames():
+        frames, errors = load_worksheets(store.read, WORKSHEETS)
+        assert not errors, errors
+        return tuple(frames[worksheet] for worksheet in WORKSHEETS)
+
+    return SheetReferenceLoader(conn, load_frames).get()
+
+
+def timed(label, start):
+    began = time.perf_counter()
+    registry = start()
+    elapsed = time.perf_counter() - began
+    assert isinstance(registry, ReferenceRegistry) and registry.product_names
+    print(f"{label:>24} {elapsed * 1000:>9.1f} ms  ({len(registry.product_names)} products)")
+    return elapsed
+
+
+def main():
+    conn = make_backend()
+    with tempfile.TemporaryDirectory() as directory:
+        direct = timed("sequential, no snapshot", lambda: direct_start(conn))
+        timed("concurrent, no snapshot", lambda: snapshot_start(conn, directory))
+        # A restarted process finds the snapshots written by the previous one
+        warm = timed("snapshot present", lambda: snapshot_start(conn, directory))
+    print(f"speed-up with a snapshot: {direct / warm:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
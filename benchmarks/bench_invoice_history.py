@@ -0,0 +1,81 @@
+# benchmarks/bench_invoice_history.py
+"""Sales History load time as one employee's invoice count grows: per-rerun groupby versus InvoiceSummary.
+
+The old path reads the joined Sales view, filters it to the employee and groups the
+line items by invoice on every rerun; the new one asks the materialised summary for a
+page. Invoices are written as header and line rows to an in-memory backend.
+Run from the repository root:  python benchmarks/bench_invoice_history.py
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delta_sync import get_delta_sync
+from invoice_summary import InvoiceSummary
+from sales_tables import SALES_VIEW_COLUMNS, read_sales_view, split_sales
+from storage import MemoryBackend
+
+INVOICE_COUNTS = [100, 1000, 5000, 20000]
+LINES_PER_INVOICE = 5
+EMPLOYEE_CODE = "E001"
+RERUNS = 10
+
+
+def make_sales(invoices):
+    rows = []
+    for number in range(invoices):
+        for line in range(LINES_PER_INVOICE):
+            row = dict.fromkeys(SALES_VIEW_COLUMNS, "")
+            row.update({
+                "Invoice Number": f"INV{number:06d}",
+                "Invoice Date": f"{number % 28 + 1:02d}-{number % 12 + 1:02d}-2025",
+                "Employee Code": EMPLOYEE_CODE,
+                "Outlet Name": f"Outlet {number % 50}",
+                "Product Name": f"Product {line}",
+                "Quantity": "2",
+                "Grand Total": str(100 + line),
+                "Payment Status": "paid",
+                "Delivery Status": "Pending",
+            })
+            rows.append(row)
+    return pd.DataFrame(rows, columns=SALES_VIEW_COLUMNS)
+
+
+def old_history(conn):
+    sales_data = read_sales_view(conn)
+    filtered_data = sales_data[sales_data["Employee Code"] == EMPLOYEE_CODE]
+    return filtered_data.groupby("Invoice Number").agg({
+        "Invoice Date": "first",
+        "Outlet Name": "first",
+        "Grand Total": "sum",
+        "Payment Status": "first",
+        "Delivery Status": "first",
+    }).reset_index().sort_values("Invoice Date", ascending=False)
+
+
+def per_rerun(load):
+    load()  # warm the delta-synced copies and the summary
+    began = time.perf_counter()
+    for _ in range(RERUNS):
+        load()
+    return (time.perf_counter() - began) / RERUNS
+
+
+def main():
+    print(f"{'invoices':>9} {'groupby':>12} {'summary page':>14}")
+    for count in INVOICE_COUNTS:
+        headers, lines = split_sales(make_sales(count))
+        conn = MemoryBackend({"Invoices": headers, "SalesLines": lines})
+        get_delta_sync.clear()  # the cached copies belong to the previous backend
+        summary = InvoiceSummary(conn)
+        old = per_rerun(lambda: old_history(conn))
+        new = per_rerun(lambda: summary.page(EMPLOYEE_CODE, page=2))
+        print(f"{count:>9} {old * 1000:>10.1f}ms {new * 1000:>12.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
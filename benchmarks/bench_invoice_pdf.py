@@ -0,0 +1,60 @@
+# benchmarks/bench_invoice_pdf.py
+"""Invoices per second for a 20-line invoice: header laid out per document versus the cached template.
+
+Both paths produce the same PDF bytes (apart from the creation date), which is checked
+first. Run from the repository root:  python benchmarks/bench_invoice_pdf.py
+"""
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from invoice_pdf import InvoiceDocument, InvoiceTemplate, render_invoice
+from pricing import price_invoice
+from reference_data import build_registry_from_csv
+
+LINES = 20
+SECONDS = 5
+
+
+def make_invoice(registry):
+    products = registry.product_names[:LINES]
+    quantities = [2] * LINES
+    discounts = [5.0] * LINES
+    document = InvoiceDocument(
+        "INV-20250101-BENCH001", "01-01-2025", "Sold", "Bench Employee", "Bench Salon", "09AAAAA0000A1Z5",
+        "9999999999", "1 Market Road\nNoida", products, quantities, discounts, "paid", 1000.0,
+        "Bench Distributors", "D001", "Contact Person", "8888888888", "North",
+    )
+    return document, price_invoice(registry.prices, products, quantities, discounts, "S2")
+
+
+def invoices_per_second(render):
+    count = 0
+    began = time.perf_counter()
+    while time.perf_counter() - began < SECONDS:
+        render().output(dest="S")
+        count += 1
+    return count / (time.perf_counter() - began)
+
+
+def main():
+    document, pricing = make_invoice(build_registry_from_csv())
+    uncached, cached = InvoiceTemplate(cache=False), InvoiceTemplate()
+
+    def stripped(template):
+        return re.sub(r"/CreationDate \(D:\d+\)", "", render_invoice(document, pricing, template).output(dest="S"))
+
+    assert stripped(uncached) == stripped(cached), "cached template changed the PDF"
+    before = invoices_per_second(lambda: render_invoice(document, pricing, uncached))
+    after = invoices_per_second(lambda: render_invoice(document, pricing, cached))
+    print(f"{'per-document header':>22} {before:>8.1f} invoices/s")
+    print(f"{'cached template':>22} {after:>8.1f} invoices/s  ({after / before:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
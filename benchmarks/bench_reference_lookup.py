@@ -0,0 +1,67 @@
+# benchmarks/bench_reference_lookup.py
+"""Per-lookup cost of boolean-mask DataFrame scans versus the indexed reference registry.
+
+The last row prices every product for one category: a per-product loop versus one
+column of the compiled price matrix.
+
+Run from the repository root:  python benchmarks/bench_reference_lookup.py
+"""
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from reference_data import build_registry_from_csv
+
+NUMBER = 2_000
+
+
+def report(label, mask_lookup, registry_lookup):
+    before = timeit.timeit(mask_lookup, number=NUMBER) / NUMBER * 1e6
+    after = timeit.timeit(registry_lookup, number=NUMBER) / NUMBER * 1e6
+    print(f"{label:<22} {before:>10.2f} us {after:>10.3f} us {before / after:>10.0f}x")
+
+
+def main():
+    registry = build_registry_from_csv()
+    Person, Products = registry.persons, registry.products
+    Outlet, Distributors = registry.outlets, registry.distributors
+
+    employee = Person["Employee Name"].iloc[-1]
+    product = Products["Product Name"].iloc[-1]
+    outlet = Outlet["Shop Name"].iloc[-1]
+    distributor = Distributors["Firm Name"].iloc[-1]
+
+    print(f"{'lookup':<22} {'mask scan':>13} {'registry':>13} {'speedup':>11}")
+    report(
+        "employee code",
+        lambda: Person[Person["Employee Name"] == employee]["Employee Code"].values[0],
+        lambda: registry.employee(employee).code,
+    )
+    report(
+        "product price (S2)",
+        lambda: float(Products[Products["Product Name"] == product].iloc[0]["S2"]),
+        lambda: registry.prices.unit_prices([product], "S2")[0],
+    )
+    report(
+        "all prices (S2)",
+        lambda: [registry.prices.unit_prices([name], "S2")[0] for name in registry.product_names],
+        lambda: registry.prices.category_prices("S2"),
+    )
+    report(
+        "outlet record",
+        lambda: Outlet[Outlet["Shop Name"] == outlet].iloc[0],
+        lambda: registry.outlet(outlet),
+    )
+    report(
+        "distributor record",
+        lambda: Distributors[Distributors["Firm Name"] == distributor].iloc[0],
+        lambda: registry.distributor(distributor),
+    )
+
+
+if __name__ == "__main__":
+    main()
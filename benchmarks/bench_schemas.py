@@ -0,0 +1,103 @@
+# benchmarks/bench_schemas.py
+"""Type a synthetic 200k-row Sales sheet: the old column-by-column coercion versus apply_schema.
+
+Reports wall time, peak Python allocation during the pass and the resulting frame's
+memory. Run from the repository root:  python benchmarks/bench_schemas.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas import apply_schema, memory_report
+
+ROWS = 200_000
+SALES_SHEET_COLUMNS = [
+    "Invoice Number", "Invoice Date", "Employee Name", "Employee Code", "Designation", "Discount Category",
+    "Transaction Type", "Outlet Name", "Outlet Contact", "Outlet Address", "Outlet State", "Outlet City",
+    "Distributor Firm Name", "Distributor ID", "Distributor Contact Person", "Distributor Contact Number",
+    "Distributor Email", "Distributor Territory", "Product ID", "Product Name", "Product Category", "Quantity",
+    "Unit Price", "Product Discount (%)", "Discounted Unit Price", "Total Price", "GST Rate", "CGST Amount",
+    "SGST Amount", "Grand Total", "Overall Discount (%)", "Amount Discount (INR)", "Payment Status",
+    "Amount Paid", "Payment Receipt Path", "Employee Selfie Path", "Invoice PDF Path", "Remarks",
+    "Delivery Status",
+]
+MONEY = [
+    "Unit Price", "Product Discount (%)", "Discounted Unit Price", "Total Price", "CGST Amount", "SGST Amount",
+    "Grand Total", "Overall Discount (%)", "Amount Discount (INR)", "Amount Paid",
+]
+
+
+def make_sales(n, seed=7):
+    """Every cell is text, as it arrives from the sheet"""
+    rng = np.random.default_rng(seed)
+    invoices = rng.integers(0, n // 3, n)
+    days = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 900, n), unit="D")
+    data = {column: np.full(n, "", dtype=object) for column in SALES_SHEET_COLUMNS}
+    data["Invoice Number"] = np.char.add("INV", invoices.astype(str)).astype(object)
+    data["Invoice Date"] = days.strftime("%d-%m-%Y").to_numpy(dtype=object)
+    for column, cardinality in [
+        ("Employee Name", 120), ("Employee Code", 120), ("Designation", 15), ("Discount Category", 4),
+        ("Transaction Type", 2), ("Outlet State", 30), ("Outlet City", 400), ("Product ID", 98),
+        ("Product Name", 98), ("Product Category", 12), ("Payment Status", 3), ("Delivery Status", 4),
+        ("Distributor Firm Name", 60), ("Distributor ID", 60), ("Distributor Territory", 20),
+    ]:
+        data[column] = np.char.add(f"{column[:4]}-", rng.integers(0, cardinality, n).astype(str)).astype(object)
+    data["Outlet Name"] = np.char.add("Outlet ", rng.integers(0, 20_000, n).astype(str)).astype(object)
+    for column in MONEY:
+        data[column] = np.round(rng.uniform(0, 5000, n), 2).astype(str).astype(object)
+    data["Quantity"] = rng.integers(1, 50, n).astype(str).astype(object)
+    data["GST Rate"] = np.full(n, "18%", dtype=object)
+    data["Outlet Address"] = np.char.add("Address ", rng.integers(0, 20_000, n).astype(str)).astype(object)
+    return pd.DataFrame(data)
+
+
+def column_by_column(sales_data):
+    """load_sales_data's coercion before the schema layer"""
+    sales_data = sales_data.dropna(how="all")
+    sales_data = sales_data.copy()
+    sales_data["Outlet Name"] = sales_data["Outlet Name"].astype(str)
+    sales_data["Invoice Number"] = sales_data["Invoice Number"].astype(str)
+    sales_data["Invoice Date"] = pd.to_datetime(sales_data["Invoice Date"], dayfirst=True, errors="coerce")
+    for col in ["Grand Total", "Unit Price", "Total Price", "Product Discount (%)", "Quantity"]:
+        sales_data[col] = pd.to_numeric(sales_data[col], errors="coerce")
+    return sales_data
+
+
+def measure(label, fn, raw, repeat=3):
+    # Timed without tracemalloc, which slows pandas down several times over
+    elapsed = min(_timed(fn, raw) for _ in range(repeat))
+    tracemalloc.start()
+    result = fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = result.memory_usage(index=True, deep=True).sum()
+    print(f"{label:>20} {elapsed:>7.2f}s  peak {peak / 2**20:>7.1f} MiB  result {size / 2**20:>7.1f} MiB")
+    return result
+
+
+def _timed(fn, raw):
+    start = time.perf_counter()
+    fn(raw)
+    return time.perf_counter() - start
+
+
+def main():
+    raw = make_sales(ROWS)
+    print(f"raw frame: {ROWS} rows, {raw.memory_usage(index=True, deep=True).sum() / 2**20:.1f} MiB")
+    measure("column by column", column_by_column, raw)
+    measure("schema, no compact", lambda df: apply_schema("Sales", df, compact=False), raw)
+    typed = measure("apply_schema", lambda df: apply_schema("Sales", df), raw)
+    assert typed["Invoice Date"].notna().all()
+    assert str(typed["Product Name"].dtype) == "category" and str(typed["Quantity"].dtype) == "Int32"
+    print("\nlargest columns after apply_schema:")
+    print(memory_report(typed).head(8).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_sheet_cache.py
+"""100 sessions open Sales History at once; count backend fetches with and without the shared cache.
+
+Run from the repository root:  python benchmarks/bench_sheet_cache.py
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sheet_cache import CachedBackend, SheetCache
+from storage import MemoryBackend
+
+SESSIONS = 100
+ROWS = 20_000
+FETCH_LATENCY = 0.5  # a Sheets round-trip for a sheet this size
+
+
+class SlowBackend(MemoryBackend):
+    """Memory backend with simulated network latency on full reads"""
+
+    def read(self, *args, **kwargs):
+        time.sleep(FETCH_LATENCY)
+        return super().read(*args, **kwargs)
+
+
+def make_sales(n):
+    values = np.arange(n).astype(str)
+    return pd.DataFrame({f"col_{i}": values for i in range(39)})
+
+
+def open_sales_history(conn, barrier):
+    barrier.wait()
+    conn.read(worksheet="Sales", ttl=5)
+
+
+def run(conn, backend):
+    barrier = threading.Barrier(SESSIONS)
+    threads = [threading.Thread(target=open_sales_history, args=(conn, barrier)) for _ in range(SESSIONS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return backend.stats["reads"], time.perf_counter() - start
+
+
+def main():
+    sales = make_sales(ROWS)
+    direct = SlowBackend({"Sales": sales})
+    reads, elapsed = run(direct, direct)
+    print(f"{'uncached':>10} {reads:>5} fetches {elapsed:>7.2f}s")
+
+    backend = SlowBackend({"Sales": sales})
+    cached = CachedBackend(backend, SheetCache())
+    reads, elapsed = run(cached, backend)
+    print(f"{'cached':>10} {reads:>5} fetches {elapsed:>7.2f}s")
+
+    # A write invalidates, and the writer's next read sees it
+    cached.append(worksheet="Sales", data=make_sales(1))
+    assert len(cached.read(worksheet="Sales")) == ROWS + 1
+    print(f"{'stats':>10} {cached.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/check_missing_sheets.py
+"""Check that the Sales pages work on a spreadsheet with none of their worksheets yet.
+
+A Google Sheets backend is given a spreadsheet holding no worksheets at all, so every
+worksheet lookup raises WorksheetNotFound as a fresh deployment would. An invoice is
+logged, then Sales History, the Sales view and a Batch Reprint are read back from the
+queue; each must see the one invoice rather than fail.
+Run from the repository root:  python benchmarks/check_missing_sheets.py
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the check's queued rows out of the app's journal, and nothing flushes during the run
+os.environ["STORAGE_JOURNAL_PATH"] = os.path.join(tempfile.mkdtemp(), "write_journal.db")
+os.environ["STORAGE_FLUSH_INTERVAL"] = "3600"
+
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+
+from batch_invoices import invoice_jobs
+from invoice_summary import InvoiceSummary
+from partitions import PartitionedBackend
+from resilience import ResilientBackend
+from sales_tables import SALES_VIEW_COLUMNS, invoice_lines, log_invoice, read_sales_view
+from sheet_cache import CachedBackend
+from storage import GSheetsBackend
+
+INVOICE_NUMBER = "INV000001"
+EMPLOYEE_CODE = "E001"
+
+
+class EmptySpreadsheet:
+    """The parts of the gsheets client the backend touches, for a spreadsheet with no worksheets"""
+
+    def __init__(self):
+        self.client = self
+
+    def _open_spreadsheet(self):
+        return self
+
+    def worksheets(self):
+        return []
+
+    def _select_worksheet(self, worksheet=None):
+        raise WorksheetNotFound(worksheet)
+
+    def read(self, worksheet=None, **options):
+        raise WorksheetNotFound(worksheet)
+
+
+def empty_gsheets():
+    backend = GSheetsBackend.__new__(GSheetsBackend)
+    backend._conn = EmptySpreadsheet()
+    backend._headers_lock = None
+    backend._header_cache = {}
+    return CachedBackend(PartitionedBackend(ResilientBackend(backend)))
+
+
+def make_invoice():
+    rows = []
+    for line, product in enumerate(["Product A", "Product B"]):
+        row = dict.fromkeys(SALES_VIEW_COLUMNS, "")
+        row.update({
+            "Invoice Number": INVOICE_NUMBER,
+            "Invoice Date": "15-06-2025",
+            "Employee Code": EMPLOYEE_CODE,
+            "Outlet Name": "Outlet 1",
+            "Product Name": product,
+            "Quantity": 2,
+            "Unit Price": 100.0,
+            "Product Discount (%)": 0.0,
+            "Discounted Unit Price": 100.0,
+            "Total Price": 200.0,
+            "CGST Amount": 9.0,
+            "SGST Amount": 9.0,
+            "Grand Total": 218.0 + line,
+            "Payment Status": "paid",
+            "Amount Paid": 437,
+            "Delivery Status": "Pending",
+        })
+        rows.append(row)
+    return pd.DataFrame(rows, columns=SALES_VIEW_COLUMNS)
+
+
+def check(name, passed):
+    print(f"{'ok' if passed else 'FAILED':>6}  {name}")
+    return passed
+
+
+def main():
+    conn = empty_gsheets()
+    results = [
+        check("Sales view reads empty before any invoice", read_sales_view(conn).empty),
+        check("Sales History reads empty before any invoice", InvoiceSummary(conn).page(EMPLOYEE_CODE)[0].empty),
+    ]
+    log_invoice(conn, make_invoice())
+    history = InvoiceSummary(conn).page(EMPLOYEE_CODE)[0]
+    results += [
+        check("log_invoice queues the invoice", len(read_sales_view(conn)) == 2),
+        check("Sales History lists the queued invoice", list(history["Invoice Number"]) == [INVOICE_NUMBER]),
+        check("Batch Reprint rebuilds the queued invoice",
+              len(invoice_jobs(invoice_lines(conn, INVOICE_NUMBER, "15-06-2025"))) == 1),
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
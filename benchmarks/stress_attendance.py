@@ -0,0 +1,112 @@
+# benchmarks/stress_attendance.py
+"""50 employees check in and out at the same time; verify that no row or checkout is lost.
+
+Runs the old full-sheet rewrite checkout and the in-place cell patch against the local
+SQLite backend. Run from the repository root:  python benchmarks/stress_attendance.py
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sheet_index import AttendanceIndex, patch_attendance
+from storage import SQLiteBackend
+from write_queue import WriteBehindQueue
+
+EMPLOYEES = 50
+DATE = "16-10-2026"
+COLUMNS = [
+    "Attendance ID", "Employee Name", "Employee Code", "Designation", "Date", "Status",
+    "Check-in Location Link", "Check-out Location Link", "Leave Reason", "Check-in Time",
+    "Check-out Time", "Duration (hours)", "Check-in Date Time",
+]
+
+
+def check_in(queue, index, n):
+    record = dict.fromkeys(COLUMNS, "")
+    record.update({
+        "Attendance ID": f"ATT-{n:04d}",
+        "Employee Name": f"Employee {n}",
+        "Employee Code": f"BSS{n:04d}",
+        "Date": DATE,
+        "Status": "Present",
+        "Check-in Time": "09:00:00",
+    })
+    queue.enqueue("Attendance", pd.DataFrame([record]), columns=COLUMNS)
+    index.record_check_in(record)
+
+
+def checkout_values():
+    return {"Check-out Time": "18:00:00", "Check-out Location Link": "https://maps.google.com/?q=0,0",
+            "Duration (hours)": 9.0}
+
+
+def rewrite_checkout(conn, queue, index, n):
+    queue.flush("Attendance")
+    data = conn.read(worksheet="Attendance").dropna(how="all").astype(object)
+    mask = (data["Employee Code"] == f"BSS{n:04d}") & (data["Date"] == DATE)
+    for column, value in checkout_values().items():
+        data.loc[mask, column] = value
+    time.sleep(random.uniform(0, 0.005))  # the app does work between read and write
+    conn.update(worksheet="Attendance", data=data)
+
+
+def patch_checkout(conn, queue, index, n):
+    success, error = patch_attendance(conn, index, queue, DATE, f"BSS{n:04d}", checkout_values())
+    if not success:
+        raise RuntimeError(error)
+
+
+def run(name, checkout, tmpdir):
+    conn = SQLiteBackend(os.path.join(tmpdir, f"{name}.db"))
+    conn.update(worksheet="Attendance", data=pd.DataFrame(columns=COLUMNS))
+    queue = WriteBehindQueue(conn, journal_path=os.path.join(tmpdir, f"{name}_journal.db"), flush_interval=0.05)
+    index = AttendanceIndex(conn, sync_interval=0.5)
+    errors = []
+    barrier = threading.Barrier(EMPLOYEES)
+
+    def employee(n):
+        try:
+            barrier.wait()
+            check_in(queue, index, n)
+            time.sleep(random.uniform(0, 0.05))
+            checkout(conn, queue, index, n)
+        except Exception as e:
+            errors.append(f"employee {n}: {e}")
+
+    threads = [threading.Thread(target=employee, args=(n,)) for n in range(EMPLOYEES)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.close()
+    index.close()
+    elapsed = time.perf_counter() - start
+
+    data = conn.read(worksheet="Attendance")
+    rows = data["Attendance ID"].nunique()
+    checked_out = (data["Check-out Time"].fillna("") != "").sum()
+    for error in errors[:1]:
+        print(f"{name:>8} first error: {error}")
+    print(f"{name:>8} {rows:>5}/{EMPLOYEES} rows {checked_out:>5}/{EMPLOYEES} checkouts "
+          f"{len(errors):>4} errors {elapsed:>7.2f}s")
+    return rows == EMPLOYEES and checked_out == EMPLOYEES and not errors
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        run("rewrite", rewrite_checkout, tmpdir)
+        ok = run("patch", patch_checkout, tmpdir)
+    if not ok:
+        sys.exit("patch checkout lost rows or checkouts")
+
+
+if __name__ == "__main__":
+    main()
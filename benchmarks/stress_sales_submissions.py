@@ -0,0 +1,92 @@
+# benchmarks/stress_sales_submissions.py
+"""50 invoices are submitted at the same time; verify that no Sales row is lost.
+
+Replays the submissions as a plain read-modify-write and as the append the app uses,
+against the in-memory backend behind the same partition and cache layers. Run from the
+repository root:
+python benchmarks/stress_sales_submissions.py
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from partitions import PartitionedBackend
+from sheet_cache import CachedBackend, SheetCache
+from storage import MemoryBackend, append_rows
+
+SUBMISSIONS = 50
+LINES_PER_INVOICE = 3
+COLUMNS = ["Invoice Number", "Invoice Date", "Employee Name", "Product Name", "Quantity", "Grand Total"]
+
+
+def invoice_lines(n):
+    return pd.DataFrame([
+        {
+            "Invoice Number": f"INV-{n:04d}",
+            "Invoice Date": "16-10-2026",
+            "Employee Name": f"Employee {n}",
+            "Product Name": f"Product {line}",
+            "Quantity": 1,
+            "Grand Total": 100.0,
+        }
+        for line in range(LINES_PER_INVOICE)
+    ], columns=COLUMNS)
+
+
+def add_lines(data, lines):
+    time.sleep(random.uniform(0, 0.005))  # the app does work between read and write
+    return pd.concat([data.dropna(how="all"), lines], ignore_index=True)
+
+
+def naive_submit(conn, n):
+    data = conn.read(worksheet="Sales", ttl=0)
+    conn.update(worksheet="Sales", data=add_lines(data, invoice_lines(n)))
+
+
+def append_submit(conn, n):
+    append_rows(conn, "Sales", invoice_lines(n), columns=COLUMNS)
+
+
+def run(name, submit):
+    conn = CachedBackend(PartitionedBackend(MemoryBackend({"Sales": pd.DataFrame(columns=COLUMNS)})), SheetCache())
+    errors = []
+    barrier = threading.Barrier(SUBMISSIONS)
+
+    def employee(n):
+        try:
+            barrier.wait()
+            submit(conn, n)
+        except Exception as e:
+            errors.append(f"invoice {n}: {e}")
+
+    threads = [threading.Thread(target=employee, args=(n,)) for n in range(SUBMISSIONS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    data = conn.read(worksheet="Sales", ttl=0)
+    rows = len(data.dropna(how="all"))
+    expected = SUBMISSIONS * LINES_PER_INVOICE
+    for error in errors[:1]:
+        print(f"{name:>9} first error: {error}")
+    print(f"{name:>9} {rows:>5}/{expected} rows {len(errors):>4} errors {elapsed:>7.2f}s")
+    return rows == expected and not errors
+
+
+def main():
+    run("naive", naive_submit)
+    if not run("append", append_submit):
+        sys.exit("append submissions lost rows")
+
+
+if __name__ == "__main__":
+    main()
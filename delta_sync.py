@@ -0,0 +1,195 @@
+# delta_sync.py
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from schemas import COMPACT_WORKSHEETS, apply_schema, concat_frames, memory_report
+from storage import storage_setting
+
+DELTA_MIN_INTERVAL_SECONDS = 5
+DELTA_RELOAD_INTERVAL_SECONDS = 900
+
+# Time-ordered ID column per worksheet, used to confirm the high-water mark still lines up
+DELTA_ID_COLUMNS = {
+    "Sales": "Invoice Number",
+    "Invoices": "Invoice Number",
+    "SalesLines": "Invoice Number",
+    "Visits": "Visit ID",
+    "Attendance": "Attendance ID",
+    "Demos": "Demo ID",
+    "Tickets": "Ticket ID",
+    "TravelHotelRequests": "Request ID",
+}
+
+
+def _row_key(row, id_column):
+    """Identity of a raw sheet row, for the high-water mark"""
+    if id_column is not None and id_column in row:
+        value = row[id_column]
+        return "" if pd.isna(value) else str(value)
+    return "\x1f".join("" if pd.isna(value) else str(value) for value in row.values)
+
+
+def infer_types(rows):
+    """Give raw sheet text the types conn.read() infers: blanks become NaN, all-number columns numbers"""
+    rows = rows.replace("", np.nan)
+    for column in rows.columns:
+        if rows[column].dtype == object or pd.api.types.is_string_dtype(rows[column]):
+            try:
+                rows[column] = pd.to_numeric(rows[column])
+            except (TypeError, ValueError):
+                pass
+    return rows
+
+
+def _align_kinds(frame, typed, raw):
+    """New rows typed to agree with the copy, as if the whole sheet were inferred at once; None if it cannot be
+
+    A text column stays text when new rows happen to hold only numbers. A number column
+    that receives text would turn to text throughout, which needs the sheet typed again.
+    """
+    as_text = []
+    for column in typed.columns:
+        if column not in frame.columns or typed[column].isna().all():
+            continue
+        frame_numeric = pd.api.types.is_numeric_dtype(frame[column])
+        if frame_numeric == pd.api.types.is_numeric_dtype(typed[column]):
+            continue
+        if frame_numeric:
+            return None
+        as_text.append(column)
+    if as_text:
+        typed = typed.assign(**{column: raw[column].replace("", np.nan) for column in as_text})
+    return typed
+
+
+class DeltaSync:
+    """Local copy of a worksheet that refreshes by fetching only rows past a high-water mark
+
+    The mark per physical sheet is its row count plus the ID of the last row held
+    locally. A refresh fetches from the last known row onwards: if that row still carries
+    the same ID, only the rows after it are new; if not, the sheet was rewritten and is
+    reloaded. Sheets edited in place through this process are reloaded on the next
+    refresh, and every sheet is reloaded every reload_interval seconds for edits made
+    elsewhere. read_rows() hands back raw cell text, so rows are typed as they arrive:
+    by the worksheet's schema when compact, otherwise as conn.read() would infer them.
+    """
+
+    def __init__(self, conn, worksheet, id_column=None, min_interval=DELTA_MIN_INTERVAL_SECONDS,
+                 reload_interval=DELTA_RELOAD_INTERVAL_SECONDS, compact=False):
+        self.conn = conn
+        self.worksheet = worksheet
+        self.id_column = id_column if id_column is not None else DELTA_ID_COLUMNS.get(worksheet)
+        self.min_interval = min_interval
+        self.reload_interval = reload_interval
+        # Hold the copy typed by the worksheet's schema, with categoricals and narrow numbers
+        self.compact = compact
+        self._lock = threading.Lock()
+        self._frames = {}        # physical sheet -> DataFrame held locally
+        self._marks = {}         # physical sheet -> (row count, key of the last row)
+        self._refreshed_at = {}  # physical sheet -> monotonic time of the last refresh
+        self._loaded_at = {}     # physical sheet -> monotonic time of the last full load
+        self._stale = set()
+        self.stats = {"refreshes": 0, "full_loads": 0, "rows_fetched": 0}
+
+        add_listener = getattr(conn, "add_write_listener", None)
+        if add_listener is not None:
+            add_listener(self._on_write)
+
+    def _on_write(self, sheet, method):
+        # Appends arrive through the mark; anything that edits rows in place needs a reload
+        if method == "append":
+            return
+        with self._lock:
+            if sheet == self.worksheet and method == "update":
+                self._stale.update(self._frames)
+            self._stale.add(sheet)
+
+    def _sheets(self, start_date=None, end_date=None):
+        partitions = getattr(self.conn, "partitions", None)
+        if partitions is None:
+            return [self.worksheet]
+        return partitions(self.worksheet, start_date=start_date, end_date=end_date)
+
+    def _typed(self, rows):
+        # Empty rows are kept: the mark counts sheet rows
+        if self.compact:
+            return apply_schema(self.worksheet, rows, drop_empty=False)
+        return infer_types(rows)
+
+    def _load(self, sheet):
+        rows = self.conn.read_rows(sheet, start=0)
+        self._frames[sheet] = self._typed(rows)
+        self._marks.pop(sheet, None)
+        self._mark(sheet, rows)
+        self._loaded_at[sheet] = time.monotonic()
+        self._stale.discard(sheet)
+        self.stats["full_loads"] += 1
+        self.stats["rows_fetched"] += len(rows)
+
+    def _mark(self, sheet, raw_rows):
+        # Keyed on the raw text, which is what the next refresh compares against
+        last = _row_key(raw_rows.iloc[-1], self.id_column) if len(raw_rows) else self._marks.get(sheet, (0, None))[1]
+        self._marks[sheet] = (len(self._frames[sheet]), last)
+
+    def _refresh(self, sheet):
+        count, last = self._marks[sheet]
+        start = max(count - 1, 0)
+        fetched = self.conn.read_rows(sheet, start=start)
+        self.stats["refreshes"] += 1
+        self.stats["rows_fetched"] += len(fetched)
+        if count:
+            if fetched.empty or _row_key(fetched.iloc[0], self.id_column) != last:
+                # The last known row moved: rows were deleted or the sheet rewritten
+                self._load(sheet)
+                return
+            fetched = fetched.iloc[1:]
+        if not fetched.empty:
+            frame = self._frames[sheet]
+            typed = self._typed(fetched)
+            if len(frame) and not self.compact:
+                typed = _align_kinds(frame, typed, fetched)
+                if typed is None:
+                    self._load(sheet)
+                    return
+            self._frames[sheet] = concat_frames([frame, typed]) if len(frame) else typed
+            self._mark(sheet, fetched)
+
+    def read(self, start_date=None, end_date=None):
+        """Return the local copy (partitions overlapping the dates), fetching only new rows first"""
+        with self._lock:
+            now = time.monotonic()
+            frames = []
+            for sheet in self._sheets(start_date, end_date):
+                if (sheet not in self._frames or sheet in self._stale
+                        or now - self._loaded_at[sheet] >= self.reload_interval):
+                    self._load(sheet)
+                elif now - self._refreshed_at.get(sheet, 0.0) >= self.min_interval:
+                    self._refresh(sheet)
+                self._refreshed_at[sheet] = now
+                if len(self._frames[sheet]):
+                    frames.append(self._frames[sheet])
+        if not frames:
+            return pd.DataFrame()
+        return concat_frames(frames, ignore_index=True)
+
+    def memory_report(self):
+        """Per-column memory of everything held locally, for watching the process footprint"""
+        with self._lock:
+            frames = [frame for frame in self._frames.values() if len(frame)]
+        return memory_report(concat_frames(frames, ignore_index=True))
+
+
+@st.cache_resource
+def get_delta_sync(_conn, worksheet):
+    """Return the delta-synced copy of a worksheet shared by every session in this process"""
+    return DeltaSync(
+        _conn,
+        worksheet,
+        min_interval=float(storage_setting("delta_min_interval", DELTA_MIN_INTERVAL_SECONDS)),
+        reload_interval=float(storage_setting("delta_reload_interval", DELTA_RELOAD_INTERVAL_SECONDS)),
+        compact=worksheet in COMPACT_WORKSHEETS,
+    )
@@ -0,0 +1,262 @@
+# invoice_pdf.py
+import threading
+from collections import namedtuple
+
+from fpdf import FPDF
+
+# Company Details with ALLGEN TRADING logo
+COMPANY_NAME = "BIOLUME SKIN SCIENCE PRIVATE LIMITED"
+COMPANY_ADDRESS = """Ground Floor Rampal Awana Complex,
+Rampal Awana Complex, Indra Market,
+Sector-27, Atta, Noida, Gautam Buddha Nagar,
+Uttar Pradesh 201301
+GSTIN/UIN: 09AALCB9426H1ZA
+State Name: Uttar Pradesh, Code: 09
+"""
+COMPANY_LOGO = 'ALLGEN TRADING logo.png'
+BANK_DETAILS = """
+Disclaimer: This Proforma Invoice is for estimation purposes only and is not a demand for payment. 
+Prices, taxes, and availability are subject to change. Final billing may vary. 
+Goods/services will be delivered only after confirmation and payment. No legal obligation is created by this document.
+"""
+HSN_CODE = "3304"
+
+# Everything an invoice PDF shows besides its prices; picklable, so batch rendering can ship it to workers
+InvoiceDocument = namedtuple(
+    "InvoiceDocument",
+    ["invoice_number", "invoice_date", "transaction_type", "employee_name", "customer_name", "gst_number",
+     "contact_number", "address", "products", "quantities", "discounts", "payment_status", "amount_paid",
+     "distributor_firm_name", "distributor_id", "distributor_contact_person", "distributor_contact_number",
+     "distributor_territory"],
+)
+
+# Page state the recorded header was laid out in, and the state it leaves behind
+_START_STATE = ["draw_color", "fill_color", "text_color", "color_flag", "line_width", "underline", "k", "w", "l_margin", "r_margin"]
+_END_STATE = ["x", "y", "lasth", "font_family", "font_style", "font_size_pt", "font_size", "unifontsubset"]
+
+
+def _amount_text(value):
+    # Whole rupees print without a decimal point, whether the amount came in as 500, 500.0 or "500"
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+def _layout_header(pdf):
+    if COMPANY_LOGO:
+        try:
+            pdf.image(COMPANY_LOGO, 10, 8, 33)
+        except:
+            pass
+
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, COMPANY_NAME, ln=True, align='C')
+    pdf.set_font('Arial', '', 10)
+    pdf.multi_cell(0, 5, COMPANY_ADDRESS, align='C')
+
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, 'Proforma Invoice', ln=True, align='C')
+    pdf.line(10, 50, 200, 50)
+    pdf.ln(1)
+
+
+class InvoiceTemplate:
+    """The static parts of the invoice PDF, built once per process
+
+    Holds the decoded logo (fpdf 1.7 re-parses the PNG, alpha channel and all, for
+    every document otherwise, which is most of an invoice's render time) and the
+    header as recorded page-content operators with the fonts and image they refer to.
+    Only available on fpdf 1.7, whose pages are plain operator strings; with any
+    other fpdf (or cache=False) every document lays its header out from scratch.
+    """
+
+    def __init__(self, cache=True):
+        self.logo = None
+        self.pdf_version = None  # decoding a logo with transparency raises the document's PDF version
+        self.header = None  # (stream, fonts, start state, end state, font left selected)
+        if not cache or not hasattr(FPDF, "_parsepng"):
+            return
+        try:
+            parser = FPDF()
+            self.logo = parser._parsepng(COMPANY_LOGO) if COMPANY_LOGO else None
+            self.pdf_version = parser.pdf_version
+        except Exception:
+            self.logo = None
+
+        class Recorder(InvoicePDF):
+            def header(recorder):
+                start = len(recorder.pages[recorder.page])
+                state = {name: getattr(recorder, name) for name in _START_STATE}
+                _layout_header(recorder)
+                end_font = next(key for key, font in recorder.fonts.items() if font is recorder.current_font)
+                self.header = (
+                    recorder.pages[recorder.page][start:],
+                    [(key, dict(font)) for key, font in recorder.fonts.items()],
+                    state,
+                    {name: getattr(recorder, name) for name in _END_STATE},
+                    end_font,
+                )
+
+        recorder = Recorder(self)
+        try:
+            recorder.add_page()
+        except Exception:
+            self.header = None
+        if self.header is not None and not isinstance(self.header[0], str):
+            self.header = None
+
+    def replay_header(self, pdf):
+        """Write the recorded header onto pdf's current page; False when pdf's state does not match"""
+        if self.header is None:
+            return False
+        stream, fonts, start_state, end_state, end_font = self.header
+        if any(getattr(pdf, name) != value for name, value in start_state.items()):
+            return False
+        if self.logo is not None and pdf.images.get(COMPANY_LOGO, {}).get("i") != 1:
+            return False
+        # The stream names fonts /F1.. as the recorder numbered them; pdf must agree
+        for key, font in fonts:
+            existing = pdf.fonts.get(key)
+            if existing is None and len(pdf.fonts) + 1 != font["i"]:
+                return False
+            if existing is not None and existing["i"] != font["i"]:
+                return False
+        for key, font in fonts:
+            pdf.fonts.setdefault(key, dict(font))
+        pdf.pages[pdf.page] += stream
+        for name, value in end_state.items():
+            setattr(pdf, name, value)
+        pdf.current_font = pdf.fonts[end_font]
+        return True
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_invoice_template():
+    """Return this process's invoice template, building it on first use"""
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = InvoiceTemplate()
+        return _template
+
+
+class InvoicePDF(FPDF):
+    def __init__(self, template=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.template = template
+        if template is not None and template.logo is not None:
+            # A copy: output() deletes the image data from the document's entry once written
+            self.images[COMPANY_LOGO] = dict(template.logo, i=1)
+            self.pdf_version = max(self.pdf_version, template.pdf_version)
+
+    def header(self):
+        if self.template is None or not self.template.replay_header(self):
+            _layout_header(self)
+
+
+def render_invoice(document, pricing, template=None):
+    """Lay out an invoice PDF from its document fields and InvoicePricing; returns the FPDF object"""
+    pdf = InvoicePDF(template if template is not None else get_invoice_template())
+    pdf.alias_nb_pages()
+    pdf.add_page()
+
+    # Transaction Type
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, f"Transaction Type: {document.transaction_type.upper()}", ln=True)
+
+    # Sales Person
+    pdf.ln(0)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(0, 10, f"Sales Person: {document.employee_name}", ln=True, align='L')
+
+    # Distributor details if available
+    if document.distributor_firm_name:
+        pdf.cell(0, 10, f"Distributor: {document.distributor_firm_name} ({document.distributor_id})", ln=True, align='L')
+        pdf.cell(0, 10, f"Contact: {document.distributor_contact_person} | {document.distributor_contact_number}", ln=True, align='L')
+        pdf.cell(0, 10, f"Territory: {document.distributor_territory}", ln=True, align='L')
+
+    pdf.ln(5)
+
+    # Customer details
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "Bill To:", ln=True)
+    pdf.set_font("Arial", '', 10)
+    pdf.cell(100, 6, f"Name: {document.customer_name}")
+    pdf.cell(90, 6, f"Date: {document.invoice_date}", ln=True, align='R')
+    pdf.cell(100, 6, f"GSTIN/UN: {document.gst_number}")
+    pdf.cell(90, 6, f"Contact: {document.contact_number}", ln=True, align='R')
+    pdf.cell(100, 6, "Address: ", ln=True)
+    pdf.multi_cell(0, 6, document.address)
+    pdf.ln(1)
+
+    # Invoice number
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(0, 10, f"Invoice Number: {document.invoice_number}", ln=True)
+    pdf.ln(5)
+
+    # Table header
+    pdf.set_fill_color(200, 220, 255)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(10, 10, "S.No", border=1, align='C', fill=True)
+    pdf.cell(70, 10, "Product Name", border=1, align='C', fill=True)
+    pdf.cell(20, 10, "HSN/SAC", border=1, align='C', fill=True)
+    pdf.cell(20, 10, "Qty", border=1, align='C', fill=True)
+    pdf.cell(25, 10, "Rate (INR)", border=1, align='C', fill=True)
+    pdf.cell(25, 10, "Discount (%)", border=1, align='C', fill=True)
+    pdf.cell(25, 10, "Amount (INR)", border=1, align='C', fill=True)
+    pdf.ln()
+
+    # Table rows
+    pdf.set_font('Arial', '', 10)
+    lines = zip(document.products, document.quantities, document.discounts, pricing.unit_price, pricing.line_total)
+    for idx, (product, quantity, prod_discount, unit_price, item_total) in enumerate(lines):
+        pdf.cell(10, 8, str(idx + 1), border=1)
+        pdf.cell(70, 8, product, border=1)
+        pdf.cell(20, 8, HSN_CODE, border=1, align='C')
+        pdf.cell(20, 8, str(quantity), border=1, align='C')
+        pdf.cell(25, 8, f"{unit_price:.2f}", border=1, align='R')
+        pdf.cell(25, 8, f"{prod_discount:.2f}%", border=1, align='R')
+        pdf.cell(25, 8, f"{item_total:.2f}", border=1, align='R')
+        pdf.ln()
+
+    # Display totals
+    pdf.ln(10)
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(160, 10, "Subtotal", border=0, align='R')
+    pdf.cell(30, 10, f"{pricing.subtotal:.2f}", border=1, align='R')
+    pdf.ln()
+
+    pdf.cell(160, 10, "Taxable Amount", border=0, align='R')
+    pdf.cell(30, 10, f"{pricing.subtotal:.2f}", border=1, align='R')
+    pdf.ln()
+
+    pdf.cell(160, 10, "CGST (9%)", border=0, align='R')
+    pdf.cell(30, 10, f"{pricing.tax_total / 2:.2f}", border=1, align='R')
+    pdf.ln()
+
+    pdf.cell(160, 10, "SGST (9%)", border=0, align='R')
+    pdf.cell(30, 10, f"{pricing.tax_total / 2:.2f}", border=1, align='R')
+    pdf.ln()
+
+    pdf.cell(160, 10, "Grand Total", border=0, align='R')
+    pdf.cell(30, 10, f"{pricing.invoice_total:.2f} INR", border=1, align='R', fill=True)
+    pdf.ln(10)
+
+    # Payment Status
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, f"Payment Status: {document.payment_status.upper()}", ln=True)
+    if document.payment_status == "paid":
+        pdf.cell(0, 10, f"Amount Paid: {_amount_text(document.amount_paid)} INR", ln=True)
+    pdf.ln(10)
+
+    # Details
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "Details:", ln=True)
+    pdf.set_font("Arial", '', 10)
+    pdf.multi_cell(0, 5, BANK_DETAILS)
+    return pdf
@@ -0,0 +1,209 @@
+# invoice_summary.py
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from delta_sync import get_delta_sync
+from schemas import SHEET_DATE_FORMAT
+from storage import storage_setting
+from write_queue import get_write_queue
+
+INVOICE_SUMMARY_COLUMNS = [
+    "Invoice Number", "Invoice Date", "Outlet Name", "Grand Total", "Payment Status", "Delivery Status",
+]
+# Other processes' invoices and edits show up after at most this long
+INVOICE_SUMMARY_REFRESH_SECONDS = 300
+INVOICE_PAGE_SIZE = 25
+
+
+def _text(values):
+    return values.astype(object).where(values.notna(), "").astype(str)
+
+
+def _record_frame(frame):
+    """Normalise summary rows to INVOICE_SUMMARY_COLUMNS plus Employee Code and First Product"""
+    frame = frame.reset_index(drop=True)
+    dates = frame["Invoice Date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format=SHEET_DATE_FORMAT, errors="coerce")
+    return pd.DataFrame({
+        "Invoice Number": _text(frame["Invoice Number"]),
+        "Invoice Date": dates,
+        "Outlet Name": _text(frame["Outlet Name"]),
+        "Grand Total": pd.to_numeric(frame["Grand Total"], errors="coerce").astype("float64"),
+        "Payment Status": _text(frame["Payment Status"]),
+        "Delivery Status": _text(frame["Delivery Status"]),
+        "Employee Code": _text(frame["Employee Code"]),
+        "First Product": _text(frame["First Product"]),
+    })
+
+
+def summarise_lines(lines):
+    """One summary row per invoice from denormalised Sales rows (the old per-rerun groupby)"""
+    lines = lines.assign(**{"Grand Total": pd.to_numeric(lines["Grand Total"], errors="coerce")})
+    grouped = lines.groupby("Invoice Number", sort=False, observed=True)
+    summary = grouped.agg(**{
+        "Invoice Date": ("Invoice Date", "first"),
+        "Outlet Name": ("Outlet Name", "first"),
+        "Grand Total": ("Grand Total", "sum"),
+        "Payment Status": ("Payment Status", "first"),
+        "Delivery Status": ("Delivery Status", "first"),
+        "Employee Code": ("Employee Code", "first"),
+        "First Product": ("Product Name", "first"),
+    }).reset_index()
+    return _record_frame(summary)
+
+
+def summarise_invoices(headers, lines):
+    """Summary rows from the Invoices header table; lines only supply each invoice's delivery status"""
+    first_lines = lines.drop_duplicates(subset=["Invoice Number"], keep="first").set_index("Invoice Number")
+    headers = headers.drop_duplicates(subset=["Invoice Number"], keep="last")
+    number = headers["Invoice Number"]
+    summary = headers.assign(**{
+        "Grand Total": headers["Invoice Total"],
+        "Delivery Status": number.map(first_lines["Delivery Status"]).to_numpy(),
+        "First Product": number.map(first_lines["Product Name"]).to_numpy(),
+    })
+    return _record_frame(summary)
+
+
+class InvoiceSummary:
+    """Materialised per-invoice summary of the Sales History tab, kept per employee
+
+    Built from the Invoices header table (with each invoice's first line for its delivery
+    status) plus one grouped pass over the legacy Sales rows, then kept current by
+    record() and set_delivery_status() as this process writes. Edits made by other
+    processes arrive with a background rebuild every refresh_interval seconds. page()
+    filters and slices one employee's invoices, newest first, so a history page costs
+    the same however many line items the employee has.
+    """
+
+    def __init__(self, conn, refresh_interval=INVOICE_SUMMARY_REFRESH_SECONDS):
+        self.conn = conn
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._records = None   # invoice number -> summary row (dict)
+        self._frames = {}      # employee code -> summary DataFrame, newest first
+        self._built_at = 0.0
+        self._changes = None   # invoice number -> row written while a rebuild is running
+        self.last_error = None
+
+    def _read(self, worksheet):
+        queue = get_write_queue(self.conn)
+        return queue.with_pending(worksheet, get_delta_sync(self.conn, worksheet).read())
+
+    def _load(self):
+        frames = []
+        legacy = self._read("Sales")
+        if not legacy.empty:
+            frames.append(summarise_lines(legacy))
+        # Sheets nothing has been written to yet (or whose rows are still queued) read as empty
+        headers = self._read("Invoices")
+        if not headers.empty:
+            lines = self._read("SalesLines")
+            if lines.empty:
+                lines = pd.DataFrame(columns=["Invoice Number", "Product Name", "Delivery Status"])
+            frames.append(summarise_invoices(headers, lines))
+        records = {}
+        for frame in frames:
+            for row in frame.to_dict("records"):
+                records[row["Invoice Number"]] = row
+        return records
+
+    def rebuild(self):
+        """Reload every invoice from the sheets, keeping rows this process writes meanwhile"""
+        with self._build_lock:
+            with self._lock:
+                self._changes = {}
+            try:
+                records = self._load()
+            except Exception:
+                with self._lock:
+                    self._changes = None
+                raise
+            with self._lock:
+                records.update(self._changes)
+                self._changes = None
+                self._records = records
+                self._frames = {}
+                self._built_at = time.monotonic()
+
+    def _refresh(self):
+        try:
+            self.rebuild()
+            self.last_error = None
+        except Exception as e:
+            # The previous summary keeps being served; the next page() tries again
+            self.last_error = str(e)
+            with self._lock:
+                self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        if self._records is None:
+            self.rebuild()
+            return
+        with self._lock:
+            due = time.monotonic() - self._built_at >= self.refresh_interval
+            if due:
+                self._built_at = time.monotonic()  # one background rebuild at a time
+        if due:
+            threading.Thread(target=self._refresh, name="invoice-summary", daemon=True).start()
+
+    def _put(self, rows):
+        with self._lock:
+            for row in rows:
+                if self._records is not None:
+                    self._records[row["Invoice Number"]] = row
+                if self._changes is not None:
+                    self._changes[row["Invoice Number"]] = row
+                self._frames.pop(row["Employee Code"], None)
+
+    def record(self, headers, lines):
+        """Add invoices just written as header and line rows"""
+        self._put(summarise_invoices(headers, lines).to_dict("records"))
+
+    def set_delivery_status(self, invoice_number, status, product_name=None):
+        """Reflect a delivery-status write; a single-line write only shows if it is the invoice's first line"""
+        with self._lock:
+            row = (self._records or {}).get(str(invoice_number))
+        if row is None or (product_name is not None and row["First Product"] != str(product_name)):
+            return
+        self._put([dict(row, **{"Delivery Status": status})])
+
+    def _employee_frame(self, employee_code):
+        with self._lock:
+            frame = self._frames.get(employee_code)
+            if frame is None:
+                rows = [row for row in self._records.values() if row["Employee Code"] == employee_code]
+                frame = pd.DataFrame(rows, columns=INVOICE_SUMMARY_COLUMNS + ["Employee Code", "First Product"])
+                frame["Invoice Date"] = pd.to_datetime(frame["Invoice Date"])
+                # Invoices without a readable date cannot be opened from the history tab
+                frame = frame[frame["Invoice Date"].notna()].sort_values(["Invoice Date", "Invoice Number"], ascending=False, ignore_index=True)
+                self._frames[employee_code] = frame
+        return frame
+
+    def page(self, employee_code, page=1, page_size=INVOICE_PAGE_SIZE, invoice_number=None,
+             invoice_date=None, outlet_name=None):
+        """Return (one page of an employee's invoices, number of matching invoices)"""
+        self._ensure_built()
+        frame = self._employee_frame(str(employee_code))
+        if invoice_number:
+            frame = frame[frame["Invoice Number"].str.contains(invoice_number, case=False, regex=False)]
+        if invoice_date:
+            frame = frame[frame["Invoice Date"].dt.normalize() == pd.Timestamp(invoice_date)]
+        if outlet_name:
+            frame = frame[frame["Outlet Name"].str.contains(outlet_name, case=False, regex=False)]
+        start = (max(int(page), 1) - 1) * page_size
+        return frame.iloc[start:start + page_size][INVOICE_SUMMARY_COLUMNS].reset_index(drop=True), len(frame)
+
+
+@st.cache_resource
+def get_invoice_summary(_conn):
+    """Return the invoice summary shared by every session in this process"""
+    return InvoiceSummary(
+        _conn,
+        refresh_interval=float(storage_setting("invoice_summary_refresh_seconds", INVOICE_SUMMARY_REFRESH_SECONDS)),
+    )
@@ -2,7 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
-from streamlit_gsheets import GSheetsConnection
+from delta_sync import get_delta_sync
+from sheet_cache import project_frame
+from storage import get_connection
 
 # Set page config
 st.set_page_config(page_title="Admin Dashboard", layout="wide")
@@ -20,10 +22,12 @@ st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
 # Constants
 LOCATION_TRACKING_SHEET = "LocationTracking"
+MAP_COLUMNS = ["Employee Name", "Date", "Time", "Latitude", "Longitude", "Address", "Accuracy (m)"]
+ANALYTICS_COLUMNS = ["Date", "Employee Name"]
 ADMIN_PASSWORD = "admin123"  # Change this to a more secure password
 
 # Establish connection
-conn = st.connection("gsheets", type=GSheetsConnection)
+conn = get_connection()
 
 def authenticate_admin():
     if 'admin_authenticated' not in st.session_state:
@@ -42,28 +46,45 @@ def authenticate_admin():
         return False
     return True
 
-def get_location_data():
+def get_location_data(columns=None, where=None, start_date=None, end_date=None):
+    """Load location rows in the date range, keeping only the given columns and rows matching `where`"""
     try:
-        data = conn.read(worksheet=LOCATION_TRACKING_SHEET, ttl=5)
+        # Each refresh fetches only rows added since the last one, from the partitions overlapping the dates
+        data = get_delta_sync(conn, LOCATION_TRACKING_SHEET).read(start_date, end_date)
+        if data.empty:
+            return pd.DataFrame(columns=columns)
+        data = project_frame(data, where=where)
+        if (start_date is not None or end_date is not None) and 'Date' in data.columns:
+            # Partitions are whole months; trim to the days asked for
+            dates = pd.to_datetime(data['Date'], dayfirst=True, errors='coerce').dt.normalize()
+            keep = pd.Series(True, index=data.index)
+            if start_date is not None:
+                keep &= dates >= pd.Timestamp(start_date)
+            if end_date is not None:
+                keep &= dates <= pd.Timestamp(end_date)
+            data = data[keep]
+        if columns is not None:
+            data = data[list(columns)]
         data = data.dropna(how="all")
         
         # Convert columns to proper types
-        data['Date'] = pd.to_datetime(data['Date'], dayfirst=True)
-        data['Time'] = pd.to_datetime(data['Time'], format='%H:%M:%S').dt.time
-        data['Latitude'] = pd.to_numeric(data['Latitude'], errors='coerce')
-        data['Longitude'] = pd.to_numeric(data['Longitude'], errors='coerce')
+        if 'Date' in data.columns:
+            data['Date'] = pd.to_datetime(data['Date'], dayfirst=True)
+        if 'Time' in data.columns:
+            data['Time'] = pd.to_datetime(data['Time'], format='%H:%M:%S').dt.time
+        for col in ['Latitude', 'Longitude']:
+            if col in data.columns:
+                data[col] = pd.to_numeric(data[col], errors='coerce')
         
         return data
     except Exception as e:
         st.error(f"Error loading location data: {e}")
         return pd.DataFrame()
 
-def display_location_map(data):
+def display_location_map(active_data):
+    """Plot rows already filtered to active employees"""
     st.subheader("Employee Locations")
     
-    # Filter active employees
-    active_data = data[data['Status'] == 'active']
-    
     if not active_data.empty:
         # Create map
         fig = px.scatter_mapbox(
@@ -83,22 +104,31 @@ def display_location_map(data):
     else:
         st.warning("No active location data available")
 
-def display_location_history(data):
+def display_location_history():
     st.subheader("Location History")
     
     col1, col2, col3 = st.columns(3)
-    with col1:
-        employee_filter = st.multiselect(
-            "Filter by Employee",
-            options=data['Employee Name'].unique(),
-            default=data['Employee Name'].unique()
-        )
     with col2:
         date_filter = st.date_input(
             "Filter by Date",
             value=[datetime.now().date() - timedelta(days=7), datetime.now().date()],
             max_value=datetime.now().date()
         )
+    if len(date_filter) != 2:
+        st.info("Select a start and end date")
+        return
+    
+    data = get_location_data(start_date=date_filter[0], end_date=date_filter[1])
+    if data.empty:
+        st.warning("No location data available")
+        return
+    
+    with col1:
+        employee_filter = st.multiselect(
+            "Filter by Employee",
+            options=data['Employee Name'].unique(),
+            default=data['Employee Name'].unique()
+        )
     with col3:
         status_filter = st.multiselect(
             "Filter by Status",
@@ -134,6 +164,10 @@ def display_location_history(data):
 def display_analytics(data):
     st.subheader("Analytics")
     
+    if data.empty:
+        st.warning("No location data available")
+        return
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -153,21 +187,16 @@ def main():
     
     st.title("Admin Dashboard - Location Tracking")
     
-    data = get_location_data()
-    if data.empty:
-        st.warning("No location data available")
-        return
-    
     tab1, tab2, tab3 = st.tabs(["Live Tracking", "History", "Analytics"])
     
     with tab1:
-        display_location_map(data)
+        display_location_map(get_location_data(columns=MAP_COLUMNS, where={"Status": "active"}))
     
     with tab2:
-        display_location_history(data)
+        display_location_history()
     
     with tab3:
-        display_analytics(data)
+        display_analytics(get_location_data(columns=ANALYTICS_COLUMNS))
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,5 @@
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import pandas as pd
-from fpdf import FPDF
 from datetime import datetime, time
 import os
 import uuid
@@ -9,8 +7,21 @@ from PIL import Image
 from datetime import datetime, time, timedelta
 import pytz
 
-# Initialize Google Sheets connection
-conn = st.connection("gsheets", type=GSheetsConnection)
+from resilience import CircuitOpenError
+from storage import LOAD_TIMEOUT_SECONDS, ConflictError, get_connection, load_worksheets, storage_setting
+from write_queue import append_or_enqueue, get_write_queue
+from delta_sync import get_delta_sync
+from sheet_index import get_attendance_index
+from reference_data import SheetReferenceLoader
+from sales_tables import invoice_lines, log_invoice, patch_sales_lines, read_sales_view
+from invoice_summary import INVOICE_PAGE_SIZE, get_invoice_summary
+from pricing import price_invoice
+from invoice_pdf import InvoiceDocument, render_invoice
+from batch_invoices import invoice_jobs, render_invoices_zip, select_invoices
+from snapshots import get_snapshot_store
+
+# Initialize the storage connection (Google Sheets unless configured otherwise)
+conn = get_connection()
 
 def get_ist_time():
     """Get current time in Indian Standard Time (IST)"""
@@ -64,41 +75,33 @@ hide_footer_style = """
 """
 st.markdown(hide_footer_style, unsafe_allow_html=True)
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
 def load_gsheet_data():
-    """Load all required data from Google Sheets"""
-    try:
-        # Load data from Google Sheets
-        Products = conn.read(worksheet="Products", ttl=5)
-        Outlet = conn.read(worksheet="Outlet", ttl=5)
-        Person = conn.read(worksheet="Person", ttl=5)
-        Distributors = conn.read(worksheet="Distributors", ttl=5)
-        
-        # Clean data
-        dfs = [Products, Outlet, Person, Distributors]
-        for df in dfs:
-            # First drop completely empty rows
-            df.dropna(how='all', inplace=True)
-            
-            # Create a dictionary to hold fill values for each column
-            fill_values = {}
-            for col in df.columns:
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    fill_values[col] = 0  # Fill numeric columns with 0
-                else:
-                    fill_values[col] = ''  # Fill non-numeric with empty string
-            
-            # Fill all NA values at once using the dictionary
-            df.fillna(value=fill_values, inplace=True)
-        
-        return Products, Outlet, Person, Distributors
-    except Exception as e:
-        st.error(f"Error loading data from Google Sheets: {e}")
-        # Return empty DataFrames with expected columns
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    """Load all required data, from the local snapshots when there are any"""
+    worksheets = ["Products", "Outlet", "Person", "Distributors"]
+    # Snapshots are served at once and refreshed from Google Sheets in the background;
+    # sheets without one are fetched concurrently, so a slow sheet only delays itself
+    frames, errors = load_worksheets(
+        get_snapshot_store(conn).read, worksheets,
+        timeout=float(storage_setting("load_timeout", LOAD_TIMEOUT_SECONDS)),
+    )
+    for worksheet, error in errors.items():
+        st.error(f"Error loading {worksheet} from Google Sheets: {error}")
+    # A sheet that failed comes back empty
+    return tuple(frames.get(worksheet, pd.DataFrame()) for worksheet in worksheets)
+
+@st.cache_resource
+def get_reference_loader():
+    """Reference loader shared by every session; reloads only when the sheets change"""
+    loader = SheetReferenceLoader(conn, load_gsheet_data)
+    get_snapshot_store(conn).add_refresh_listener(lambda worksheet: loader.invalidate())
+    return loader
 
 # Load the data
-Products, Outlet, Person, Distributors = load_gsheet_data()
+REFERENCE = get_reference_loader().get()
+Products = REFERENCE.products
+Outlet = REFERENCE.outlets
+Person = REFERENCE.persons
+Distributors = REFERENCE.distributors
 
 # Validate data was loaded correctly
 if Products.empty or Outlet.empty or Person.empty or Distributors.empty:
@@ -115,6 +118,7 @@ SALES_SHEET_COLUMNS = [
     "Discount Category",
     "Transaction Type",
     "Outlet Name",
+    "GST Number",
     "Outlet Contact",
     "Outlet Address",
     "Outlet State",
@@ -262,47 +266,12 @@ PRIORITY_LEVELS = ["Low", "Medium", "High", "Critical"]
 TRAVEL_MODES = ["Bus", "Train", "Flight", "Taxi", "Other"]
 REQUEST_TYPES = ["Hotel", "Travel", "Travel & Hotel"]
 
-# Company Details
-company_name = "BIOLUME SKIN SCIENCE PRIVATE LIMITED"
-company_address = """Ground Floor Rampal Awana Complex,
-Rampal Awana Complex, Indra Market,
-Sector-27, Atta, Noida, Gautam Buddha Nagar,
-Uttar Pradesh 201301
-GSTIN/UIN: 09AALCB9426H1ZA
-State Name: Uttar Pradesh, Code: 09
-"""
-company_logo = 'ALLGEN TRADING logo.png'
-bank_details = """
-Disclaimer: This Proforma Invoice is for estimation purposes only and is not a demand for payment. 
-Prices, taxes, and availability are subject to change. Final billing may vary. 
-Goods/services will be delivered only after confirmation and payment. No legal obligation is created by this document.
-"""
-
 # Create directories for storing uploads
 os.makedirs("employee_selfies", exist_ok=True)
 os.makedirs("payment_receipts", exist_ok=True)
 os.makedirs("invoices", exist_ok=True)
 os.makedirs("visit_selfies", exist_ok=True)
 
-# Custom PDF class (same as original)
-class PDF(FPDF):
-    def header(self):
-        if company_logo:
-            try:
-                self.image(company_logo, 10, 8, 33)
-            except:
-                pass
-        
-        self.set_font('Arial', 'B', 16)
-        self.cell(0, 10, company_name, ln=True, align='C')
-        self.set_font('Arial', '', 10)
-        self.multi_cell(0, 5, company_address, align='C')
-        
-        self.set_font('Arial', 'B', 14)
-        self.cell(0, 10, 'Proforma Invoice', ln=True, align='C')
-        self.line(10, 50, 200, 50)
-        self.ln(1)
-
 # Helper functions (same as original but with Google Sheets integration)
 def generate_invoice_number():
     return f"INV-{get_ist_time().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
@@ -343,137 +312,104 @@ def validate_data_before_write(df, expected_columns):
     return True
 
 def backup_sheet(conn, worksheet_name):
-    """Create a timestamped backup of the worksheet"""
+    """Take a full backup of the worksheet and its monthly partitions
+
+    Every write is already recorded as it happens; this only starts a fresh base.
+    """
     try:
-        data = conn.read(worksheet=worksheet_name, ttl=1)
-        timestamp = get_ist_time().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"{worksheet_name}_backup_{timestamp}"
-        conn.update(worksheet=backup_name, data=data)
+        for sheet in conn.partitions(worksheet_name, refresh=True):
+            conn.backup(sheet)
     except Exception as e:
         st.error(f"Warning: Failed to create backup - {str(e)}")
 
-def attempt_data_recovery(conn, worksheet_name):
-    """Attempt to recover from the most recent backup"""
+def attempt_data_recovery(conn, worksheet_name, restore_to=None):
+    """Restore the worksheet as of restore_to (default: the latest backup)"""
     try:
-        # Get list of all worksheets
-        all_sheets = conn.list_worksheets()
-        backups = [s for s in all_sheets if s.startswith(f"{worksheet_name}_backup")]
-        
-        if backups:
-            # Sort backups by timestamp (newest first)
-            backups.sort(reverse=True)
-            latest_backup = backups[0]
-            
-            # Restore from backup
-            backup_data = conn.read(worksheet=latest_backup)
-            conn.update(worksheet=worksheet_name, data=backup_data)
-            return True
+        # Each partition is restored on its own, refused if someone writes to it meanwhile
+        restored = [conn.restore(sheet, restore_to) for sheet in conn.partitions(worksheet_name, refresh=True)]
+        return any(restored)
+    except ConflictError:
+        st.error("Recovery skipped: the sheet was changed by another user")
         return False
     except Exception as e:
         st.error(f"Recovery failed: {str(e)}")
         return False
 
 def safe_sheet_operation(operation, *args, **kwargs):
-    """Wrapper for safe sheet operations with retry logic"""
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            return operation(*args, **kwargs)
-        except Exception as e:
-            if attempt == max_retries - 1:
-                st.error(f"Operation failed after {max_retries} attempts: {str(e)}")
-                if "Sales" in str(args) or "Visits" in str(args) or "Attendance" in str(args):
-                    worksheet_name = [a for a in args if isinstance(a, str) and ("Sales" in a or "Visits" in a or "Attendance" in a)][0]
-                    if attempt_data_recovery(conn, worksheet_name):
-                        st.success("Data recovery attempted from backup")
-                raise
-            time.sleep(1 * (attempt + 1))  # Exponential backoff
+    """Run a sheet operation, reporting failures to the user
+
+    Retries and circuit breaking happen in the storage layer, so nothing sleeps here, and
+    a failure never restores a backup on its own; use attempt_data_recovery deliberately.
+    """
+    try:
+        return operation(*args, **kwargs)
+    except CircuitOpenError as e:
+        st.error(f"Google Sheets is temporarily unavailable: {str(e)}")
+        raise
+    except Exception as e:
+        st.error(f"Operation failed: {str(e)}")
+        raise
 
 # Data logging functions updated for Google Sheets
 def log_sales_to_gsheet(conn, sales_data):
     try:
-        # Read all existing data first
-        existing_sales_data = conn.read(worksheet="Sales", ttl=5)
-        existing_sales_data = existing_sales_data.dropna(how="all")
-        
         # Ensure columns match
         sales_data = sales_data.reindex(columns=SALES_SHEET_COLUMNS)
         
-        # Concatenate and drop any potential duplicates
-        updated_sales_data = pd.concat([existing_sales_data, sales_data], ignore_index=True)
-        updated_sales_data = updated_sales_data.drop_duplicates(subset=["Invoice Number", "Product Name"], keep="last")
+        # Drop any potential duplicates within the new invoice
+        sales_data = sales_data.drop_duplicates(subset=["Invoice Number", "Product Name"], keep="last")
         
-        # Write back all data
-        conn.update(worksheet="Sales", data=updated_sales_data)
-        st.success("Sales data successfully logged to Google Sheets!")
+        # One header row plus the line items, instead of repeating the header on every line
+        log_invoice(conn, sales_data)
+        st.success("Sales data recorded and queued for Google Sheets!")
     except Exception as e:
         st.error(f"Error logging sales data: {e}")
         st.stop()
 
 def log_visit_to_gsheet(conn, visit_data):
     try:
-        existing_visit_data = conn.read(worksheet="Visits", ttl=5)
-        existing_visit_data = existing_visit_data.dropna(how="all")
-        
         visit_data = visit_data.reindex(columns=VISIT_SHEET_COLUMNS)
+        visit_data = visit_data.drop_duplicates(subset=["Visit ID"], keep="last")
         
-        updated_visit_data = pd.concat([existing_visit_data, visit_data], ignore_index=True)
-        updated_visit_data = updated_visit_data.drop_duplicates(subset=["Visit ID"], keep="last")
-        
-        conn.update(worksheet="Visits", data=updated_visit_data)
-        st.success("Visit data successfully logged to Google Sheets!")
+        get_write_queue(conn).enqueue("Visits", visit_data)
+        st.success("Visit data recorded and queued for Google Sheets!")
     except Exception as e:
         st.error(f"Error logging visit data: {e}")
         st.stop()
 
 def log_attendance_to_gsheet(conn, attendance_data):
     try:
-        existing_data = conn.read(worksheet="Attendance", ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        
         attendance_data = attendance_data.reindex(columns=ATTENDANCE_SHEET_COLUMNS)
+        attendance_data = attendance_data.drop_duplicates(subset=["Attendance ID"], keep="last")
         
-        updated_data = pd.concat([existing_data, attendance_data], ignore_index=True)
-        updated_data = updated_data.drop_duplicates(subset=["Attendance ID"], keep="last")
-        
-        conn.update(worksheet="Attendance", data=updated_data)
+        get_write_queue(conn).enqueue("Attendance", attendance_data)
         return True, None
     except Exception as e:
         return False, str(e)
 
 def log_ticket_to_gsheet(conn, ticket_data):
     try:
-        existing_data = conn.read(worksheet="Tickets", usecols=list(range(len(TICKET_SHEET_COLUMNS))), ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        updated_data = pd.concat([existing_data, ticket_data], ignore_index=True)
-        conn.update(worksheet="Tickets", data=updated_data)
+        append_or_enqueue(conn, "Tickets", ticket_data, columns=TICKET_SHEET_COLUMNS)
         return True, None
     except Exception as e:
         return False, str(e)
 
 def log_travel_hotel_request(conn, request_data):
     try:
-        existing_data = conn.read(worksheet="TravelHotelRequests", usecols=list(range(len(TRAVEL_HOTEL_COLUMNS))), ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        updated_data = pd.concat([existing_data, request_data], ignore_index=True)
-        conn.update(worksheet="TravelHotelRequests", data=updated_data)
+        append_or_enqueue(conn, "TravelHotelRequests", request_data, columns=TRAVEL_HOTEL_COLUMNS)
         return True, None
     except Exception as e:
         return False, str(e)
 
 def update_delivery_status(conn, invoice_number, product_name, new_status):
     try:
-        # Read all existing data
-        sales_data = conn.read(worksheet="Sales", ttl=5)
-        sales_data = sales_data.dropna(how="all")
-        
-        # Update the delivery status for the specific record
-        mask = (sales_data['Invoice Number'] == invoice_number) & (sales_data['Product Name'] == product_name)
-        sales_data.loc[mask, 'Delivery Status'] = new_status
-        
-        # Write back the updated data
-        conn.update(worksheet="Sales", data=sales_data)
-        return True
+        # Update only the Delivery Status cells of this invoice line
+        success, error = patch_sales_lines(
+            conn, invoice_number, {"Delivery Status": new_status}, product_name=product_name
+        )
+        if not success:
+            st.error(f"Error updating delivery status: {error}")
+        return success
     except Exception as e:
         st.error(f"Error updating delivery status: {e}")
         return False
@@ -481,10 +417,9 @@ def update_delivery_status(conn, invoice_number, product_name, new_status):
 # Authentication function
 def authenticate_employee(employee_name, passkey):
     try:
-        employee_row = Person[Person['Employee Name'] == employee_name]
-        if not employee_row.empty:
-            employee_code = employee_row['Employee Code'].values[0]
-            return str(passkey) == str(employee_code)
+        employee = REFERENCE.find_employee(employee_name)
+        if employee is not None:
+            return str(passkey) == str(employee.code)
         return False
     except Exception as e:
         st.error(f"Authentication error: {e}")
@@ -492,21 +427,10 @@ def authenticate_employee(employee_name, passkey):
 
 def check_existing_attendance(employee_name):
     try:
-        existing_data = conn.read(worksheet="Attendance", usecols=list(range(len(ATTENDANCE_SHEET_COLUMNS))), ttl=5)
-        existing_data = existing_data.dropna(how="all")
-        
-        if existing_data.empty:
-            return False
-        
         current_date = get_ist_time().strftime("%d-%m-%Y")
-        employee_code = Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0]
-        
-        existing_records = existing_data[
-            (existing_data['Employee Code'] == employee_code) & 
-            (existing_data['Date'] == current_date)
-        ]
+        employee_code = REFERENCE.employee(employee_name).code
         
-        return not existing_records.empty
+        return get_attendance_index(conn).confirm(current_date, employee_code, get_write_queue(conn)) is not None
         
     except Exception as e:
         st.error(f"Error checking existing attendance: {str(e)}")
@@ -523,7 +447,7 @@ def demo_page():
         st.subheader("Partner Employee")
         partner_employee = st.selectbox(
             "Select Partner Employee", 
-            [name for name in Person['Employee Name'].tolist() if name != selected_employee],
+            [name for name in REFERENCE.employee_names if name != selected_employee],
             key="partner_employee"
         )
 
@@ -531,15 +455,15 @@ def demo_page():
         outlet_option = st.radio("Outlet Selection", ["Enter manually", "Select from list"], key="demo_outlet_option")
         
         if outlet_option == "Select from list":
-            outlet_names = Outlet['Shop Name'].tolist()
+            outlet_names = REFERENCE.outlet_names
             selected_outlet = st.selectbox("Select Outlet", outlet_names, key="demo_outlet_select")
-            outlet_details = Outlet[Outlet['Shop Name'] == selected_outlet].iloc[0]
+            outlet_details = REFERENCE.outlet(selected_outlet)
             
             outlet_name = selected_outlet
-            outlet_contact = outlet_details['Contact']
-            outlet_address = outlet_details['Address']
-            outlet_state = outlet_details['State']
-            outlet_city = outlet_details['City']
+            outlet_contact = outlet_details.contact
+            outlet_address = outlet_details.address
+            outlet_state = outlet_details.state
+            outlet_city = outlet_details.city
             
             st.text_input("Outlet Contact", value=outlet_contact, disabled=True, key="demo_outlet_contact_display")
             st.text_input("Outlet Address", value=outlet_address, disabled=True, key="demo_outlet_address_display")
@@ -565,7 +489,7 @@ def demo_page():
             check_out_time = st.time_input("Check-out Time", value=None, key="demo_check_out_time")
 
         st.subheader("Product Demonstration")
-        product_names = Products['Product Name'].tolist()
+        product_names = REFERENCE.product_names
         selected_products = st.multiselect("Select Products Demonstrated", product_names, key="demo_product_selection")
 
         quantities = []
@@ -603,14 +527,14 @@ def demo_page():
                 demo_id = f"DEMO-{current_datetime.strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
                 
                 # Get partner employee code
-                partner_employee_code = Person[Person['Employee Name'] == partner_employee]['Employee Code'].values[0]
+                partner_employee_code = REFERENCE.employee(partner_employee).code
                 
                 # Prepare demo data with proper data types
                 demo_data = {
                     "Demo ID": demo_id,
                     "Employee Name": selected_employee,
-                    "Employee Code": Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0],
-                    "Designation": Person[Person['Employee Name'] == selected_employee]['Designation'].values[0],
+                    "Employee Code": REFERENCE.employee(selected_employee).code,
+                    "Designation": REFERENCE.employee(selected_employee).designation,
                     "Partner Employee": partner_employee,
                     "Partner Employee Code": partner_employee_code,
                     "Outlet Name": outlet_name,
@@ -632,17 +556,11 @@ def demo_page():
                 
                 # Log to Google Sheets
                 try:
-                    existing_data = conn.read(worksheet="Demos", usecols=list(range(len(DEMO_SHEET_COLUMNS))), ttl=5)
-                    existing_data = existing_data.dropna(how="all")
-                    
                     # Convert to DataFrame with correct column order
                     demo_df = pd.DataFrame([demo_data], columns=DEMO_SHEET_COLUMNS)
                     
-                    # Concatenate with existing data
-                    updated_data = pd.concat([existing_data, demo_df], ignore_index=True)
-                    
-                    # Write to Google Sheets
-                    conn.update(worksheet="Demos", data=updated_data)
+                    # Append the new row to Google Sheets
+                    append_or_enqueue(conn, "Demos", demo_df)
                     
                     st.success(f"Demo {demo_id} recorded successfully!")
                     st.balloons()
@@ -654,17 +572,16 @@ def demo_page():
     with tab2:
         st.subheader("Demo History")
         
-        @st.cache_data(ttl=300)
         def load_demo_data():
             try:
-                demo_data = conn.read(worksheet="Demos", usecols=list(range(len(DEMO_SHEET_COLUMNS))), ttl=5)
+                demo_data = get_delta_sync(conn, "Demos").read().reindex(columns=DEMO_SHEET_COLUMNS)
                 demo_data = demo_data.dropna(how='all')
                 
                 # Convert Demo Date to datetime
                 demo_data['Demo Date'] = pd.to_datetime(demo_data['Demo Date'], dayfirst=True, errors='coerce')
                 
                 # Filter for current employee
-                employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
+                employee_code = REFERENCE.employee(selected_employee).code
                 filtered_data = demo_data[demo_data['Employee Code'] == employee_code]
                 
                 return filtered_data.sort_values('Demo Date', ascending=False)
@@ -785,8 +702,8 @@ def demo_page():
 def support_ticket_page():
     st.title("Support Ticket Management")
     selected_employee = st.session_state.employee_name
-    employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
-    designation = Person[Person['Employee Name'] == selected_employee]['Designation'].values[0]
+    employee_code = REFERENCE.employee(selected_employee).code
+    designation = REFERENCE.employee(selected_employee).designation
     
     tab1, tab2 = st.tabs(["Raise New Ticket", "My Support Requests"])
     
@@ -891,7 +808,7 @@ def support_ticket_page():
     with tab2:
         st.subheader("My Support Tickets")
         try:
-            tickets_data = conn.read(worksheet="Tickets", usecols=list(range(len(TICKET_SHEET_COLUMNS))), ttl=5)
+            tickets_data = get_delta_sync(conn, "Tickets").read().reindex(columns=TICKET_SHEET_COLUMNS)
             tickets_data = tickets_data.dropna(how="all")
             
             if not tickets_data.empty:
@@ -992,8 +909,8 @@ def support_ticket_page():
 def travel_hotel_page():
     st.title("Travel & Hotel Booking")
     selected_employee = st.session_state.employee_name
-    employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
-    designation = Person[Person['Employee Name'] == selected_employee]['Designation'].values[0]
+    employee_code = REFERENCE.employee(selected_employee).code
+    designation = REFERENCE.employee(selected_employee).designation
     
     tab1, tab2, tab3 = st.tabs(["Travel Request", "Hotel Booking Request", "My Booking Requests"])
     
@@ -1187,7 +1104,7 @@ def travel_hotel_page():
     with tab3:
         st.subheader("My Travel & Hotel Requests")
         try:
-            requests_data = conn.read(worksheet="TravelHotelRequests", usecols=list(range(len(TRAVEL_HOTEL_COLUMNS))), ttl=5)
+            requests_data = get_delta_sync(conn, "TravelHotelRequests").read().reindex(columns=TRAVEL_HOTEL_COLUMNS)
             requests_data = requests_data.dropna(how="all")
             
             if not requests_data.empty:
@@ -1286,190 +1203,73 @@ def travel_hotel_page():
 def generate_invoice(customer_name, gst_number, contact_number, address, state, city, selected_products, quantities, product_discounts,
                     discount_category, employee_name, payment_status, amount_paid, employee_selfie_path, payment_receipt_path, invoice_number,
                     transaction_type, distributor_firm_name="", distributor_id="", distributor_contact_person="",
-                    distributor_contact_number="", distributor_email="", distributor_territory="", remarks="", invoice_date=None):
-    pdf = PDF()
-    pdf.alias_nb_pages()
-    pdf.add_page()
+                    distributor_contact_number="", distributor_email="", distributor_territory="", remarks="", invoice_date=None,
+                    pricing=None):
     current_date = invoice_date if invoice_date else get_ist_time().strftime("%d-%m-%Y")  # Use provided date or current date
 
-
-    # Transaction Type
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, f"Transaction Type: {transaction_type.upper()}", ln=True)
-    
-    # Sales Person
-    pdf.ln(0)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(0, 10, f"Sales Person: {employee_name}", ln=True, align='L')
-    
-    # Distributor details if available
-    if distributor_firm_name:
-        pdf.cell(0, 10, f"Distributor: {distributor_firm_name} ({distributor_id})", ln=True, align='L')
-        pdf.cell(0, 10, f"Contact: {distributor_contact_person} | {distributor_contact_number}", ln=True, align='L')
-        pdf.cell(0, 10, f"Territory: {distributor_territory}", ln=True, align='L')
-    
-    pdf.ln(5)
-
-    # Customer details
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Bill To:", ln=True)
-    pdf.set_font("Arial", '', 10)
-    pdf.cell(100, 6, f"Name: {customer_name}")
-    pdf.cell(90, 6, f"Date: {current_date}", ln=True, align='R')
-    pdf.cell(100, 6, f"GSTIN/UN: {gst_number}")
-    pdf.cell(90, 6, f"Contact: {contact_number}", ln=True, align='R')
-    pdf.cell(100, 6, "Address: ", ln=True)
-    pdf.multi_cell(0, 6, address)
-    pdf.ln(1)
-    
-    # Invoice number
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(0, 10, f"Invoice Number: {invoice_number}", ln=True)
-    pdf.ln(5)
-    
-    # Table header
-    pdf.set_fill_color(200, 220, 255)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(10, 10, "S.No", border=1, align='C', fill=True)
-    pdf.cell(70, 10, "Product Name", border=1, align='C', fill=True)
-    pdf.cell(20, 10, "HSN/SAC", border=1, align='C', fill=True)
-    pdf.cell(20, 10, "Qty", border=1, align='C', fill=True)
-    pdf.cell(25, 10, "Rate (INR)", border=1, align='C', fill=True)
-    pdf.cell(25, 10, "Discount (%)", border=1, align='C', fill=True)
-    pdf.cell(25, 10, "Amount (INR)", border=1, align='C', fill=True)
-    pdf.ln()
-
-    # Table rows
-    pdf.set_font('Arial', '', 10)
-    sales_data = []
-    tax_rate = 0.18  # 18% GST
-    
-    # Calculate subtotal with product discounts
-    subtotal = 0
-    for idx, (product, quantity, prod_discount) in enumerate(zip(selected_products, quantities, product_discounts)):
-        product_data = Products[Products['Product Name'] == product].iloc[0]
-        
-        if discount_category in product_data:
-            unit_price = float(product_data[discount_category])
-        else:
-            unit_price = float(product_data['Price'])
-        
-        # Apply product discount
-        discounted_unit_price = unit_price * (1 - prod_discount/100)
-        item_total = discounted_unit_price * quantity
-        subtotal += item_total
-        
-        pdf.cell(10, 8, str(idx + 1), border=1)
-        pdf.cell(70, 8, product, border=1)
-        pdf.cell(20, 8, "3304", border=1, align='C')
-        pdf.cell(20, 8, str(quantity), border=1, align='C')
-        pdf.cell(25, 8, f"{unit_price:.2f}", border=1, align='R')
-        pdf.cell(25, 8, f"{prod_discount:.2f}%", border=1, align='R')
-        pdf.cell(25, 8, f"{item_total:.2f}", border=1, align='R')
-        pdf.ln()
-
-    # Calculate taxes
-    tax_amount = subtotal * tax_rate
-    cgst_amount = tax_amount / 2
-    sgst_amount = tax_amount / 2
-    grand_total = subtotal + tax_amount
-
-    # Display totals
-    pdf.ln(10)
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(160, 10, "Subtotal", border=0, align='R')
-    pdf.cell(30, 10, f"{subtotal:.2f}", border=1, align='R')
-    pdf.ln()
+    # Every line priced in one pass (the preview's result when sales_page passes it in)
+    if pricing is None:
+        pricing = price_invoice(REFERENCE.prices, selected_products, quantities, product_discounts, discount_category)
+
+    # Only the invoice's own content is laid out; the header and logo come from the process's template
+    document = InvoiceDocument(
+        invoice_number, current_date, transaction_type, employee_name, customer_name, gst_number,
+        contact_number, address, list(selected_products), list(quantities), list(product_discounts),
+        payment_status, amount_paid, distributor_firm_name, distributor_id, distributor_contact_person,
+        distributor_contact_number, distributor_territory
+    )
+    pdf = render_invoice(document, pricing)
     
-    pdf.cell(160, 10, "Taxable Amount", border=0, align='R')
-    pdf.cell(30, 10, f"{subtotal:.2f}", border=1, align='R')
-    pdf.ln()
-    
-    pdf.cell(160, 10, "CGST (9%)", border=0, align='R')
-    pdf.cell(30, 10, f"{cgst_amount:.2f}", border=1, align='R')
-    pdf.ln()
-    
-    pdf.cell(160, 10, "SGST (9%)", border=0, align='R')
-    pdf.cell(30, 10, f"{sgst_amount:.2f}", border=1, align='R')
-    pdf.ln()
-    
-    pdf.cell(160, 10, "Grand Total", border=0, align='R')
-    pdf.cell(30, 10, f"{grand_total:.2f} INR", border=1, align='R', fill=True)
-    pdf.ln(10)
-    
-    # Payment Status
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, f"Payment Status: {payment_status.upper()}", ln=True)
-    if payment_status == "paid":
-        pdf.cell(0, 10, f"Amount Paid: {amount_paid} INR", ln=True)
-    pdf.ln(10)
-    
-    # Details
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Details:", ln=True)
-    pdf.set_font("Arial", '', 10)
-    pdf.multi_cell(0, 5, bank_details)
-    
-    # Prepare sales data for logging
-    for idx, (product, quantity, prod_discount) in enumerate(zip(selected_products, quantities, product_discounts)):
-        product_data = Products[Products['Product Name'] == product].iloc[0]
-        
-        if discount_category in product_data:
-            unit_price = float(product_data[discount_category])
-        else:
-            unit_price = float(product_data['Price'])
-            
-        # Apply product discount
-        discounted_unit_price = unit_price * (1 - prod_discount/100)
-        item_total = discounted_unit_price * quantity
-        
-        sales_data.append({
-            "Invoice Number": invoice_number,
-            "Invoice Date": current_date,
-            "Employee Name": employee_name,
-            "Employee Code": Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0],
-            "Designation": Person[Person['Employee Name'] == employee_name]['Designation'].values[0],
-            "Discount Category": discount_category,
-            "Transaction Type": transaction_type,
-            "Outlet Name": customer_name,
-            "Outlet Contact": contact_number,
-            "Outlet Address": address,
-            "Outlet State": state,
-            "Outlet City": city,
-            "Distributor Firm Name": distributor_firm_name,
-            "Distributor ID": distributor_id,
-            "Distributor Contact Person": distributor_contact_person,
-            "Distributor Contact Number": distributor_contact_number,
-            "Distributor Email": distributor_email,
-            "Distributor Territory": distributor_territory,
-            "Product ID": product_data['Product ID'],
-            "Product Name": product,
-            "Product Category": product_data['Product Category'],
-            "Quantity": quantity,
-            "Unit Price": unit_price,
-            "Product Discount (%)": prod_discount,
-            "Discounted Unit Price": discounted_unit_price,
-            "Total Price": item_total,
-            "GST Rate": "18%",
-            "CGST Amount": (item_total * tax_rate) / 2,
-            "SGST Amount": (item_total * tax_rate) / 2,
-            "Grand Total": item_total + (item_total * tax_rate),
-            "Payment Status": payment_status,
-            "Amount Paid": amount_paid if payment_status == "paid" else 0,
-            "Payment Receipt Path": payment_receipt_path if payment_status == "paid" else "",
-            "Employee Selfie Path": employee_selfie_path,
-            "Invoice PDF Path": f"invoices/{invoice_number}.pdf",
-            "Remarks": remarks,
-            "Delivery Status": "pending"  # Default status is pending
-        })
+    # Prepare sales data for logging: one row per line, built column-wise from the pricing arrays
+    employee = REFERENCE.employee(employee_name)
+    products = [REFERENCE.product(product) for product in selected_products]
+    sales_data = pd.DataFrame({
+        "Invoice Number": invoice_number,
+        "Invoice Date": current_date,
+        "Employee Name": employee_name,
+        "Employee Code": employee.code,
+        "Designation": employee.designation,
+        "Discount Category": discount_category,
+        "Transaction Type": transaction_type,
+        "Outlet Name": customer_name,
+        "GST Number": gst_number,
+        "Outlet Contact": contact_number,
+        "Outlet Address": address,
+        "Outlet State": state,
+        "Outlet City": city,
+        "Distributor Firm Name": distributor_firm_name,
+        "Distributor ID": distributor_id,
+        "Distributor Contact Person": distributor_contact_person,
+        "Distributor Contact Number": distributor_contact_number,
+        "Distributor Email": distributor_email,
+        "Distributor Territory": distributor_territory,
+        "Product ID": [product.product_id for product in products],
+        "Product Name": list(selected_products),
+        "Product Category": [product.category for product in products],
+        "Quantity": list(quantities),
+        "Unit Price": pricing.unit_price,
+        "Product Discount (%)": list(product_discounts),
+        "Discounted Unit Price": pricing.discounted_unit_price,
+        "Total Price": pricing.line_total,
+        "GST Rate": "18%",
+        "CGST Amount": pricing.cgst,
+        "SGST Amount": pricing.sgst,
+        "Grand Total": pricing.grand_total,
+        "Payment Status": payment_status,
+        "Amount Paid": amount_paid if payment_status == "paid" else 0,
+        "Payment Receipt Path": payment_receipt_path if payment_status == "paid" else "",
+        "Employee Selfie Path": employee_selfie_path,
+        "Invoice PDF Path": f"invoices/{invoice_number}.pdf",
+        "Remarks": remarks,
+        "Delivery Status": "pending"  # Default status is pending
+    })
 
     # Save the PDF
     pdf_path = f"invoices/{invoice_number}.pdf"
     pdf.output(pdf_path)
     
     # Log sales data to Google Sheets
-    sales_df = pd.DataFrame(sales_data)
-    log_sales_to_gsheet(conn, sales_df)
+    log_sales_to_gsheet(conn, sales_data)
 
     return pdf, pdf_path
 
@@ -1483,8 +1283,8 @@ def record_visit(employee_name, outlet_name, outlet_contact, outlet_address, out
     visit_data = {
         "Visit ID": visit_id,
         "Employee Name": employee_name,
-        "Employee Code": Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0],
-        "Designation": Person[Person['Employee Name'] == employee_name]['Designation'].values[0],
+        "Employee Code": REFERENCE.employee(employee_name).code,
+        "Designation": REFERENCE.employee(employee_name).designation,
         "Outlet Name": outlet_name,
         "Outlet Contact": outlet_contact,
         "Outlet Address": outlet_address,
@@ -1508,8 +1308,8 @@ def record_visit(employee_name, outlet_name, outlet_contact, outlet_address, out
 
 def record_attendance(employee_name, status, location_link="", leave_reason=""):
     try:
-        employee_code = Person[Person['Employee Name'] == employee_name]['Employee Code'].values[0]
-        designation = Person[Person['Employee Name'] == employee_name]['Designation'].values[0]
+        employee_code = REFERENCE.employee(employee_name).code
+        designation = REFERENCE.employee(employee_name).designation
         current_date = get_ist_time().strftime("%d-%m-%Y")
         current_datetime = get_ist_time().strftime("%d-%m-%Y %H:%M:%S")
         check_in_time = get_ist_time().strftime("%H:%M:%S")
@@ -1534,6 +1334,7 @@ def record_attendance(employee_name, status, location_link="", leave_reason=""):
         success, error = log_attendance_to_gsheet(conn, attendance_df)
         
         if success:
+            get_attendance_index(conn).record_check_in(attendance_data)
             return attendance_id, None
         else:
             return None, error
@@ -1614,7 +1415,7 @@ def main():
     if not st.session_state.authenticated:
         display_login_header()
         
-        employee_names = Person['Employee Name'].dropna().tolist()
+        employee_names = REFERENCE.employee_names
         
         form_col1, form_col2, form_col3 = st.columns([1, 2, 1])
         
@@ -1708,17 +1509,38 @@ def sales_page():
     tab1, tab2 = st.tabs(["New Sale", "Sales History"])
     
     with tab1:
-        discount_category = Person[Person['Employee Name'] == selected_employee]['Discount Category'].values[0]
+        discount_category = REFERENCE.employee(selected_employee).discount_category
 
         st.subheader("Transaction Details")
         transaction_type = st.selectbox("Transaction Type", ["Sold", "Return", "Add On", "Damage", "Expired"], key="transaction_type")
 
+        with st.expander(f"📋 Price List ({discount_category or 'list price'})"):
+            # Every product priced for this employee's category in one lookup
+            price_list = REFERENCE.prices.quote(discount_category)
+            st.dataframe(
+                price_list,
+                column_config={
+                    "List Price": st.column_config.NumberColumn(format="₹%.2f"),
+                    "Unit Price": st.column_config.NumberColumn(format="₹%.2f")
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+            st.download_button(
+                "Download Price List",
+                price_list.to_csv(index=False),
+                f"price_list_{discount_category or 'list'}.csv",
+                "text/csv",
+                key="download-price-list"
+            )
+        
         st.subheader("Product Details")
-        product_names = Products['Product Name'].tolist()
+        product_names = REFERENCE.product_names
         selected_products = st.multiselect("Select Products", product_names, key="product_selection")
 
         quantities = []
         product_discounts = []
+        pricing = None
 
         if selected_products:
             st.markdown("### Product Prices & Discounts")
@@ -1732,15 +1554,8 @@ def sales_page():
             with price_cols[3]:
                 st.markdown("**Quantity**")
             
-            subtotal = 0
-            for product in selected_products:
-                product_data = Products[Products['Product Name'] == product].iloc[0]
-                
-                if discount_category in product_data:
-                    unit_price = float(product_data[discount_category])
-                else:
-                    unit_price = float(product_data['Price'])
-                
+            unit_prices = REFERENCE.prices.unit_prices(selected_products, discount_category)
+            for product, unit_price in zip(selected_products, unit_prices):
                 cols = st.columns(4)
                 with cols[0]:
                     st.text(product)
@@ -1767,17 +1582,14 @@ def sales_page():
                         label_visibility="collapsed"
                     )
                     quantities.append(qty)
-                
-                item_total = unit_price * (1 - prod_discount/100) * qty
-                subtotal += item_total
             
-            # Final amount calculation
+            # Final amount calculation, reused by generate_invoice for the PDF and the sheet
+            pricing = price_invoice(REFERENCE.prices, selected_products, quantities, product_discounts, discount_category)
             st.markdown("---")
             st.markdown("### Final Amount Calculation")
-            st.markdown(f"Subtotal: ₹{subtotal:.2f}")
-            tax_amount = subtotal * 0.18
-            st.markdown(f"GST (18%): ₹{tax_amount:.2f}")
-            st.markdown(f"**Grand Total: ₹{subtotal + tax_amount:.2f}**")
+            st.markdown(f"Subtotal: ₹{pricing.subtotal:.2f}")
+            st.markdown(f"GST (18%): ₹{pricing.tax_total:.2f}")
+            st.markdown(f"**Grand Total: ₹{pricing.invoice_total:.2f}**")
 
         st.subheader("Payment Details")
         payment_status = st.selectbox("Payment Status", ["pending", "paid"], key="payment_status")
@@ -1797,16 +1609,16 @@ def sales_page():
         distributor_territory = ""
         
         if distributor_option == "Select from list":
-            distributor_names = Distributors['Firm Name'].tolist()
+            distributor_names = REFERENCE.distributor_names
             selected_distributor = st.selectbox("Select Distributor", distributor_names, key="distributor_select")
-            distributor_details = Distributors[Distributors['Firm Name'] == selected_distributor].iloc[0]
+            distributor_details = REFERENCE.distributor(selected_distributor)
             
             distributor_firm_name = selected_distributor
-            distributor_id = distributor_details['Distributor ID']
-            distributor_contact_person = distributor_details['Contact Person']
-            distributor_contact_number = distributor_details['Contact Number']
-            distributor_email = distributor_details['Email ID']
-            distributor_territory = distributor_details['Territory']
+            distributor_id = distributor_details.distributor_id
+            distributor_contact_person = distributor_details.contact_person
+            distributor_contact_number = distributor_details.contact_number
+            distributor_email = distributor_details.email
+            distributor_territory = distributor_details.territory
             
             st.text_input("Distributor ID", value=distributor_id, disabled=True, key="distributor_id_display")
             st.text_input("Contact Person", value=distributor_contact_person, disabled=True, key="distributor_contact_person_display")
@@ -1818,16 +1630,16 @@ def sales_page():
         outlet_option = st.radio("Outlet Selection", ["Enter manually", "Select from list"], key="outlet_option")
         
         if outlet_option == "Select from list":
-            outlet_names = Outlet['Shop Name'].tolist()
+            outlet_names = REFERENCE.outlet_names
             selected_outlet = st.selectbox("Select Outlet", outlet_names, key="outlet_select")
-            outlet_details = Outlet[Outlet['Shop Name'] == selected_outlet].iloc[0]
+            outlet_details = REFERENCE.outlet(selected_outlet)
             
             customer_name = selected_outlet
-            gst_number = outlet_details['GST']
-            contact_number = outlet_details['Contact']
-            address = outlet_details['Address']
-            state = outlet_details['State']
-            city = outlet_details['City']
+            gst_number = outlet_details.gst
+            contact_number = outlet_details.contact
+            address = outlet_details.address
+            state = outlet_details.state
+            city = outlet_details.city
             
             st.text_input("Outlet Contact", value=contact_number, disabled=True, key="outlet_contact_display")
             st.text_input("Outlet Address", value=address, disabled=True, key="outlet_address_display")
@@ -1855,7 +1667,7 @@ def sales_page():
                     payment_receipt_path, invoice_number, transaction_type,
                     distributor_firm_name, distributor_id, distributor_contact_person,
                     distributor_contact_number, distributor_email, distributor_territory,
-                    sales_remarks
+                    sales_remarks, pricing=pricing
                 )
                 
                 with open(pdf_path, "rb") as f:
@@ -1875,48 +1687,6 @@ def sales_page():
     with tab2:
         st.subheader("Your Sales History")
         
-        @st.cache_data(ttl=300)
-        def load_sales_data():
-            try:
-                sales_data = conn.read(worksheet="Sales", ttl=5)
-                sales_data = sales_data.dropna(how='all')
-                
-                # Convert columns to proper types
-                sales_data = sales_data.copy()
-                sales_data['Outlet Name'] = sales_data['Outlet Name'].astype(str)
-                sales_data['Invoice Number'] = sales_data['Invoice Number'].astype(str)
-                
-                # Convert Invoice Date properly
-                try:
-                    sales_data['Invoice Date'] = pd.to_datetime(sales_data['Invoice Date'], dayfirst=True, errors='coerce')
-                except:
-                    # Fallback if date parsing fails
-                    sales_data['Invoice Date'] = pd.to_datetime(sales_data['Invoice Date'], errors='coerce')
-                
-                # Convert numeric columns properly
-                numeric_cols = ['Grand Total', 'Unit Price', 'Total Price', 'Product Discount (%)', 'Quantity']
-                for col in numeric_cols:
-                    if col in sales_data.columns:
-                        sales_data[col] = pd.to_numeric(sales_data[col], errors='coerce')
-                
-                # Filter for current employee
-                employee_code = Person[Person['Employee Name'] == st.session_state.employee_name]['Employee Code'].values[0]
-                filtered_data = sales_data[sales_data['Employee Code'] == employee_code]
-                
-                # Ensure we have valid dates
-                filtered_data = filtered_data[filtered_data['Invoice Date'].notna()]
-                
-                return filtered_data
-            except Exception as e:
-                st.error(f"Error loading sales data: {e}")
-                return pd.DataFrame()
-    
-        sales_data = load_sales_data()
-        
-        if sales_data.empty:
-            st.warning("No sales records found for your account")
-            return
-            
         with st.expander("🔍 Search Filters", expanded=True):
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -1929,42 +1699,72 @@ def sales_page():
             if st.button("Apply Filters", key="search_sales_button"):
                 st.rerun()
         
-        filtered_data = sales_data.copy()
-        
-        # Apply filters
-        if invoice_number_search:
-            filtered_data = filtered_data[
-                filtered_data['Invoice Number'].str.contains(invoice_number_search, case=False, na=False)
-            ]
-        
-        if invoice_date_search:
-            date_str = invoice_date_search.strftime("%d-%m-%Y")
-            filtered_data = filtered_data[
-                filtered_data['Invoice Date'].dt.strftime('%d-%m-%Y') == date_str
-            ]
+        with st.expander("🖨️ Batch Reprint"):
+            col1, col2 = st.columns(2)
+            with col1:
+                reprint_start = st.date_input("From", key="reprint_start")
+            with col2:
+                reprint_end = st.date_input("To", key="reprint_end")
+            
+            if st.button("Reprint Invoices", key="reprint_button"):
+                try:
+                    employee_code = REFERENCE.employee(st.session_state.employee_name).code
+                    sales_rows = read_sales_view(conn, reprint_start, reprint_end)
+                    jobs = invoice_jobs(select_invoices(
+                        sales_rows, start_date=reprint_start, end_date=reprint_end, employee_code=employee_code
+                    ))
+                    if not jobs:
+                        st.warning("No invoices found in this date range")
+                    else:
+                        progress_bar = st.progress(0.0, text=f"Rendering {len(jobs)} invoices...")
+                        archive, failed = render_invoices_zip(
+                            jobs,
+                            progress=lambda done, total: progress_bar.progress(
+                                done / total, text=f"Rendered {done} of {total} invoices"
+                            )
+                        )
+                        st.download_button(
+                            "📥 Download Invoices (ZIP)",
+                            archive,
+                            file_name=f"invoices_{reprint_start:%d-%m-%Y}_{reprint_end:%d-%m-%Y}.zip",
+                            mime="application/zip",
+                            key="reprint_download"
+                        )
+                        if failed:
+                            st.warning(
+                                f"{len(failed)} invoice(s) could not be rendered: "
+                                + ", ".join(invoice_number for invoice_number, _ in failed)
+                            )
+                except Exception as e:
+                    st.error(f"Error reprinting invoices: {e}")
+        
+        def load_invoice_page(page_number):
+            # One pre-aggregated row per invoice, kept current as invoices and statuses are written
+            employee_code = REFERENCE.employee(st.session_state.employee_name).code
+            return get_invoice_summary(conn).page(
+                employee_code,
+                page=page_number,
+                invoice_number=invoice_number_search,
+                invoice_date=invoice_date_search,
+                outlet_name=outlet_name_search
+            )
         
-        if outlet_name_search:
-            filtered_data = filtered_data[
-                filtered_data['Outlet Name'].str.contains(outlet_name_search, case=False, na=False)
-            ]
+        try:
+            invoice_summary, invoice_count = load_invoice_page(st.session_state.get("invoice_page", 1))
+            page_count = max(1, -(-invoice_count // INVOICE_PAGE_SIZE))
+            if st.session_state.get("invoice_page", 1) > page_count:
+                # The filters narrowed the list below the page being shown
+                st.session_state.invoice_page = page_count
+                invoice_summary, invoice_count = load_invoice_page(page_count)
+        except Exception as e:
+            st.error(f"Error loading sales data: {e}")
+            return
         
-        if filtered_data.empty:
+        if invoice_count == 0:
             st.warning("No matching records found")
             return
-            
-        # Calculate correct grand total by invoice
-        invoice_summary = filtered_data.groupby('Invoice Number').agg({
-            'Invoice Date': 'first',
-            'Outlet Name': 'first',
-            'Grand Total': 'sum',
-            'Payment Status': 'first',
-            'Delivery Status': 'first'
-        }).reset_index()
-        
-        # Sort by date descending
-        invoice_summary = invoice_summary.sort_values('Invoice Date', ascending=False)
         
-        st.write(f"📄 Showing {len(invoice_summary)} of your invoices")
+        st.write(f"📄 Showing {len(invoice_summary)} of your {invoice_count} invoices")
         
         # Display the summary table
         st.dataframe(
@@ -1983,6 +1783,9 @@ def sales_page():
             hide_index=True
         )
         
+        if page_count > 1:
+            st.number_input("Page", min_value=1, max_value=page_count, step=1, key="invoice_page")
+        
         selected_invoice = st.selectbox(
             "Select invoice to view details",
             invoice_summary['Invoice Number'],
@@ -1992,8 +1795,9 @@ def sales_page():
         # Delivery Status Section
         st.subheader("Delivery Status Management")
         
-        # Get all products for the selected invoice
-        invoice_details = filtered_data[filtered_data['Invoice Number'] == selected_invoice]
+        # Get all products for the selected invoice, from the partition of its date only
+        selected_date = invoice_summary.loc[invoice_summary['Invoice Number'] == selected_invoice, 'Invoice Date'].iloc[0]
+        invoice_details = invoice_lines(conn, selected_invoice, selected_date)
         
         if not invoice_details.empty:
             # Create a form for delivery status updates
@@ -2016,19 +1820,16 @@ def sales_page():
                 if submitted:
                     with st.spinner("Updating delivery status..."):
                         try:
-                            # Get all sales data
-                            all_sales_data = conn.read(worksheet="Sales", ttl=5)
-                            all_sales_data = all_sales_data.dropna(how='all')
-                            
-                            # Update the status for all rows with this invoice number
-                            mask = all_sales_data['Invoice Number'] == selected_invoice
-                            all_sales_data.loc[mask, 'Delivery Status'] = new_status
-                            
-                            # Write back the updated data
-                            conn.update(worksheet="Sales", data=all_sales_data)
+                            # Update the status cells of this invoice's rows only
+                            success, error = patch_sales_lines(
+                                conn, selected_invoice, {"Delivery Status": new_status}
+                            )
                             
-                            st.success(f"Delivery status updated to '{new_status}' for invoice {selected_invoice}!")
-                            st.rerun()
+                            if success:
+                                st.success(f"Delivery status updated to '{new_status}' for invoice {selected_invoice}!")
+                                st.rerun()
+                            else:
+                                st.error(f"Error updating delivery status: {error}")
                         except Exception as e:
                             st.error(f"Error updating delivery status: {e}")
         
@@ -2134,15 +1935,15 @@ def visit_page():
         outlet_option = st.radio("Outlet Selection", ["Enter manually", "Select from list"], key="visit_outlet_option")
         
         if outlet_option == "Select from list":
-            outlet_names = Outlet['Shop Name'].tolist()
+            outlet_names = REFERENCE.outlet_names
             selected_outlet = st.selectbox("Select Outlet", outlet_names, key="visit_outlet_select")
-            outlet_details = Outlet[Outlet['Shop Name'] == selected_outlet].iloc[0]
+            outlet_details = REFERENCE.outlet(selected_outlet)
             
             outlet_name = selected_outlet
-            outlet_contact = outlet_details['Contact']
-            outlet_address = outlet_details['Address']
-            outlet_state = outlet_details['State']
-            outlet_city = outlet_details['City']
+            outlet_contact = outlet_details.contact
+            outlet_address = outlet_details.address
+            outlet_state = outlet_details.state
+            outlet_city = outlet_details.city
             
             # Show outlet details like distributor details
             st.text_input("Outlet Contact", value=outlet_contact, disabled=True, key="outlet_contact_display")
@@ -2205,10 +2006,13 @@ def visit_page():
             
         if st.button("Search Visits", key="search_visits_button"):
             try:
-                visit_data = conn.read(worksheet="Visits", ttl=5)
+                # Only the monthly Visits partitions overlapping the search date are read
+                visit_data = get_write_queue(conn).with_pending(
+                    "Visits", get_delta_sync(conn, "Visits").read(visit_date_search or None, visit_date_search or None)
+                )
                 visit_data = visit_data.dropna(how="all")
                 
-                employee_code = Person[Person['Employee Name'] == selected_employee]['Employee Code'].values[0]
+                employee_code = REFERENCE.employee(selected_employee).code
                 filtered_data = visit_data[visit_data['Employee Code'] == employee_code]
                 
                 if visit_id_search:
@@ -0,0 +1,210 @@
+# partitions.py
+import calendar
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+# Worksheets split into monthly partitions, and the column that dates each row
+PARTITIONED_WORKSHEETS = {
+    "Sales": "Invoice Date",
+    "Invoices": "Invoice Date",
+    "SalesLines": "Invoice Date",
+    "Visits": "Visit Date",
+    "Attendance": "Date",
+    "LocationHistory": "Date",
+    "LocationTracking": "Date",
+}
+PARTITION_LIST_TTL_SECONDS = 60
+# How often a read that finds no partition for the current month may list the worksheets
+# again, to pick up one another process has just created
+PARTITION_MISS_RELIST_SECONDS = 2
+# The app's clock: sheet dates are IST dates, whatever timezone the server runs in
+APP_TIMEZONE = timezone(timedelta(hours=5, minutes=30), "IST")  # Asia/Kolkata has no DST
+
+
+def ist_today():
+    return datetime.now(APP_TIMEZONE).date()
+
+
+def partition_name(worksheet, year, month):
+    return f"{worksheet}_{year:04d}_{month:02d}"
+
+
+def _month_bounds(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _as_date(value):
+    if value is None:
+        return None
+    return pd.Timestamp(value).date()
+
+
+class PartitionedBackend:
+    """Routes time-partitioned worksheets to monthly sheets such as LocationHistory_2026_10
+
+    Callers keep using the logical name ("Sales"). Appends are split by the month of
+    each row's date column; reads concatenate the partitions, or only those overlapping
+    start_date..end_date when a range is given. The unsuffixed base sheet keeps the
+    history written before partitioning. Rows dated before `cutover` (first day of the
+    first partitioned month) still go there, and date-range reads that start on or after
+    the cutover skip it. Without a cutover the base sheet is always read. Row-addressed
+    calls (read_rows, update_cells, update_range) pass straight through, so they address
+    one physical sheet: the base sheet or a partition named by partitions().
+
+    The partition list is cached per process. It is listed again when it expires, when a
+    read finds no partition for the current month, and before every full replace and
+    version, so partitions made by other processes are not missed by writes or restores.
+    """
+
+    def __init__(self, backend, worksheets=None, cutover=None):
+        self.backend = backend
+        self.worksheets = dict(PARTITIONED_WORKSHEETS if worksheets is None else worksheets)
+        self.cutover = _as_date(cutover)
+        self._lock = threading.Lock()
+        self._months = {}  # worksheet -> set of (year, month) partitions that exist
+        self._listed_at = 0.0
+        self._pattern = re.compile(
+            r"^(%s)_(\d{4})_(\d{2})$" % "|".join(re.escape(name) for name in self.worksheets)
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def logical_name(self, sheet):
+        """Base worksheet name of a partition, or the name itself"""
+        match = self._pattern.match(sheet or "")
+        return match.group(1) if match else sheet
+
+    def _existing_months(self, worksheet, wanted=(), refresh=False):
+        """Months of a worksheet's partitions; relists when stale, forced, or missing a wanted month"""
+        with self._lock:
+            age = time.monotonic() - self._listed_at
+            known = self._months.get(worksheet, set())
+            missing = any(month not in known for month in wanted)
+            if refresh or age >= PARTITION_LIST_TTL_SECONDS or (missing and age >= PARTITION_MISS_RELIST_SECONDS):
+                months = {}
+                for sheet in self.backend.list_worksheets():
+                    match = self._pattern.match(sheet)
+                    if match:
+                        months.setdefault(match.group(1), set()).add((int(match.group(2)), int(match.group(3))))
+                self._months = months
+                self._listed_at = time.monotonic()
+            return sorted(self._months.get(worksheet, ()))
+
+    def partitions(self, worksheet, start_date=None, end_date=None, refresh=False):
+        """Physical sheets holding a worksheet's rows, oldest first, optionally limited to a date range
+
+        refresh lists the spreadsheet's worksheets again rather than trusting the cached list.
+        """
+        if worksheet not in self.worksheets:
+            return [worksheet]
+        start_date, end_date = _as_date(start_date), _as_date(end_date)
+        sheets = []
+        if self.cutover is None or start_date is None or start_date < self.cutover:
+            sheets.append(worksheet)
+        today = ist_today()
+        current, _ = _month_bounds(today.year, today.month)
+        # The current month's partition is the one most likely to have just been created elsewhere
+        wanted = []
+        if (start_date is None or start_date <= today) and (end_date is None or end_date >= current):
+            wanted.append((today.year, today.month))
+        for year, month in self._existing_months(worksheet, wanted, refresh):
+            first, last = _month_bounds(year, month)
+            if (start_date and last < start_date) or (end_date and first > end_date):
+                continue
+            sheets.append(partition_name(worksheet, year, month))
+        return sheets
+
+    def _route(self, worksheet, data):
+        """Split rows into {physical sheet: rows} by the month of their date column"""
+        column = self.worksheets[worksheet]
+        if column in data.columns:
+            dates = pd.to_datetime(data[column], dayfirst=True, errors="coerce")
+        else:
+            dates = pd.Series(pd.NaT, index=data.index)
+        dates = dates.fillna(pd.Timestamp(ist_today()))
+        names = pd.Series(
+            [partition_name(worksheet, d.year, d.month) for d in dates], index=data.index
+        )
+        if self.cutover is not None:
+            names[dates < pd.Timestamp(self.cutover)] = worksheet
+        return {sheet: rows for sheet, rows in data.groupby(names, sort=False)}
+
+    def _note_partition(self, sheet, columns):
+        match = self._pattern.match(sheet)
+        if not match:
+            return
+        key = (int(match.group(2)), int(match.group(3)))
+        with self._lock:
+            known = key in self._months.get(match.group(1), set())
+        if not known:
+            self.backend.ensure_worksheet(sheet, columns)
+            with self._lock:
+                self._months.setdefault(match.group(1), set()).add(key)
+
+    def read(self, worksheet=None, usecols=None, ttl=5, start_date=None, end_date=None, **options):
+        if worksheet not in self.worksheets:
+            return self.backend.read(worksheet=worksheet, usecols=usecols, ttl=ttl, **options)
+        frames = [
+            self.backend.read(worksheet=sheet, usecols=usecols, ttl=ttl, **options)
+            for sheet in self.partitions(worksheet, start_date, end_date)
+        ]
+        non_empty = [frame for frame in frames if not frame.empty]
+        if not non_empty:
+            return frames[0] if frames else pd.DataFrame()
+        if len(non_empty) == 1:
+            return non_empty[0]
+        return pd.concat(non_empty, ignore_index=True)
+
+    def append(self, worksheet=None, data=None, **options):
+        if worksheet not in self.worksheets:
+            return self.backend.append(worksheet=worksheet, data=data, **options)
+        for sheet, rows in self._route(worksheet, data).items():
+            self._note_partition(sheet, list(data.columns))
+            self.backend.append(worksheet=sheet, data=rows, **options)
+        return data
+
+    def revision(self, worksheet=None):
+        """Change hint of a worksheet; for a partitioned one, the (sheet, revision) of every partition"""
+        if worksheet not in self.worksheets:
+            return self.backend.revision(worksheet)
+        return tuple((sheet, self.backend.revision(sheet)) for sheet in self.partitions(worksheet))
+
+    def version(self, worksheet):
+        """Conflict token of a worksheet; for a partitioned one, the (sheet, version) of every partition"""
+        if worksheet not in self.worksheets:
+            return self.backend.version(worksheet)
+        return tuple((sheet, self.backend.version(sheet)) for sheet in self.partitions(worksheet, refresh=True))
+
+    def read_versioned(self, worksheet, **options):
+        if worksheet not in self.worksheets:
+            return self.backend.read_versioned(worksheet, **options)
+        version = self.version(worksheet)
+        return self.read(worksheet=worksheet, ttl=0, **options), version
+
+    def update(self, worksheet=None, data=None, expected_version=None, **options):
+        if worksheet not in self.worksheets:
+            return self.backend.update(worksheet=worksheet, data=data, expected_version=expected_version, **options)
+        routed = self._route(worksheet, data)
+        # A full replace of the logical sheet also empties partitions that received no rows
+        existing = self.partitions(worksheet, refresh=True)
+        sheets = list(dict.fromkeys(existing + list(routed)))
+        expected = dict(expected_version) if expected_version is not None else {}
+        if expected_version is not None and set(existing) - set(expected):
+            # Imported here: storage builds on this module
+            from storage import ConflictError
+            raise ConflictError(f"{worksheet} gained a partition since it was read")
+        # Check every partition before writing any, so a conflict leaves the sheets untouched
+        for sheet in sheets:
+            if sheet in expected:
+                self.backend.check_version(sheet, expected[sheet])
+        for sheet in sheets:
+            self._note_partition(sheet, list(data.columns))
+            self.backend.update(
+                worksheet=sheet, data=routed.get(sheet, data.iloc[0:0]), expected_version=expected.get(sheet), **options
+            )
+        return data
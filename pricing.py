@@ -0,0 +1,135 @@
+# pricing.py
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+GST_RATE = 0.18  # split evenly into CGST and SGST
+LIST_PRICE = "Price"
+
+# Per-line arrays (unit_price ... grand_total, aligned with the products passed in) and invoice totals
+InvoicePricing = namedtuple(
+    "InvoicePricing",
+    ["unit_price", "discounted_unit_price", "line_total", "cgst", "sgst", "grand_total",
+     "subtotal", "tax_total", "invoice_total"],
+)
+
+
+def _floats(values):
+    try:
+        return np.asarray(values, dtype="float64")
+    except (TypeError, ValueError):
+        # Values read back from the sheet may hold blanks or pd.NA
+        return pd.to_numeric(pd.Series(list(values), dtype=object), errors="coerce").to_numpy(
+            dtype="float64", na_value=np.nan
+        )
+
+
+def _labels(products, column):
+    if column not in products.columns:
+        return [""] * len(products)
+    values = products[column]
+    return values.astype(object).where(values.notna(), "").astype(str).tolist()
+
+
+class PriceMatrix:
+    """Unit price of every product in every discount category, as one products x categories float64 array
+
+    Compiled once from the Products sheet (Invoice - Products.csv): column 0 is the list
+    price, and a blank or unreadable category price is filled with the list price at
+    compile time, as is any category the matrix does not know at lookup time, so
+    pricing never branches. Rows are found by product name or product ID in O(1), and
+    quote() prices every product (or a given list) for a category in one indexing step.
+    """
+
+    def __init__(self, product_ids, names, product_categories, prices, categories):
+        self.product_ids = list(product_ids)
+        self.names = list(names)
+        self.product_categories = list(product_categories)
+        self.categories = [LIST_PRICE] + list(categories)
+        self.prices = prices
+        self._rows = {}
+        self._rows_by_id = {}
+        for row, (product_id, name) in enumerate(zip(self.product_ids, self.names)):
+            self._rows.setdefault(name, row)
+            self._rows_by_id.setdefault(product_id, row)
+        self._columns = {category: column for column, category in enumerate(self.categories)}
+
+    @classmethod
+    def from_frame(cls, products, categories):
+        """Compile a Products DataFrame (list price plus one price column per category)"""
+        prices = np.empty((len(products), len(categories) + 1), dtype="float64")
+        list_price = _floats(products[LIST_PRICE]) if LIST_PRICE in products.columns else np.zeros(len(products))
+        prices[:, 0] = np.nan_to_num(list_price, nan=0.0)
+        for column, category in enumerate(categories, start=1):
+            if category in products.columns:
+                category_price = _floats(products[category])
+                prices[:, column] = np.where(np.isnan(category_price), prices[:, 0], category_price)
+            else:
+                prices[:, column] = prices[:, 0]
+        return cls(
+            _labels(products, "Product ID"), _labels(products, "Product Name"), _labels(products, "Product Category"),
+            prices, categories,
+        )
+
+    def rows(self, product_names):
+        return np.fromiter((self._rows[name] for name in product_names), dtype=np.intp, count=len(product_names))
+
+    def rows_by_id(self, product_ids):
+        return np.fromiter(
+            (self._rows_by_id[str(product_id)] for product_id in product_ids), dtype=np.intp, count=len(product_ids)
+        )
+
+    def column(self, discount_category):
+        return self._columns.get(discount_category, 0)
+
+    def unit_prices(self, product_names, discount_category):
+        return self.prices[self.rows(product_names), self.column(discount_category)]
+
+    def unit_prices_by_id(self, product_ids, discount_category):
+        return self.prices[self.rows_by_id(product_ids), self.column(discount_category)]
+
+    def category_prices(self, discount_category):
+        """Every product's unit price for a category, aligned with names (a view, no copy)"""
+        return self.prices[:, self.column(discount_category)]
+
+    def quote(self, discount_category, product_names=None):
+        """Price list for a category: every product, or the named ones, in one vectorised lookup"""
+        if product_names is None:
+            return pd.DataFrame({
+                "Product ID": self.product_ids,
+                "Product Name": self.names,
+                "Product Category": self.product_categories,
+                "List Price": self.prices[:, 0],
+                "Unit Price": self.category_prices(discount_category),
+            })
+        rows = self.rows(list(product_names))
+        return pd.DataFrame({
+            "Product ID": [self.product_ids[row] for row in rows],
+            "Product Name": [self.names[row] for row in rows],
+            "Product Category": [self.product_categories[row] for row in rows],
+            "List Price": self.prices[rows, 0],
+            "Unit Price": self.prices[rows, self.column(discount_category)],
+        })
+
+    def price_list(self):
+        """The whole matrix as a DataFrame, one price column per category"""
+        frame = pd.DataFrame(self.prices, columns=self.categories)
+        frame.insert(0, "Product Name", self.names)
+        frame.insert(0, "Product ID", self.product_ids)
+        return frame
+
+
+def price_invoice(matrix, product_names, quantities, discounts, discount_category, tax_rate=GST_RATE):
+    """Price an invoice's lines in one vectorised pass; returns InvoicePricing"""
+    unit_price = matrix.unit_prices(list(product_names), discount_category)
+    discounted_unit_price = unit_price * (1 - _floats(discounts) / 100)
+    line_total = discounted_unit_price * _floats(quantities)
+    line_tax = line_total * tax_rate
+    # Summed left to right (cumsum, not the pairwise sum()), so totals round as the old per-line loop did
+    subtotal = float(np.cumsum(line_total)[-1]) if len(line_total) else 0.0
+    tax_total = subtotal * tax_rate
+    return InvoicePricing(
+        unit_price, discounted_unit_price, line_total, line_tax / 2, line_tax / 2, line_total + line_tax,
+        subtotal, tax_total, subtotal + tax_total,
+    )
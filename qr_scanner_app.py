@@ -3,13 +3,13 @@ from PIL import Image
 from pyzbar.pyzbar import decode
 import pandas as pd
 from datetime import datetime
-from streamlit_gsheets import GSheetsConnection
+from storage import append_rows, get_connection
 
 st.set_page_config(page_title="QR/Barcode Scanner", layout="centered")
 st.title("📷 QR/Barcode Scanner & Logger")
 
-# 1) Initialize Google Sheets connection
-conn = st.connection("gsheets", type=GSheetsConnection)
+# 1) Initialize the storage connection
+conn = get_connection()
 worksheet = st.secrets["connections"]["gsheets"]["worksheet"]  # set in ~/.streamlit/secrets.toml
 
 # 2) Use camera to capture code
@@ -38,7 +38,7 @@ if img_file:
 
         # 4) Append to Google Sheet
         try:
-            conn.write(df, sheet=worksheet, include_index=False)
+            append_rows(conn, worksheet, df)
             st.success("✅ Logged to Google Sheet")
         except Exception as e:
             st.error(f"Failed to write to sheet: {e}")
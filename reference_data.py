@@ -0,0 +1,282 @@
+# reference_data.py
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+import streamlit as st
+
+from pricing import PriceMatrix
+
+PRODUCTS_CSV = "Invoice - Products.csv"
+OUTLET_CSV = "Invoice - Outlet.csv"
+PERSON_CSV = "Invoice - Person.csv"
+DISTRIBUTORS_CSV = "Invoice - Distributors.csv"
+
+# Price columns in the Products sheet, one per employee discount category
+DISCOUNT_CATEGORIES = ["E1", "D1", "S1", "S2"]
+
+Employee = namedtuple("Employee", ["name", "code", "designation", "discount_category", "department"])
+Outlet = namedtuple("Outlet", ["name", "address", "contact", "state", "city", "gst"])
+Distributor = namedtuple(
+    "Distributor",
+    ["distributor_id", "firm_name", "discount_category", "territory", "state",
+     "email", "contact_person", "contact_number", "address"],
+)
+
+
+# Prices live in the registry's PriceMatrix, which reads unparseable cells as blanks
+Product = namedtuple("Product", ["product_id", "name", "category"])
+
+
+def _value(row, column, default=""):
+    value = row.get(column, default)
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return default
+    return value
+
+
+def _index(records, key):
+    """Build a key -> record dict, keeping the first record for duplicate keys"""
+    index = {}
+    for record in records:
+        index.setdefault(getattr(record, key), record)
+    return index
+
+
+class ReferenceRegistry:
+    """Person, Products, Outlet and Distributors data indexed once for O(1) lookups"""
+
+    def __init__(self, products, outlets, persons, distributors):
+        # The raw DataFrames stay available for widgets that list every option
+        self.products = products
+        self.outlets = outlets
+        self.persons = persons
+        self.distributors = distributors
+
+        employees = [
+            Employee(
+                _value(row, "Employee Name"),
+                _value(row, "Employee Code"),
+                _value(row, "Designation"),
+                _value(row, "Discount Category"),
+                _value(row, "Department"),
+            )
+            for row in persons.to_dict("records")
+        ]
+        product_records = [
+            Product(_value(row, "Product ID"), _value(row, "Product Name"), _value(row, "Product Category"))
+            for row in products.to_dict("records")
+        ]
+        outlet_records = [
+            Outlet(
+                _value(row, "Shop Name"),
+                _value(row, "Address"),
+                _value(row, "Contact"),
+                _value(row, "State"),
+                _value(row, "City"),
+                _value(row, "GST"),
+            )
+            for row in outlets.to_dict("records")
+        ]
+        distributor_records = [
+            Distributor(
+                _value(row, "Distributor ID"),
+                _value(row, "Firm Name"),
+                _value(row, "Discount Category"),
+                _value(row, "Territory"),
+                _value(row, "State"),
+                _value(row, "Email ID"),
+                _value(row, "Contact Person"),
+                _value(row, "Contact Number"),
+                _value(row, "Address"),
+            )
+            for row in distributors.to_dict("records")
+        ]
+
+        self._employees_by_name = _index(employees, "name")
+        self._employees_by_code = _index(employees, "code")
+        self._products_by_name = _index(product_records, "name")
+        self._products_by_id = _index(product_records, "product_id")
+        # Every product's price in every discount category, for vectorised invoice pricing
+        self.prices = PriceMatrix.from_frame(products, DISCOUNT_CATEGORIES)
+        self._outlets_by_name = _index(outlet_records, "name")
+        self._distributors_by_name = _index(distributor_records, "firm_name")
+        self._distributors_by_id = _index(distributor_records, "distributor_id")
+
+        self.employee_names = [e.name for e in employees if e.name]
+        self.product_names = [p.name for p in product_records if p.name]
+        self.outlet_names = [o.name for o in outlet_records if o.name]
+        self.distributor_names = [d.firm_name for d in distributor_records if d.firm_name]
+
+    def employee(self, name):
+        return self._employees_by_name[name]
+
+    def find_employee(self, name):
+        """Like employee(), but returns None for unknown names"""
+        return self._employees_by_name.get(name)
+
+    def employee_by_code(self, code):
+        return self._employees_by_code[code]
+
+    def product(self, name):
+        return self._products_by_name[name]
+
+    def product_by_id(self, product_id):
+        return self._products_by_id[product_id]
+
+    def outlet(self, name):
+        return self._outlets_by_name[name]
+
+    def distributor(self, firm_name):
+        return self._distributors_by_name[firm_name]
+
+    def distributor_by_id(self, distributor_id):
+        return self._distributors_by_id[distributor_id]
+
+
+def build_registry_from_csv():
+    """Read the four Invoice CSVs and index them"""
+    return ReferenceRegistry(
+        pd.read_csv(PRODUCTS_CSV),
+        pd.read_csv(OUTLET_CSV),
+        pd.read_csv(PERSON_CSV),
+        pd.read_csv(DISTRIBUTORS_CSV),
+    )
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CsvReferenceLoader:
+    """Keeps an immutable registry snapshot and swaps it only when a CSV's content changes
+
+    Each get() is an os.stat() per file. The content hash is only computed when the
+    mtime or size moves, so touching a file without editing it does not trigger a reload.
+    """
+
+    def __init__(self, paths=(PRODUCTS_CSV, OUTLET_CSV, PERSON_CSV, DISTRIBUTORS_CSV)):
+        self.paths = list(paths)
+        self._lock = threading.Lock()
+        self._stats = {}    # path -> (mtime_ns, size)
+        self._digests = {}  # path -> sha256 of the content
+        self._frames = {}   # path -> DataFrame of the last loaded content
+        self.snapshot = None
+        self.reloads = 0
+
+    def _changed_paths(self):
+        changed = []
+        for path in self.paths:
+            st_result = os.stat(path)
+            signature = (st_result.st_mtime_ns, st_result.st_size)
+            if self._stats.get(path) != signature:
+                changed.append((path, signature))
+        return changed
+
+    def get(self):
+        """Return the current snapshot, reloading first if any CSV content changed"""
+        if self.snapshot is not None and not self._changed_paths():
+            return self.snapshot
+
+        with self._lock:
+            changed = self._changed_paths()
+            content_changed = False
+            for path, signature in changed:
+                digest = _file_digest(path)
+                if self._digests.get(path) != digest:
+                    self._frames[path] = pd.read_csv(path)
+                    self._digests[path] = digest
+                    content_changed = True
+                self._stats[path] = signature
+
+            if content_changed or self.snapshot is None:
+                self.snapshot = ReferenceRegistry(*(self._frames[path] for path in self.paths))
+                self.reloads += 1
+            return self.snapshot
+
+
+class SheetReferenceLoader:
+    """Sheet-backed variant: reloads when the storage revision and then the content hash change
+
+    Revision checks cost a round-trip on Google Sheets, so they run at most once per
+    check_interval seconds; all sessions share the result. A check or reload that fails
+    keeps the last snapshot serving until the next interval.
+    """
+
+    def __init__(self, conn, load_frames, worksheets=("Products", "Outlet", "Person", "Distributors"),
+                 check_interval=10):
+        self.conn = conn
+        self.load_frames = load_frames
+        self.worksheets = list(worksheets)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._revision = None
+        self._digest = None
+        self._checked_at = 0.0
+        self.snapshot = None
+        self.reloads = 0
+        self.last_error = None
+
+    def _current_revision(self):
+        return tuple(self.conn.revision(worksheet) for worksheet in self.worksheets)
+
+    def get(self):
+        """Return the current snapshot, reloading first if the sheets changed"""
+        if self.snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self.snapshot
+
+        with self._lock:
+            if self.snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self.snapshot
+            if self.snapshot is None:
+                # The first load skips the revision round-trip, so snapshot-backed frames paint at once;
+                # the revision is then taken on the next check
+                self._reload(None)
+            else:
+                try:
+                    revision = self._current_revision()
+                    if revision != self._revision:
+                        self._reload(revision)
+                    self.last_error = None
+                except Exception as e:
+                    # Sheets unreachable (or its breaker open): keep serving what we have
+                    self.last_error = str(e)
+            self._checked_at = time.monotonic()
+            return self.snapshot
+
+    def _reload(self, revision):
+        frames = self.load_frames()
+        digest = hashlib.sha256(
+            b"".join(pd.util.hash_pandas_object(df, index=False).values.tobytes() for df in frames)
+        ).hexdigest()
+        if digest != self._digest or self.snapshot is None:
+            self.snapshot = ReferenceRegistry(*frames)
+            self._digest = digest
+            self.reloads += 1
+        # A failed load comes back empty; leave the revision unset so the next check retries
+        if not any(df.empty for df in frames):
+            self._revision = revision
+
+    def invalidate(self):
+        """Reload on the next get(), e.g. after a background refresh of the underlying frames"""
+        with self._lock:
+            self._revision = None
+            self._checked_at = 0.0
+
+
+@st.cache_resource
+def get_reference_loader():
+    """CSV reference loader shared by every session in this process"""
+    return CsvReferenceLoader()
+
+
+def load_reference_data():
+    """Return the current reference registry snapshot"""
+    return get_reference_loader().get()
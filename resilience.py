@@ -0,0 +1,299 @@
+# resilience.py
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY_SECONDS = 0.2
+RETRY_MAX_DELAY_SECONDS = 2.0
+# Retries may add at most this fraction of extra calls, plus a small floor per second
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MIN_PER_SECOND = 1.0
+# Attempts at a read-then-write whose version check keeps losing to another writer
+CONFLICT_MAX_ATTEMPTS = 3
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# HTTP statuses that mean an outage or throttling; a 429 also means the request was refused before it ran
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+REJECTED_STATUSES = {429}
+# Calls that change nothing, or that check before they change, so running them twice is harmless
+RETRY_SAFE_METHODS = {
+    "read", "read_rows", "read_versioned", "check_version", "list_worksheets", "revision", "version", "ensure_worksheet",
+}
+
+
+class CircuitOpenError(Exception):
+    """The worksheet's circuit breaker is open; the call was not attempted"""
+
+
+def _status(error):
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_transient(error):
+    """Whether an error looks like an outage or throttling, rather than a request the sheet will never accept"""
+    status = _status(error)
+    if status is not None:
+        return status in TRANSIENT_STATUSES
+    return isinstance(error, (OSError, requests.exceptions.RequestException, sqlite3.OperationalError))
+
+
+def is_rejected(error):
+    """Whether a transient error certainly happened before the call took effect, so a write can be retried"""
+    if _status(error) in REJECTED_STATUSES:
+        return True
+    if isinstance(error, (requests.exceptions.ConnectTimeout, ConnectionRefusedError)):
+        return True
+    # SQLite rolls the whole transaction back when it cannot take the lock
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+def decorrelated_jitter(previous, base=RETRY_BASE_DELAY_SECONDS, cap=RETRY_MAX_DELAY_SECONDS):
+    """Next backoff delay: random between base and three times the previous delay, capped"""
+    return min(cap, random.uniform(base, max(base, previous * 3)))
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_seconds
+
+    While open every call is rejected at once. Half-open lets a single probe through:
+    its success closes the breaker, its failure opens it for another reset_seconds.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0, "probes": 0}
+
+    def allow(self):
+        """Whether a call may go ahead now; in half-open state only one caller gets True"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._probing):
+                if self.state == HALF_OPEN:
+                    self._probing = True
+                    self.stats["probes"] += 1
+                self.stats["calls"] += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats["opened"] += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = dict(self.stats)
+            snapshot["state"] = self.state
+            snapshot["consecutive_failures"] = self._failures
+            snapshot["open_for_seconds"] = time.monotonic() - self._opened_at if self.state != CLOSED else None
+        return snapshot
+
+
+class RetryBudget:
+    """Token bucket that caps retries to a fraction of recent calls, so a brownout is not amplified"""
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, min_per_second=RETRY_BUDGET_MIN_PER_SECOND, max_tokens=10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._tokens = max_tokens
+        self._updated_at = time.monotonic()
+        self.stats = {"retries": 0, "exhausted": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+    def deposit(self):
+        """Credit one first attempt"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend one retry; False when the budget is used up"""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                self.stats["exhausted"] += 1
+                return False
+            self._tokens -= 1
+            self.stats["retries"] += 1
+            return True
+
+
+class ResilientBackend:
+    """Wraps a storage backend with a circuit breaker per worksheet and budgeted, jittered retries
+
+    Only transient errors (see is_transient) are retried and count toward the breaker.
+    Reads and other calls in RETRY_SAFE_METHODS retry on any of them. Writes retry only
+    when the error shows the write never ran (is_rejected), because a timed-out append
+    may have landed and would be duplicated. Anything else, such as a version conflict,
+    a 4xx answer or a KeyError, means the sheet answered or the call was wrong, so it
+    counts as a success for the breaker and is raised at once. Calls without a worksheet
+    (list_worksheets, a spreadsheet-wide revision) share one breaker.
+
+    Version conflicts (conflict_errors) are counted; retry_conflicts reruns a whole
+    read-then-write with backoff for callers that can safely start over.
+    """
+
+    def __init__(self, backend, non_retryable=(), max_attempts=RETRY_MAX_ATTEMPTS,
+                 failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS,
+                 conflict_errors=()):
+        self.backend = backend
+        self.non_retryable = tuple(non_retryable)
+        self.conflict_errors = tuple(conflict_errors)
+        self.max_attempts = max_attempts
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.budget = RetryBudget()
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self.conflicts = {"versioned_writes": 0, "conflicts": 0, "retries": 0, "exhausted": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.conflicts[name] += 1
+
+    def breaker(self, worksheet):
+        name = worksheet or "*"
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.reset_seconds)
+            return breaker
+
+    def _call(self, target, method, *args, **kwargs):
+        breaker = self.breaker(target)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{target or 'spreadsheet'} is unavailable, retrying in the background")
+        self.budget.deposit()
+        if kwargs.get("expected_version") is not None:
+            self._count("versioned_writes")
+        delay = RETRY_BASE_DELAY_SECONDS
+        attempt = 1
+        while True:
+            try:
+                result = getattr(self.backend, method)(*args, **kwargs)
+            except self.non_retryable as e:
+                breaker.record_success()
+                if isinstance(e, self.conflict_errors):
+                    self._count("conflicts")
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.record_success()
+                    raise
+                retryable = method in RETRY_SAFE_METHODS or is_rejected(e)
+                # A half-open probe gets exactly one attempt
+                if (not retryable or attempt >= self.max_attempts or breaker.state != CLOSED
+                        or not self.budget.withdraw()):
+                    breaker.record_failure()
+                    raise
+                delay = decorrelated_jitter(delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            breaker.record_success()
+            return result
+
+    def retry_conflicts(self, attempt_write, max_attempts=CONFLICT_MAX_ATTEMPTS):
+        """Run attempt_write(), starting it over with jittered backoff while it raises a version conflict
+
+        attempt_write must read the version it writes against itself, so each attempt sees the
+        other writer's change.
+        """
+        delay = RETRY_BASE_DELAY_SECONDS
+        attempt = 1
+        while True:
+            try:
+                return attempt_write()
+            except self.conflict_errors:
+                if attempt >= max_attempts:
+                    self._count("exhausted")
+                    raise
+                self._count("retries")
+                delay = decorrelated_jitter(delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def read(self, worksheet=None, **options):
+        return self._call(worksheet, "read", worksheet=worksheet, **options)
+
+    def read_rows(self, worksheet, start=0):
+        return self._call(worksheet, "read_rows", worksheet, start=start)
+
+    def read_versioned(self, worksheet, **options):
+        return self._call(worksheet, "read_versioned", worksheet, **options)
+
+    def check_version(self, worksheet, expected_version):
+        return self._call(worksheet, "check_version", worksheet, expected_version)
+
+    def update(self, worksheet=None, data=None, **options):
+        return self._call(worksheet, "update", worksheet=worksheet, data=data, **options)
+
+    def append(self, worksheet=None, data=None, **options):
+        return self._call(worksheet, "append", worksheet=worksheet, data=data, **options)
+
+    def update_cells(self, worksheet, row, values, match=None):
+        return self._call(worksheet, "update_cells", worksheet, row, values, match=match)
+
+    def update_range(self, worksheet, start, stop, values, match=None):
+        return self._call(worksheet, "update_range", worksheet, start, stop, values, match=match)
+
+    def ensure_worksheet(self, worksheet, columns):
+        return self._call(worksheet, "ensure_worksheet", worksheet, columns)
+
+    def list_worksheets(self):
+        return self._call(None, "list_worksheets")
+
+    def revision(self, worksheet=None):
+        return self._call(worksheet, "revision", worksheet)
+
+    def version(self, worksheet):
+        return self._call(worksheet, "version", worksheet)
+
+    def circuit_stats(self):
+        """Breaker state and counters per worksheet, retry budget usage and version conflicts, for monitoring"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+            conflicts = dict(self.conflicts)
+        return {
+            "breakers": {breaker.name: breaker.snapshot() for breaker in breakers},
+            "open": sorted(breaker.name for breaker in breakers if breaker.state != CLOSED),
+            "retry_budget": dict(self.budget.stats),
+            "conflicts": conflicts,
+        }
@@ -0,0 +1,115 @@
+# sales_tables.py
+import pandas as pd
+
+from delta_sync import get_delta_sync
+from invoice_summary import get_invoice_summary
+from schemas import apply_schema, concat_frames
+from sheet_index import get_invoice_index, patch_invoice
+from write_queue import get_write_queue
+
+INVOICES_SHEET = "Invoices"
+SALES_LINES_SHEET = "SalesLines"
+# Rows written before the split stay in the denormalised sheet and are still read
+LEGACY_SALES_SHEET = "Sales"
+
+# One row per invoice: everything that used to repeat on each of its lines
+INVOICE_COLUMNS = [
+    "Invoice Number", "Invoice Date", "Employee Name", "Employee Code", "Designation", "Discount Category",
+    "Transaction Type", "Outlet Name", "GST Number", "Outlet Contact", "Outlet Address", "Outlet State",
+    "Outlet City", "Distributor Firm Name", "Distributor ID", "Distributor Contact Person",
+    "Distributor Contact Number", "Distributor Email", "Distributor Territory", "Overall Discount (%)",
+    "Amount Discount (INR)", "Payment Status", "Amount Paid", "Payment Receipt Path", "Employee Selfie Path",
+    "Invoice PDF Path", "Remarks", "Invoice Total", "Line Count",
+]
+# One row per product; Invoice Date is kept so lines partition by month with their invoice
+SALES_LINE_COLUMNS = [
+    "Invoice Number", "Invoice Date", "Product ID", "Product Name", "Product Category", "Quantity",
+    "Unit Price", "Product Discount (%)", "Discounted Unit Price", "Total Price", "GST Rate",
+    "CGST Amount", "SGST Amount", "Grand Total", "Delivery Status",
+]
+# The denormalised layout every Sales reader expects
+SALES_VIEW_COLUMNS = [
+    "Invoice Number", "Invoice Date", "Employee Name", "Employee Code", "Designation", "Discount Category",
+    "Transaction Type", "Outlet Name", "GST Number", "Outlet Contact", "Outlet Address", "Outlet State",
+    "Outlet City", "Distributor Firm Name", "Distributor ID", "Distributor Contact Person",
+    "Distributor Contact Number", "Distributor Email", "Distributor Territory", "Product ID", "Product Name",
+    "Product Category", "Quantity", "Unit Price", "Product Discount (%)", "Discounted Unit Price", "Total Price",
+    "GST Rate", "CGST Amount", "SGST Amount", "Grand Total", "Overall Discount (%)", "Amount Discount (INR)",
+    "Payment Status", "Amount Paid", "Payment Receipt Path", "Employee Selfie Path", "Invoice PDF Path",
+    "Remarks", "Delivery Status",
+]
+
+
+def split_sales(sales_data):
+    """Split denormalised Sales rows into (invoice headers, line items)"""
+    lines = sales_data.reindex(columns=SALES_LINE_COLUMNS)
+    grouped = sales_data.groupby("Invoice Number", sort=False)
+    headers = grouped.first().reset_index().reindex(columns=INVOICE_COLUMNS)
+    totals = grouped["Grand Total"].agg(lambda values: pd.to_numeric(values, errors="coerce").sum())
+    headers["Invoice Total"] = headers["Invoice Number"].map(totals).to_numpy()
+    headers["Line Count"] = headers["Invoice Number"].map(grouped.size()).to_numpy()
+    return headers, lines
+
+
+def join_sales(headers, lines):
+    """Compatibility view: line items joined to their invoice header, in the Sales sheet layout"""
+    if lines.empty:
+        return pd.DataFrame(columns=SALES_VIEW_COLUMNS)
+    header_fields = headers.reindex(columns=INVOICE_COLUMNS).drop(columns=["Invoice Date", "Invoice Total", "Line Count"])
+    header_fields = header_fields.drop_duplicates(subset=["Invoice Number"], keep="last")
+    # Lines whose header is still on its way keep blank header fields rather than disappearing
+    view = lines.merge(header_fields, on="Invoice Number", how="left", sort=False)
+    return view.reindex(columns=SALES_VIEW_COLUMNS)
+
+
+def log_invoice(conn, sales_data):
+    """Queue an invoice as one header row plus its line items, and index the lines"""
+    headers, lines = split_sales(sales_data)
+    # Created before enqueueing: a new index ingests the queue's backlog, which would count these lines twice
+    index = get_invoice_index(conn, SALES_LINES_SHEET)
+    queue = get_write_queue(conn)
+    queue.enqueue(INVOICES_SHEET, headers, columns=INVOICE_COLUMNS)
+    queue.enqueue(SALES_LINES_SHEET, lines, columns=SALES_LINE_COLUMNS)
+    index.ingest(lines)
+    get_invoice_summary(conn).record(headers, lines)
+    return headers, lines
+
+
+def read_sales_view(conn, start_date=None, end_date=None):
+    """Sales rows in the old layout, from the header and line tables plus the legacy Sales sheet
+
+    Only partitions overlapping the dates are read, and queued rows are included.
+    """
+    queue = get_write_queue(conn)
+
+    def synced(worksheet):
+        return queue.with_pending(worksheet, get_delta_sync(conn, worksheet).read(start_date, end_date))
+
+    legacy = synced(LEGACY_SALES_SHEET)
+    view = join_sales(synced(INVOICES_SHEET), synced(SALES_LINES_SHEET))
+    frames = [frame.reindex(columns=SALES_VIEW_COLUMNS) for frame in (legacy, view) if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=SALES_VIEW_COLUMNS)
+    return apply_schema(LEGACY_SALES_SHEET, concat_frames(frames, ignore_index=True))
+
+
+def invoice_lines(conn, invoice_number, invoice_date):
+    """One invoice's rows in the Sales layout, reading only the partition of its date"""
+    view = read_sales_view(conn, invoice_date, invoice_date)
+    if view.empty:
+        return view
+    return view[view["Invoice Number"].astype(str) == str(invoice_number)].reset_index(drop=True)
+
+
+def patch_sales_lines(conn, invoice_number, values, product_name=None):
+    """Write line-level fields (such as Delivery Status) into whichever table holds the invoice"""
+    worksheet = SALES_LINES_SHEET
+    if not get_invoice_index(conn, SALES_LINES_SHEET).rows(invoice_number, product_name):
+        worksheet = LEGACY_SALES_SHEET
+    success, error = patch_invoice(
+        conn, get_invoice_index(conn, worksheet), get_write_queue(conn),
+        invoice_number, values, product_name=product_name, worksheet=worksheet,
+    )
+    if success and "Delivery Status" in values:
+        get_invoice_summary(conn).set_delivery_status(invoice_number, values["Delivery Status"], product_name)
+    return success, error
@@ -0,0 +1,215 @@
+# schemas.py
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+SHEET_DATE_FORMAT = "%d-%m-%Y"
+
+# numeric: coerced to numbers; dates: column -> strftime format; categorical: repeated strings
+# stored as pandas categories; compact: count column -> "Int32" when every value is whole (money
+# stays float64: float32 keeps only ~7 digits); fill_numeric / fill_text: value for gaps (None keeps NaN)
+WorksheetSchema = namedtuple(
+    "WorksheetSchema", ["numeric", "dates", "categorical", "compact", "fill_numeric", "fill_text"]
+)
+
+_MONEY = [
+    "Unit Price", "Product Discount (%)", "Discounted Unit Price", "Total Price", "CGST Amount", "SGST Amount",
+    "Grand Total", "Overall Discount (%)", "Amount Discount (INR)", "Amount Paid",
+]
+
+
+_LINE_MONEY = [
+    "Unit Price", "Product Discount (%)", "Discounted Unit Price", "Total Price", "CGST Amount", "SGST Amount",
+    "Grand Total",
+]
+
+
+def _schema(numeric=(), dates=(), categorical=(), compact=None, fill_numeric=None, fill_text=""):
+    return WorksheetSchema(
+        list(numeric), {column: SHEET_DATE_FORMAT for column in dates}, list(categorical), dict(compact or {}),
+        fill_numeric, fill_text,
+    )
+
+
+_EMPLOYEE = ["Employee Name", "Employee Code", "Designation"]
+_OUTLET_PLACE = ["Outlet State", "Outlet City"]
+
+SCHEMAS = {
+    # Blank category prices stay NaN so pricing falls back to the list price instead of charging 0
+    "Products": _schema(numeric=["Price", "E1", "D1", "S1", "S2"], categorical=["Product Category"]),
+    "Outlet": _schema(categorical=["State", "City"], fill_numeric=0),
+    "Person": _schema(categorical=["Discount Category", "Designation", "Department"], fill_numeric=0),
+    "Distributors": _schema(
+        categorical=["Discount Category", "Point of Sales", "Type", "Territory", "State", "Sales Person"],
+        fill_numeric=0,
+    ),
+    # One row per line item, so every invoice-level string repeats on each line
+    "Sales": _schema(
+        numeric=["Quantity"] + _MONEY,
+        dates=["Invoice Date"],
+        categorical=_EMPLOYEE + _OUTLET_PLACE + [
+            "Discount Category", "Transaction Type", "Outlet Name", "Outlet Contact", "Outlet Address",
+            "Distributor Firm Name", "Distributor ID", "Distributor Contact Person", "Distributor Contact Number",
+            "Distributor Email", "Distributor Territory", "Product ID", "Product Name", "Product Category",
+            "GST Rate", "Payment Status", "Delivery Status",
+        ],
+        compact={"Quantity": "Int32"},
+    ),
+    "Invoices": _schema(
+        numeric=["Overall Discount (%)", "Amount Discount (INR)", "Amount Paid", "Invoice Total", "Line Count"],
+        dates=["Invoice Date"],
+        categorical=_EMPLOYEE + _OUTLET_PLACE + [
+            "Discount Category", "Transaction Type", "Outlet Name", "Distributor Firm Name", "Distributor ID",
+            "Distributor Territory", "Payment Status",
+        ],
+        compact={"Line Count": "Int32"},
+    ),
+    "SalesLines": _schema(
+        numeric=["Quantity"] + _LINE_MONEY,
+        dates=["Invoice Date"],
+        categorical=["Product ID", "Product Name", "Product Category", "GST Rate", "Delivery Status"],
+        compact={"Quantity": "Int32"},
+    ),
+    "Visits": _schema(
+        numeric=["Visit Duration (minutes)"],
+        dates=["Visit Date"],
+        categorical=_EMPLOYEE + _OUTLET_PLACE + ["Visit Purpose", "Visit Status"],
+    ),
+    "Attendance": _schema(
+        numeric=["Duration (hours)"], dates=["Date"], categorical=_EMPLOYEE + ["Status"],
+    ),
+    "Demos": _schema(
+        numeric=["Duration (minutes)"],
+        dates=["Demo Date"],
+        categorical=_EMPLOYEE + _OUTLET_PLACE + ["Outlet Review", "Status"],
+    ),
+    "Tickets": _schema(dates=["Date Raised", "Date Resolved"], categorical=["Category", "Status", "Priority"]),
+    "TravelHotelRequests": _schema(
+        dates=["Check In Date", "Check Out Date", "Booking Date", "Date Requested"],
+        categorical=["Request Type", "Travel Mode", "Status"],
+    ),
+    "LocationHistory": _schema(numeric=["Latitude", "Longitude"], dates=["Date"], categorical=_EMPLOYEE),
+}
+
+
+# Worksheets whose process-wide copies are held typed and compact (see DeltaSync)
+COMPACT_WORKSHEETS = {"Sales", "Invoices", "SalesLines"}
+
+
+def _by_unique(values, convert, missing):
+    """Convert each distinct value once; sheet columns repeat the same dates and prices a lot"""
+    codes, uniques = pd.factorize(values)
+    converted = convert(pd.Series(uniques, dtype=object)).to_numpy()
+    if not len(converted):
+        return pd.Series(missing, index=values.index, dtype=converted.dtype)
+    result = converted[codes]
+    result[codes == -1] = missing
+    return pd.Series(result, index=values.index)
+
+
+def _to_numeric(values):
+    if pd.api.types.is_numeric_dtype(values):
+        return values
+    try:
+        # Clean numeric text converts in one cast; blanks and typos take the coercing path
+        return values.astype("float64")
+    except (TypeError, ValueError):
+        return _by_unique(values, lambda uniques: pd.to_numeric(uniques, errors="coerce").astype("float64"), np.nan)
+
+
+def _parse_dates(values, date_format):
+    def parse(uniques):
+        parsed = pd.to_datetime(uniques, format=date_format, errors="coerce")
+        # Cells typed by hand in another format get a second, slower attempt
+        retry = parsed.isna() & (uniques.astype(str).str.strip() != "")
+        if retry.any():
+            parsed = parsed.mask(retry, pd.to_datetime(uniques.where(retry), dayfirst=True, errors="coerce"))
+        return parsed
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return _by_unique(values, parse, np.datetime64("NaT"))
+
+
+def _narrow(values, dtype):
+    if dtype.startswith("Int") and not (values.dropna() % 1 == 0).all():
+        return values  # a fractional count keeps its float64
+    return values.astype(dtype)
+
+
+def apply_schema(worksheet, df, compact=True, drop_empty=True):
+    """Type a worksheet's DataFrame in one pass: numbers, dates, gap filling, then compact dtypes
+
+    compact=True encodes the categorical columns and narrows numeric ones. Worksheets
+    without a schema only lose their fully empty rows (unless drop_empty is False, for
+    callers that address rows by position). Columns a schema names but the frame lacks
+    are skipped.
+    """
+    if drop_empty:
+        df = df.dropna(how="all")
+    schema = SCHEMAS.get(worksheet)
+    if schema is None:
+        return df.copy()
+    columns = set(df.columns)
+    numeric = [column for column in schema.numeric if column in columns]
+    dates = {column: fmt for column, fmt in schema.dates.items() if column in columns}
+    typed = set(numeric) | set(dates)
+    categories = [column for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+    text = [
+        column for column in df.columns
+        if column not in typed and column not in categories and not pd.api.types.is_numeric_dtype(df[column])
+    ]
+    other_numeric = [column for column in df.columns if column not in typed and column not in text + categories]
+
+    converted = {column: _to_numeric(df[column]) for column in numeric}
+    converted.update({column: _parse_dates(df[column], fmt) for column, fmt in dates.items()})
+    df = df.assign(**converted) if converted else df.copy()
+
+    fill = {}
+    if schema.fill_numeric is not None:
+        fill.update(dict.fromkeys(numeric + other_numeric, schema.fill_numeric))
+    if schema.fill_text is not None:
+        fill.update(dict.fromkeys(text, schema.fill_text))
+    if fill:
+        df = df.fillna(fill)
+
+    if compact:
+        # Columns that are categorical already (an earlier pass) are left as they are
+        encoded = [column for column in schema.categorical if column in text]
+        if encoded:
+            df[encoded] = df[encoded].astype(str).astype("category")
+        narrowed = {
+            column: _narrow(df[column], dtype) for column, dtype in schema.compact.items()
+            if column in columns and str(df[column].dtype) != dtype
+        }
+        if narrowed:
+            df = df.assign(**narrowed)
+    return df
+
+
+def concat_frames(frames, ignore_index=False):
+    """pd.concat that keeps categorical columns categorical when the frames' categories differ"""
+    frames = [frame for frame in frames if len(frame.columns)]
+    if len(frames) < 2:
+        if not frames:
+            return pd.DataFrame()
+        return frames[0].reset_index(drop=True) if ignore_index else frames[0]
+    shared = set(frames[0].columns).intersection(*(frame.columns for frame in frames[1:]))
+    for column in [column for column in frames[0].columns if column in shared]:
+        if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = pd.api.types.union_categoricals([frame[column] for frame in frames]).categories
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    return pd.concat(frames, ignore_index=ignore_index)
+
+
+def memory_report(df):
+    """Deep memory per column, largest first, as a DataFrame with dtype, bytes and share columns"""
+    usage = df.memory_usage(index=True, deep=True)
+    report = pd.DataFrame({
+        "dtype": [str(df[column].dtype) if column in df.columns else "index" for column in usage.index],
+        "bytes": usage.to_numpy(),
+    }, index=usage.index)
+    total = report["bytes"].sum()
+    report["share"] = report["bytes"] / total if total else 0.0
+    return report.sort_values("bytes", ascending=False)
@@ -0,0 +1,221 @@
+# sheet_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_MAX_ENTRIES = 256
+
+
+def _where_mask(df, where):
+    """Rows whose cells equal the given value (or one of the given values), compared as text"""
+    mask = pd.Series(True, index=df.index)
+    for column, value in where.items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        cells = df[column].astype(object).where(df[column].notna(), "").astype(str).str.strip()
+        mask &= cells.isin([str(v).strip() for v in values])
+    return mask
+
+
+def project_frame(df, columns=None, where=None):
+    """Apply a column projection and equality predicates to a DataFrame already in memory"""
+    if where:
+        df = df[_where_mask(df, where)]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.copy()
+
+
+class _Flight:
+    """One in-progress fetch that concurrent readers of the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.error = None
+
+
+class SheetCache:
+    """Process-wide LRU cache of worksheet reads, bounded by entry count and DataFrame bytes
+
+    Every worksheet has a version that writers bump through invalidate(); entries fetched
+    under an older version are never served or stored. Concurrent misses on the same key
+    share a single fetch.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (version, fetched_at, data, nbytes)
+        self._versions = {}            # worksheet -> version
+        self._inflight = {}            # (key, version) -> _Flight
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "invalidations": 0}
+
+    def version(self, worksheet):
+        with self._lock:
+            return self._versions.get(worksheet, 0)
+
+    def _drop(self, key):
+        _, _, _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def invalidate(self, worksheet):
+        """Forget every cached read of a worksheet; called after each write to it"""
+        with self._lock:
+            self._versions[worksheet] = self._versions.get(worksheet, 0) + 1
+            for key in [key for key in self._entries if key[0] == worksheet]:
+                self._drop(key)
+            self._stats["invalidations"] += 1
+
+    def _store(self, key, version, data):
+        nbytes = int(data.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (version, time.monotonic(), data, nbytes)
+        self._bytes += nbytes
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            self._drop(next(iter(self._entries)))
+            self._stats["evictions"] += 1
+
+    def peek(self, key, ttl=None):
+        """Return the cached DataFrame itself (not a copy) if it is current, without fetching"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._versions.get(key[0], 0):
+                return None
+            if ttl is not None and time.monotonic() - entry[1] >= ttl:
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[2]
+
+    def get(self, key, fetch, ttl=None):
+        """Return a copy of the cached DataFrame for key (key[0] is the worksheet), fetching on a miss
+
+        Entries older than ttl seconds count as misses so edits made outside this
+        process still show up; ttl=None keeps them until the next invalidation.
+        """
+        worksheet = key[0]
+        with self._lock:
+            version = self._versions.get(worksheet, 0)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and (ttl is None or time.monotonic() - entry[1] < ttl):
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[2].copy()
+            flight = self._inflight.get((key, version))
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[(key, version)] = flight
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.data.copy()
+
+        try:
+            data = fetch()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            flight.data = data
+            with self._lock:
+                if self._versions.get(worksheet, 0) == version:
+                    self._store(key, version, data)
+            return data.copy()
+        finally:
+            with self._lock:
+                self._inflight.pop((key, version), None)
+            flight.done.set()
+
+    def stats(self):
+        """Hit/miss counters plus current size, for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else None
+        return stats
+
+
+class CachedBackend:
+    """Wraps a storage backend so reads go through a SheetCache and every write invalidates it"""
+
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache or SheetCache()
+        self._listeners = []
+
+    def add_write_listener(self, listener):
+        """Call listener(worksheet, method) after every write, e.g. to drop derived copies"""
+        self._listeners.append(listener)
+
+    def __getattr__(self, name):
+        # read_rows, list_worksheets, revision, row_count, ... go straight to the backend
+        return getattr(self.backend, name)
+
+    def read(self, worksheet=None, usecols=None, ttl=5, columns=None, where=None, **options):
+        narrow = columns is not None or bool(where)
+        if narrow and usecols is None and not options:
+            # A fresh full read of the sheet can answer a narrow query without a fetch
+            full = self.cache.peek((worksheet, None, (), None, None), ttl)
+            needed = list(columns or []) + list(where or {})
+            if full is not None and all(column in full.columns for column in needed):
+                return project_frame(full, columns, where)
+        key = (
+            worksheet,
+            tuple(usecols) if usecols is not None else None,
+            tuple(sorted((name, repr(value)) for name, value in options.items())),
+            tuple(columns) if columns is not None else None,
+            repr(sorted((where or {}).items())) if where else None,
+        )
+        # The inner read must not cache on its own, or invalidation could not reach it
+        if narrow:
+            options.update(columns=columns, where=where)
+        return self.cache.get(
+            key, lambda: self.backend.read(worksheet=worksheet, usecols=usecols, ttl=0, **options), ttl=ttl
+        )
+
+    def read_versioned(self, worksheet, **options):
+        """Versioned reads skip the cache: a cached copy could be older than the version token"""
+        return self.backend.read_versioned(worksheet, **options)
+
+    def _write(self, target, method, *args, **kwargs):
+        try:
+            return getattr(self.backend, method)(*args, **kwargs)
+        finally:
+            self.cache.invalidate(target)
+            # A write to a partition also changes reads of its logical worksheet
+            logical_name = getattr(self.backend, "logical_name", None)
+            if logical_name is not None and logical_name(target) != target:
+                self.cache.invalidate(logical_name(target))
+            for listener in self._listeners:
+                listener(target, method)
+
+    def update(self, worksheet=None, data=None, **options):
+        return self._write(worksheet, "update", worksheet=worksheet, data=data, **options)
+
+    def append(self, worksheet=None, data=None, **options):
+        return self._write(worksheet, "append", worksheet=worksheet, data=data, **options)
+
+    def update_cells(self, worksheet, row, values, match=None):
+        return self._write(worksheet, "update_cells", worksheet, row, values, match=match)
+
+    def update_range(self, worksheet, start, stop, values, match=None):
+        return self._write(worksheet, "update_range", worksheet, start, stop, values, match=match)
+
+    def restore(self, worksheet, when=None):
+        return self._write(worksheet, "restore", worksheet, when)
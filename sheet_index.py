@@ -0,0 +1,328 @@
+# sheet_index.py
+import threading
+from abc import ABC, abstractmethod
+import time
+from datetime import timedelta
+
+import pandas as pd
+import streamlit as st
+
+from partitions import ist_today
+from storage import StaleRowError, storage_setting
+from write_queue import get_write_queue
+
+INDEX_SYNC_INTERVAL_SECONDS = 60
+INDEX_REBUILD_INTERVAL_SECONDS = 900
+# Incremental syncs only poll partitions overlapping this many recent days
+INDEX_SYNC_LOOKBACK_DAYS = 31
+
+# Fields kept per indexed attendance record
+ATTENDANCE_INDEX_FIELDS = [
+    "Attendance ID", "Employee Name", "Status", "Check-in Time",
+    "Check-out Time", "Check-out Location Link", "Duration (hours)",
+]
+
+
+def _text(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    return str(value).strip()
+
+
+def _row_ranges(rows):
+    """Collapse sorted row positions into (start, stop) ranges of consecutive rows"""
+    ranges = []
+    for row in sorted(rows):
+        if ranges and ranges[-1][1] == row:
+            ranges[-1][1] = row + 1
+        else:
+            ranges.append([row, row + 1])
+    return [tuple(r) for r in ranges]
+
+
+class SheetIndex(ABC):
+    """In-memory index over a worksheet, kept current without re-downloading the sheet
+
+    A background thread fetches only rows past the last indexed position every
+    sync_interval seconds, and rebuilds from the whole sheet every rebuild_interval
+    seconds to pick up edits made by other processes. Subclasses decide what a record
+    holds. Rows are located by (physical sheet, 0-based data row), since a partitioned
+    worksheet spans several sheets; the location is None while a row is still queued.
+    """
+
+    def __init__(self, conn, worksheet, sync_interval=INDEX_SYNC_INTERVAL_SECONDS,
+                 rebuild_interval=INDEX_REBUILD_INTERVAL_SECONDS):
+        self.conn = conn
+        self.worksheet = worksheet
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()  # one sheet fetch at a time
+        self._records = {}
+        self._row_counts = {}  # physical sheet -> rows indexed so far
+        self._rebuilt_at = 0.0
+        self._stopped = threading.Event()
+        self.last_error = None
+
+        self.rebuild()
+        self._worker = threading.Thread(target=self._run, name=f"{worksheet.lower()}-index", daemon=True)
+        self._worker.start()
+
+    @abstractmethod
+    def _index_values(self, records, values, location):
+        """Add one row's values to records; location is (sheet, row), or None for a queued row"""
+
+    @abstractmethod
+    def _is_queued(self, record):
+        """Whether a record still has rows waiting in the write queue"""
+
+    def _sheets(self, recent=False):
+        partitions = getattr(self.conn, "partitions", None)
+        if partitions is None:
+            return [self.worksheet]
+        if recent:
+            return partitions(self.worksheet, start_date=ist_today() - timedelta(days=INDEX_SYNC_LOOKBACK_DAYS))
+        return partitions(self.worksheet)
+
+    def _index_frame(self, records, sheet, df):
+        for row, values in zip(df.index, df.to_dict("records")):
+            self._index_values(records, values, (sheet, int(row)))
+
+    def sync(self):
+        """Index rows appended to the recent partitions since the last sync"""
+        with self._sync_lock:
+            added = 0
+            for sheet in self._sheets(recent=True):
+                start = self._row_counts.get(sheet, 0)
+                new_rows = self.conn.read_rows(sheet, start=start)
+                if new_rows.empty:
+                    continue
+                with self._lock:
+                    self._index_frame(self._records, sheet, new_rows)
+                    self._row_counts[sheet] = start + len(new_rows)
+                added += len(new_rows)
+            return added
+
+    def rebuild(self):
+        """Re-index the whole worksheet, keeping records that are still queued"""
+        with self._sync_lock:
+            records = {}
+            row_counts = {}
+            for sheet in self._sheets():
+                rows = self.conn.read_rows(sheet, start=0)
+                self._index_frame(records, sheet, rows)
+                row_counts[sheet] = len(rows)
+            with self._lock:
+                for key, record in self._records.items():
+                    if key not in records and self._is_queued(record):
+                        records[key] = record
+                self._records = records
+                self._row_counts = row_counts
+                self._rebuilt_at = time.monotonic()
+
+    def ingest(self, df):
+        """Index rows that are not in the sheet yet, such as the write-behind queue's backlog"""
+        with self._lock:
+            for values in df.to_dict("records"):
+                self._index_values(self._records, values, None)
+
+    def _run(self):
+        while not self._stopped.wait(self.sync_interval):
+            try:
+                if time.monotonic() - self._rebuilt_at >= self.rebuild_interval:
+                    self.rebuild()
+                else:
+                    self.sync()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+
+    def close(self):
+        self._stopped.set()
+
+
+class AttendanceIndex(SheetIndex):
+    """(date, employee code) -> attendance record, so check-in/check-out checks skip the sheet
+
+    Each record carries "sheet" and "row", where the day's row lives.
+    """
+
+    def __init__(self, conn, worksheet="Attendance", **options):
+        super().__init__(conn, worksheet, **options)
+
+    @staticmethod
+    def _key(date, employee_code):
+        return (_text(date), _text(employee_code))
+
+    def _is_queued(self, record):
+        return record["row"] is None
+
+    def _index_values(self, records, values, location):
+        key = self._key(values.get("Date"), values.get("Employee Code"))
+        if not all(key):
+            return
+        record = {field: _text(values.get(field)) for field in ATTENDANCE_INDEX_FIELDS}
+        record["sheet"], record["row"] = location or (None, None)
+        existing = records.get(key)
+        if existing is None:
+            records[key] = record
+        elif existing["Attendance ID"] == record["Attendance ID"]:
+            # A queued check-in has reached the sheet
+            if existing["row"] is None:
+                existing["sheet"], existing["row"] = record["sheet"], record["row"]
+            if record["Check-out Time"]:
+                existing.update({k: v for k, v in record.items() if k not in ("sheet", "row")})
+
+    def lookup(self, date, employee_code):
+        """Return a copy of the indexed record, or None if nobody checked in"""
+        with self._lock:
+            record = self._records.get(self._key(date, employee_code))
+            return dict(record) if record is not None else None
+
+    def confirm(self, date, employee_code, queue=None):
+        """lookup() after re-reading what another process may have changed since the last sync
+
+        A missing record triggers a sync of the recent rows (and of the queue's journal,
+        which every process shares); an open check-in re-reads the sheet from its row, in
+        case it was checked out elsewhere. Use it before accepting a check-in or checkout.
+        """
+        record = self.lookup(date, employee_code)
+        if record is None:
+            self.sync()
+            if queue is not None:
+                self.ingest(queue.pending(self.worksheet))
+        elif record["row"] is not None and not record["Check-out Time"]:
+            rows = self.conn.read_rows(record["sheet"], start=record["row"])
+            with self._lock:
+                self._index_frame(self._records, record["sheet"], rows.iloc[:1])
+        return self.lookup(date, employee_code)
+
+    def record_check_in(self, attendance_data):
+        """Index a check-in written by this process"""
+        with self._lock:
+            self._index_values(self._records, attendance_data, None)
+
+    def record_check_out(self, date, employee_code, values):
+        """Apply checkout fields written by this process"""
+        with self._lock:
+            record = self._records.get(self._key(date, employee_code))
+            if record is not None:
+                record.update({field: _text(value) for field, value in values.items()})
+
+
+class InvoiceIndex(SheetIndex):
+    """Invoice number -> [sheet, row, product name] of each of its lines in the Sales sheet"""
+
+    def __init__(self, conn, worksheet="Sales", **options):
+        super().__init__(conn, worksheet, **options)
+
+    def _is_queued(self, lines):
+        return any(row is None for _, row, _ in lines)
+
+    def _index_values(self, records, values, location):
+        invoice_number = _text(values.get("Invoice Number"))
+        if not invoice_number:
+            return
+        product_name = _text(values.get("Product Name"))
+        sheet, row = location or (None, None)
+        lines = records.setdefault(invoice_number, [])
+        if row is not None:
+            # A queued line has reached the sheet
+            for line in lines:
+                if line[1] is None and line[2] == product_name:
+                    line[0], line[1] = sheet, row
+                    return
+        lines.append([sheet, row, product_name])
+
+    def rows(self, invoice_number, product_name=None):
+        """(sheet, row) of an invoice's lines, None for lines still queued"""
+        with self._lock:
+            return [
+                (sheet, row) if row is not None else None
+                for sheet, row, product in self._records.get(_text(invoice_number), [])
+                if product_name is None or product == _text(product_name)
+            ]
+
+
+def patch_attendance(conn, index, queue, date, employee_code, values, worksheet="Attendance"):
+    """Write fields into the day's attendance row in place; returns (success, error)
+
+    Only the given cells are sent. The row is checked against its Attendance ID before
+    writing, and the index is rebuilt and the write retried once if the row has moved.
+    """
+    for _ in range(2):
+        record = index.lookup(date, employee_code)
+        if record is None:
+            return False, "No check-in record found for today"
+        if record["row"] is None:
+            # The check-in is still queued; push it to the sheet to learn its row
+            queue.flush(worksheet)
+            index.sync()
+            record = index.lookup(date, employee_code)
+            if record is None or record["row"] is None:
+                return False, "Your check-in is still being saved, please try again shortly"
+        try:
+            conn.update_cells(record["sheet"], record["row"], values, match={"Attendance ID": record["Attendance ID"]})
+        except StaleRowError:
+            index.rebuild()
+            continue
+        index.record_check_out(date, employee_code, values)
+        return True, None
+    return False, "The attendance sheet changed while saving, please try again"
+
+
+def patch_invoice(conn, index, queue, invoice_number, values, product_name=None, worksheet="Sales"):
+    """Write fields into an invoice's Sales rows in place; returns (success, error)
+
+    Consecutive rows go out as one range per column, and every row is checked against
+    the invoice number before writing, so updates to different invoices never overlap.
+    """
+    match = {"Invoice Number": invoice_number}
+    if product_name is not None:
+        match["Product Name"] = product_name
+    for _ in range(2):
+        rows = index.rows(invoice_number, product_name)
+        if not rows or None in rows:
+            # Lines may still be queued; push them to the sheet to learn their rows
+            queue.flush(worksheet)
+            index.sync()
+            rows = index.rows(invoice_number, product_name)
+            if not rows:
+                return False, f"No sales rows found for invoice {invoice_number}"
+            if None in rows:
+                return False, "This invoice is still being saved, please try again shortly"
+        by_sheet = {}
+        for sheet, row in rows:
+            by_sheet.setdefault(sheet, []).append(row)
+        try:
+            for sheet, sheet_rows in by_sheet.items():
+                for start, stop in _row_ranges(sheet_rows):
+                    conn.update_range(sheet, start, stop, values, match=match)
+        except StaleRowError:
+            index.rebuild()
+            continue
+        return True, None
+    return False, "The sales sheet changed while saving, please try again"
+
+
+def _index_options():
+    return {
+        "sync_interval": float(storage_setting("index_sync_interval", INDEX_SYNC_INTERVAL_SECONDS)),
+        "rebuild_interval": float(storage_setting("index_rebuild_interval", INDEX_REBUILD_INTERVAL_SECONDS)),
+    }
+
+
+@st.cache_resource
+def get_attendance_index(_conn):
+    """Return the attendance index shared by every session in this process"""
+    index = AttendanceIndex(_conn, **_index_options())
+    index.ingest(get_write_queue(_conn).pending("Attendance"))
+    return index
+
+
+@st.cache_resource
+def get_invoice_index(_conn, worksheet="Sales"):
+    """Return the invoice index of a worksheet (Sales or SalesLines) shared by every session in this process"""
+    index = InvoiceIndex(_conn, worksheet, **_index_options())
+    index.ingest(get_write_queue(_conn).pending(worksheet))
+    return index
@@ -0,0 +1,123 @@
+# snapshots.py
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from schemas import apply_schema
+from storage import storage_setting
+
+SNAPSHOT_DIR = "data/snapshots"
+# A snapshot served at startup is refreshed in the background once it is this old
+SNAPSHOT_REFRESH_SECONDS = 60
+
+
+def _parquet_frame(df):
+    # Parquet needs one type per column; sheet columns mixing numbers and text become text
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].map(lambda value: value if value is None or isinstance(value, str) else str(value))
+    return df
+
+
+class SnapshotStore:
+    """Parquet copy of each worksheet, typed by its schema, served at once and refreshed in the background
+
+    read() returns the last snapshot (memory-mapped) without touching the sheet, and
+    starts one background refresh per worksheet when it is older than refresh_seconds.
+    Only a worksheet with no snapshot yet is read synchronously. Listeners registered
+    with add_refresh_listener hear about every snapshot rewritten from fresh data.
+    """
+
+    def __init__(self, conn, directory=SNAPSHOT_DIR, refresh_seconds=SNAPSHOT_REFRESH_SECONDS):
+        self.conn = conn
+        self.directory = directory
+        self.refresh_seconds = refresh_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._frames = {}      # worksheet -> (file mtime, DataFrame)
+        self._refreshing = set()
+        self._listeners = []
+        self.last_error = None
+
+    def add_refresh_listener(self, listener):
+        self._listeners.append(listener)
+
+    def path(self, worksheet):
+        return os.path.join(self.directory, f"{worksheet}.parquet")
+
+    def _load(self, worksheet):
+        path = self.path(worksheet)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None, None
+        with self._lock:
+            cached = self._frames.get(worksheet)
+        if cached is not None and cached[0] == mtime:
+            return cached
+        df = pd.read_parquet(path, memory_map=True)
+        with self._lock:
+            self._frames[worksheet] = (mtime, df)
+        return mtime, df
+
+    def _save(self, worksheet, df):
+        path = self.path(worksheet)
+        # A unique temp file per writer, so threads and processes sharing the directory never collide
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            _parquet_frame(df).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)  # readers only ever see a complete file
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def fetch(self, worksheet):
+        """Read the worksheet from storage, type it by its schema and rewrite its snapshot"""
+        df = apply_schema(worksheet, self.conn.read(worksheet=worksheet, ttl=0))
+        self._save(worksheet, df)
+        return self._load(worksheet)[1]
+
+    def _refresh(self, worksheet):
+        try:
+            self.fetch(worksheet)
+            self.last_error = None
+        except Exception as e:
+            # The old snapshot keeps being served; the next read tries again
+            self.last_error = f"{worksheet}: {e}"
+            return
+        finally:
+            with self._lock:
+                self._refreshing.discard(worksheet)
+        for listener in self._listeners:
+            listener(worksheet)
+
+    def read(self, worksheet):
+        """Return the worksheet's snapshot, fetching synchronously only if there is none"""
+        mtime, df = self._load(worksheet)
+        if df is None:
+            return self.fetch(worksheet)
+        if time.time() - mtime >= self.refresh_seconds:
+            with self._lock:
+                start = worksheet not in self._refreshing
+                self._refreshing.add(worksheet)
+            if start:
+                threading.Thread(
+                    target=self._refresh, args=(worksheet,), name=f"{worksheet.lower()}-snapshot", daemon=True
+                ).start()
+        return df
+
+
+@st.cache_resource
+def get_snapshot_store(_conn):
+    """Return the snapshot store shared by every session in this process"""
+    return SnapshotStore(
+        _conn,
+        directory=storage_setting("snapshot_dir", SNAPSHOT_DIR),
+        refresh_seconds=float(storage_setting("snapshot_refresh_seconds", SNAPSHOT_REFRESH_SECONDS)),
+    )
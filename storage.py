@@ -0,0 +1,727 @@
+# storage.py
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import date, datetime
+import sqlite3
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import rowcol_to_a1
+from streamlit_gsheets import GSheetsConnection
+
+from partitions import PartitionedBackend
+from schemas import SHEET_DATE_FORMAT
+from resilience import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS, ResilientBackend
+from sheet_cache import CACHE_MAX_BYTES, CACHE_MAX_ENTRIES, CachedBackend, SheetCache, project_frame
+
+# Datetimes with a time of day are written in this format; midnight values as SHEET_DATE_FORMAT
+SHEET_DATETIME_FORMAT = "%d-%m-%Y %H:%M:%S"
+# Rows fetched per request when a narrow Google Sheets read walks a worksheet
+READ_CHUNK_ROWS = 5000
+# Concurrent worksheet loads: threads at once, and seconds to wait for each sheet
+LOAD_MAX_WORKERS = 8
+LOAD_TIMEOUT_SECONDS = 20
+
+# Indexes created on the local SQLite tables, keyed by worksheet name
+SQLITE_INDEXES = {
+    "Sales": [["Invoice Number"], ["Employee Code", "Invoice Date"]],
+    "Invoices": [["Invoice Number"], ["Employee Code", "Invoice Date"]],
+    "SalesLines": [["Invoice Number"]],
+    "Visits": [["Visit ID"], ["Employee Code", "Visit Date"]],
+    "Attendance": [["Attendance ID"], ["Date", "Employee Code"]],
+    "Tickets": [["Ticket ID"], ["Raised By (Employee Name)"]],
+    "TravelHotelRequests": [["Request ID"], ["Employee Name"]],
+    "Demos": [["Demo ID"], ["Employee Code", "Demo Date"]],
+    "LocationHistory": [["Employee Code", "Date"]],
+}
+# Worksheet holding the Google Sheets backend's per-worksheet conflict tokens
+VERSION_SHEET = "_versions"
+# Table name suffix of a monthly partition, which is indexed like its worksheet
+_PARTITION_SUFFIX = re.compile(r"_\d{4}_\d{2}$")
+
+
+class StaleRowError(Exception):
+    """The row at the given position no longer holds the record the caller expected"""
+
+
+class ConflictError(Exception):
+    """The worksheet changed after its version token was read"""
+
+
+def _check_row(worksheet, row, current, match):
+    for column, expected in (match or {}).items():
+        value = current.get(column)
+        if value is None or str(value).strip() != str(expected).strip():
+            raise StaleRowError(f"{worksheet} row {row}: expected {column}={expected!r}, found {value!r}")
+
+
+def _column_range(header, column, first_row, last_row):
+    """A1 range covering one column between two sheet rows"""
+    col = header.index(column) + 1
+    return f"{rowcol_to_a1(first_row, col)}:{rowcol_to_a1(last_row, col)}"
+
+
+def _plain_value(value, missing=""):
+    """Convert a pandas/numpy cell into a plain Python value"""
+    if value is None or value is pd.NaT or (isinstance(value, float) and np.isnan(value)):
+        return missing
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+    elif isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, datetime):
+        if value.time() == datetime.min.time():
+            return value.strftime(SHEET_DATE_FORMAT)
+        return value.strftime(SHEET_DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.strftime(SHEET_DATE_FORMAT)
+    return value
+
+
+def sheet_values(data, missing=""):
+    """Convert a DataFrame into plain row lists that the Sheets API accepts"""
+    return [
+        [_plain_value(value, missing) for value in row]
+        for row in data.itertuples(index=False, name=None)
+    ]
+
+
+def _rows_frame(header, values, start):
+    """Build a DataFrame of raw sheet rows, indexed by their 0-based data row position"""
+    width = len(header)
+    rows = [list(row[:width]) + [None] * (width - len(row)) for row in values]
+    df = pd.DataFrame(rows, columns=header)
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def load_worksheets(read, worksheets, timeout=LOAD_TIMEOUT_SECONDS, max_workers=LOAD_MAX_WORKERS):
+    """Call read(worksheet) for several worksheets at once; returns ({worksheet: data}, {worksheet: error})
+
+    timeout is seconds, or a {worksheet: seconds} dict. A sheet that fails or runs past
+    its timeout is reported in the errors without holding up the others; a timed-out
+    read is left to finish in the background.
+    """
+    timeouts = timeout if isinstance(timeout, dict) else dict.fromkeys(worksheets, timeout)
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(worksheets)) or 1, thread_name_prefix="sheet-load")
+    started = time.monotonic()
+    futures = {worksheet: executor.submit(read, worksheet) for worksheet in worksheets}
+    executor.shutdown(wait=False)
+    frames, errors = {}, {}
+    for worksheet, future in futures.items():
+        limit = timeouts.get(worksheet, LOAD_TIMEOUT_SECONDS)
+        try:
+            frames[worksheet] = future.result(timeout=max(0.0, started + limit - time.monotonic()))
+        except TimeoutError:
+            errors[worksheet] = f"timed out after {limit:g}s"
+        except Exception as e:
+            errors[worksheet] = str(e)
+    return frames, errors
+
+
+def append_rows(conn, worksheet, data, columns=None):
+    """Append only the new rows to a worksheet instead of re-writing the whole sheet"""
+    if columns is not None:
+        data = data.reindex(columns=columns)
+    if data.empty:
+        return data
+    conn.append(worksheet=worksheet, data=data)
+    return data
+
+
+class GSheetsBackend:
+    """Google Sheets storage, backed by the st-gsheets-connection client
+
+    Each worksheet's conflict token is a cell in the VERSION_SHEET worksheet that every
+    write through this backend renews, so checking a version costs one small read
+    rather than a download of the sheet.
+    """
+
+    def __init__(self, connection_name="gsheets"):
+        self._conn = st.connection(connection_name, type=GSheetsConnection)
+        self._headers_lock = threading.Lock()
+        self._header_cache = {}
+        self._version_lock = threading.Lock()
+        self._version_rows = {}  # worksheet -> row of its token in VERSION_SHEET
+
+    def _worksheet(self, worksheet):
+        return self._conn.client._select_worksheet(worksheet=worksheet)
+
+    def read(self, worksheet=None, usecols=None, ttl=5, columns=None, where=None, **options):
+        try:
+            if columns is not None or where:
+                return self._read_projected(worksheet, columns, where)
+            if usecols is not None:
+                options["usecols"] = usecols
+            return self._conn.read(worksheet=worksheet, ttl=ttl, **options)
+        except WorksheetNotFound:
+            # A worksheet nothing has written to yet reads as empty, as a missing table does in SQLite
+            return pd.DataFrame(columns=list(columns or []))
+
+    def _read_projected(self, worksheet, columns, where, chunk_rows=READ_CHUNK_ROWS):
+        """Fetch only the needed columns, in row chunks, filtering each chunk as it arrives"""
+        ws = self._worksheet(worksheet)
+        header = self._header(ws, worksheet)
+        wanted = list(columns) if columns is not None else list(header)
+        needed = wanted + [column for column in (where or {}) if column not in wanted]
+        missing = [column for column in needed if column not in header]
+        if missing:
+            raise KeyError(f"{worksheet} has no column(s) {missing}")
+
+        frames = []
+        first = 2  # row 1 is the header
+        while True:
+            last = first + chunk_rows - 1
+            chunks = ws.batch_get([_column_range(header, column, first, last) for column in needed])
+            height = max((len(cells) for cells in chunks), default=0)
+            if height == 0:
+                break
+            chunk = pd.DataFrame({
+                column: [cells[i][0] if i < len(cells) and cells[i] else None for i in range(height)]
+                for column, cells in zip(needed, chunks)
+            })
+            if where:
+                chunk = project_frame(chunk, where=where)
+            frames.append(chunk[wanted])
+            if height < chunk_rows:
+                break
+            first = last + 1
+        if not frames:
+            return pd.DataFrame(columns=wanted)
+        return pd.concat(frames, ignore_index=True)
+
+    def _version_sheet(self, create=False):
+        try:
+            return self._worksheet(VERSION_SHEET)
+        except WorksheetNotFound:
+            if not create:
+                return None
+        spreadsheet = self._conn.client._open_spreadsheet()
+        try:
+            return spreadsheet.add_worksheet(title=VERSION_SHEET, rows=100, cols=2)
+        except Exception:
+            # Another process created it first
+            return self._worksheet(VERSION_SHEET)
+
+    def version(self, worksheet):
+        """Conflict token of one worksheet: its cell in VERSION_SHEET, renewed by every write to it only"""
+        ws = self._version_sheet()
+        if ws is None:
+            return ""
+        for row in ws.get("A:B"):
+            # The first row naming the worksheet holds its token, should two processes both have added one
+            if row and row[0] == worksheet:
+                return row[1] if len(row) > 1 else ""
+        return ""
+
+    def _renew_version(self, worksheet):
+        """Give a worksheet a fresh token after a write; any reader holding the old one then sees a conflict"""
+        token = uuid.uuid4().hex
+        ws = self._version_sheet(create=True)
+        with self._version_lock:
+            row = self._version_rows.get(worksheet)
+            if row is None:
+                names = [cells[0] if cells else "" for cells in ws.get("A:A")]
+                if worksheet not in names:
+                    ws.append_rows([[worksheet, token]], value_input_option="RAW", table_range="A1")
+                    names = [cells[0] if cells else "" for cells in ws.get("A:A")]
+                row = self._version_rows[worksheet] = names.index(worksheet) + 1
+        ws.update(f"B{row}", [[token]], value_input_option="RAW")
+
+    def read_versioned(self, worksheet, **options):
+        """Return (data, version); the version is taken first, so a write in between shows up as a conflict"""
+        version = self.version(worksheet)
+        return self.read(worksheet=worksheet, ttl=0, **options), version
+
+    def check_version(self, worksheet, expected_version):
+        if self.version(worksheet) != expected_version:
+            raise ConflictError(f"{worksheet} changed since it was read")
+
+    def update(self, worksheet=None, data=None, expected_version=None, **options):
+        """Replace a worksheet; with expected_version, refuse if the worksheet changed since that read
+
+        Sheets has no compare-and-set, so the check narrows the race to one round-trip
+        rather than closing it.
+        """
+        if expected_version is not None:
+            self.check_version(worksheet, expected_version)
+        result = self._conn.update(worksheet=worksheet, data=data, **options)
+        self._renew_version(worksheet)
+        return result
+
+    def append(self, worksheet=None, data=None, **options):
+        """Append rows to a worksheet with a single values.append call
+
+        Values are laid out in the order of the sheet's header row, not the frame's.
+        Columns the header lacks are added to its end first. Returns the data-row position
+        the first appended row landed at, as the sheet reported it (None if it did not).
+        """
+        ws = self._worksheet(worksheet)
+        with self._headers_lock:
+            header = self._header(ws, worksheet)
+            if not header:
+                # An empty sheet needs the header row first, otherwise reads lose the column names
+                header = list(data.columns)
+                values = [header] + sheet_values(data)
+                ws.append_rows(values, value_input_option="USER_ENTERED", insert_data_option="INSERT_ROWS", table_range="A1")
+                self._header_cache[worksheet] = header
+                self._renew_version(worksheet)
+                return 0
+            extra = [column for column in data.columns if column not in header]
+            if extra:
+                first, last = len(header) + 1, len(header) + len(extra)
+                ws.batch_update(
+                    [{"range": f"{rowcol_to_a1(1, first)}:{rowcol_to_a1(1, last)}", "values": [extra]}],
+                    value_input_option="RAW",
+                )
+                header = header + extra
+                self._header_cache[worksheet] = header
+
+        values = sheet_values(data.reindex(columns=header))
+        response = ws.append_rows(
+            values, value_input_option="USER_ENTERED", insert_data_option="INSERT_ROWS", table_range="A1"
+        )
+        # updatedRange is like "'Sales'!A5:AM7"; row 1 is the header
+        match = re.search(r"![A-Z]+(\d+)", ((response or {}).get("updates") or {}).get("updatedRange", ""))
+        self._renew_version(worksheet)
+        return int(match.group(1)) - 2 if match else None
+
+    def _header(self, ws, worksheet):
+        header = self._header_cache.get(worksheet)
+        if not header:
+            header = ws.row_values(1)
+            self._header_cache[worksheet] = header
+        return header
+
+    def read_rows(self, worksheet, start=0):
+        """Fetch only the data rows from position `start` onwards, as raw cell values"""
+        try:
+            ws = self._worksheet(worksheet)
+        except WorksheetNotFound:
+            return pd.DataFrame()
+        header = self._header(ws, worksheet)
+        if not header:
+            return pd.DataFrame()
+        last_column = rowcol_to_a1(1, len(header))[:-1]
+        values = ws.get(f"A{start + 2}:{last_column}")
+        return _rows_frame(header, values, start)
+
+    def update_range(self, worksheet, start, stop, values, match=None):
+        """Set named columns to the same value on data rows start..stop-1, checking their identity first"""
+        ws = self._worksheet(worksheet)
+        header = self._header(ws, worksheet)
+        missing = [column for column in list(values) + list(match or {}) if column not in header]
+        if missing:
+            raise KeyError(f"{worksheet} has no column(s) {missing}")
+        first, last = start + 2, stop + 1  # row 1 is the header
+        if match:
+            ranges = [_column_range(header, column, first, last) for column in match]
+            current = ws.batch_get(ranges)
+            for offset in range(stop - start):
+                found = {
+                    column: (cells[offset][0] if offset < len(cells) and cells[offset] else None)
+                    for column, cells in zip(match, current)
+                }
+                _check_row(worksheet, start + offset, found, match)
+        ws.batch_update(
+            [
+                {"range": _column_range(header, column, first, last), "values": [[_plain_value(value)]] * (stop - start)}
+                for column, value in values.items()
+            ],
+            value_input_option="USER_ENTERED",
+        )
+        self._renew_version(worksheet)
+
+    def update_cells(self, worksheet, row, values, match=None):
+        """Overwrite named cells of one data row (0-based position), optionally checking its identity first"""
+        self.update_range(worksheet, row, row + 1, values, match)
+
+    def list_worksheets(self):
+        spreadsheet = self._conn.client._open_spreadsheet()
+        return [ws.title for ws in spreadsheet.worksheets() if ws.title != VERSION_SHEET]
+
+    def ensure_worksheet(self, worksheet, columns):
+        """Create an empty worksheet if it does not exist yet; append() writes its header"""
+        spreadsheet = self._conn.client._open_spreadsheet()
+        if worksheet not in [ws.title for ws in spreadsheet.worksheets()]:
+            spreadsheet.add_worksheet(title=worksheet, rows=1000, cols=max(len(columns), 26))
+
+    def revision(self, worksheet=None):
+        """Drive modifiedTime of the spreadsheet: a cheap change hint that moves whenever any worksheet is edited
+
+        Only for "did anything change" checks; conflicts are judged by version().
+        """
+        return self._conn.client._open_spreadsheet().get_lastUpdateTime()
+
+
+class SQLiteBackend:
+    """Local SQLite storage (WAL mode) with one indexed table per worksheet"""
+
+    def __init__(self, path="data/app.db"):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._indexed = set()  # tables whose text indexes this process has ensured
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS _sheet_versions (worksheet TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _quote(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _columns(self, db, table):
+        return [row[1] for row in db.execute(f"PRAGMA table_info({self._quote(table)})")]
+
+    @classmethod
+    def _cell_text(cls, column):
+        """A cell as trimmed text: what where filters compare, and what the indexes are built on"""
+        return f"TRIM(COALESCE(CAST({cls._quote(column)} AS TEXT), ''))"
+
+    def _ensure_indexes(self, db, table, columns):
+        # Monthly partitions (Attendance_2025_06) are indexed like their worksheet
+        for index_cols in SQLITE_INDEXES.get(_PARTITION_SUFFIX.sub("", table), []):
+            if all(c in columns for c in index_cols):
+                index_name = self._quote(f"idx_text_{table}_{'_'.join(index_cols)}")
+                cols = ", ".join(self._cell_text(c) for c in index_cols)
+                db.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {self._quote(table)} ({cols})")
+        self._indexed.add(table)
+
+    def _ensure_table(self, db, table, columns):
+        """Create the table (and its indexes) or add any columns it is missing"""
+        existing = self._columns(db, table)
+        if not existing:
+            cols = ", ".join(self._quote(c) for c in columns)
+            db.execute(f"CREATE TABLE IF NOT EXISTS {self._quote(table)} ({cols})")
+            self._ensure_indexes(db, table, columns)
+            return
+        for col in columns:
+            if col not in existing:
+                db.execute(f"ALTER TABLE {self._quote(table)} ADD COLUMN {self._quote(col)}")
+        if table not in self._indexed:
+            # Tables created before the text indexes existed get them on their next write
+            self._ensure_indexes(db, table, existing + [col for col in columns if col not in existing])
+
+    def _bump_version(self, db, table):
+        db.execute(
+            "INSERT INTO _sheet_versions (worksheet, version) VALUES (?, 1) "
+            "ON CONFLICT(worksheet) DO UPDATE SET version = version + 1",
+            (table,),
+        )
+
+    def _insert(self, db, table, data):
+        cols = ", ".join(self._quote(c) for c in data.columns)
+        marks = ", ".join("?" for _ in data.columns)
+        db.executemany(
+            f"INSERT INTO {self._quote(table)} ({cols}) VALUES ({marks})",
+            sheet_values(data, missing=None),
+        )
+
+    def read(self, worksheet=None, usecols=None, ttl=None, columns=None, where=None, **options):
+        """Read a table; `columns` and `where` (column -> value or list of values) run inside SQLite"""
+        db = self._db()
+        table_columns = self._columns(db, worksheet)
+        if not table_columns:
+            return pd.DataFrame()
+        if columns is not None:
+            missing = [column for column in list(columns) + list(where or {}) if column not in table_columns]
+            if missing:
+                raise KeyError(f"{worksheet} has no column(s) {missing}")
+            table_columns = list(columns)
+        elif usecols is not None:
+            table_columns = [table_columns[i] for i in usecols if i < len(table_columns)]
+        select = ", ".join(self._quote(c) for c in table_columns)
+        clauses, params = [], []
+        for column, value in (where or {}).items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            if not values:
+                return pd.DataFrame(columns=table_columns)
+            # Compared as trimmed text, like the Sheets and memory backends, so 5 matches "5";
+            # the indexes are built on the same expression, so the filter is an index lookup
+            clauses.append(f"{self._cell_text(column)} IN ({', '.join('?' * len(values))})")
+            params.extend(str(v).strip() for v in values)
+        query = f"SELECT {select} FROM {self._quote(worksheet)}"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        cursor = db.execute(query + " ORDER BY rowid", params)
+        return pd.DataFrame(cursor.fetchall(), columns=table_columns)
+
+    def read_rows(self, worksheet, start=0):
+        """Fetch only the data rows from position `start` onwards"""
+        db = self._db()
+        columns = self._columns(db, worksheet)
+        if not columns:
+            return pd.DataFrame()
+        select = ", ".join(self._quote(c) for c in columns)
+        cursor = db.execute(
+            f"SELECT {select} FROM {self._quote(worksheet)} ORDER BY rowid LIMIT -1 OFFSET ?", (start,)
+        )
+        return _rows_frame(columns, cursor.fetchall(), start)
+
+    def read_versioned(self, worksheet, **options):
+        """Return (data, version) read in one transaction"""
+        db = self._db()
+        db.execute("BEGIN")
+        try:
+            version = self.version(worksheet)
+            data = self.read(worksheet=worksheet, **options)
+        finally:
+            db.execute("COMMIT")
+        return data, version
+
+    def check_version(self, worksheet, expected_version):
+        if self.version(worksheet) != expected_version:
+            raise ConflictError(f"{worksheet} changed since it was read")
+
+    def update(self, worksheet=None, data=None, expected_version=None, **options):
+        db = self._db()
+        # BEGIN IMMEDIATE takes the write lock up front, so schema changes and inserts are serialised
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if expected_version is not None:
+                # Checked under the write lock, so this is a true compare-and-set
+                self.check_version(worksheet, expected_version)
+            if self._columns(db, worksheet) != list(data.columns):
+                db.execute(f"DROP TABLE IF EXISTS {self._quote(worksheet)}")
+                self._ensure_table(db, worksheet, list(data.columns))
+            else:
+                db.execute(f"DELETE FROM {self._quote(worksheet)}")
+            self._insert(db, worksheet, data)
+            self._bump_version(db, worksheet)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return data
+
+    def append(self, worksheet=None, data=None, **options):
+        """Insert rows; returns the data-row position the first of them landed at"""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            self._ensure_table(db, worksheet, list(data.columns))
+            position = db.execute(f"SELECT COUNT(*) FROM {self._quote(worksheet)}").fetchone()[0]
+            self._insert(db, worksheet, data)
+            self._bump_version(db, worksheet)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return position
+
+    def update_range(self, worksheet, start, stop, values, match=None):
+        """Set named columns to the same value on data rows start..stop-1, checking their identity first"""
+        db = self._db()
+        table = self._quote(worksheet)
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            columns = self._columns(db, worksheet)
+            missing = [column for column in list(values) + list(match or {}) if column not in columns]
+            if missing:
+                raise KeyError(f"{worksheet} has no column(s) {missing}")
+            found = db.execute(
+                f"SELECT rowid, * FROM {table} ORDER BY rowid LIMIT ? OFFSET ?", (stop - start, start)
+            ).fetchall()
+            if len(found) != stop - start:
+                raise StaleRowError(f"{worksheet} has no rows {start}..{stop - 1}")
+            for offset, current in enumerate(found):
+                _check_row(worksheet, start + offset, dict(zip(columns, current[1:])), match)
+            assignments = ", ".join(f"{self._quote(column)} = ?" for column in values)
+            params = [_plain_value(value, None) for value in values.values()]
+            db.executemany(
+                f"UPDATE {table} SET {assignments} WHERE rowid = ?", [params + [current[0]] for current in found]
+            )
+            self._bump_version(db, worksheet)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def update_cells(self, worksheet, row, values, match=None):
+        """Overwrite named cells of one data row (0-based position), optionally checking its identity first"""
+        self.update_range(worksheet, row, row + 1, values, match)
+
+    def ensure_worksheet(self, worksheet, columns):
+        """Tables are created on first write"""
+
+    def list_worksheets(self):
+        rows = self._db().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY name"
+        )
+        return [row[0] for row in rows]
+
+    def revision(self, worksheet=None):
+        """Write counter of a worksheet, bumped in the same transaction as every write"""
+        row = self._db().execute("SELECT version FROM _sheet_versions WHERE worksheet = ?", (worksheet,)).fetchone()
+        return row[0] if row else 0
+
+    def version(self, worksheet):
+        """Conflict token: the worksheet's own write counter"""
+        return self.revision(worksheet)
+
+    def row_count(self, worksheet):
+        db = self._db()
+        if not self._columns(db, worksheet):
+            return 0
+        return db.execute(f"SELECT COUNT(*) FROM {self._quote(worksheet)}").fetchone()[0]
+
+
+class MemoryBackend:
+    """In-process stand-in for the Google Sheets connection, used for benchmarks and offline runs"""
+
+    def __init__(self, sheets=None):
+        self._sheets = {name: df.copy() for name, df in (sheets or {}).items()}
+        self._lock = threading.RLock()
+        self._versions = {}
+        # Cells moved across the (simulated) wire, so both write paths can be compared
+        self.stats = {"cells_read": 0, "cells_written": 0, "reads": 0, "writes": 0}
+
+    def read(self, worksheet=None, usecols=None, ttl=None, columns=None, where=None, **options):
+        with self._lock:
+            df = self._sheets.get(worksheet, pd.DataFrame())
+            if columns is not None or where:
+                df = project_frame(df, columns, where)
+            elif usecols is not None:
+                df = df.iloc[:, list(usecols)].copy()
+            else:
+                df = df.copy()
+            self.stats["reads"] += 1
+            self.stats["cells_read"] += df.size
+        return df
+
+    def read_rows(self, worksheet, start=0):
+        with self._lock:
+            df = self._sheets.get(worksheet, pd.DataFrame()).iloc[start:].copy()
+            self.stats["reads"] += 1
+            self.stats["cells_read"] += df.size
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
+
+    def read_versioned(self, worksheet, **options):
+        with self._lock:
+            return self.read(worksheet=worksheet, **options), self._versions.get(worksheet, 0)
+
+    def check_version(self, worksheet, expected_version):
+        with self._lock:
+            if self._versions.get(worksheet, 0) != expected_version:
+                raise ConflictError(f"{worksheet} changed since it was read")
+
+    def update(self, worksheet=None, data=None, expected_version=None, **options):
+        with self._lock:
+            if expected_version is not None:
+                self.check_version(worksheet, expected_version)
+            self._sheets[worksheet] = data.reset_index(drop=True).copy()
+            self._versions[worksheet] = self._versions.get(worksheet, 0) + 1
+            self.stats["writes"] += 1
+            self.stats["cells_written"] += data.size
+        return data
+
+    def append(self, worksheet=None, data=None, **options):
+        with self._lock:
+            existing = self._sheets.get(worksheet)
+            position = 0 if existing is None else len(existing)
+            if existing is None or existing.empty:
+                self._sheets[worksheet] = data.reset_index(drop=True).copy()
+            else:
+                self._sheets[worksheet] = pd.concat([existing, data], ignore_index=True)
+            self._versions[worksheet] = self._versions.get(worksheet, 0) + 1
+            self.stats["writes"] += 1
+            self.stats["cells_written"] += data.size
+        return position
+
+    def update_range(self, worksheet, start, stop, values, match=None):
+        with self._lock:
+            df = self._sheets.get(worksheet)
+            if df is None or stop > len(df):
+                raise StaleRowError(f"{worksheet} has no rows {start}..{stop - 1}")
+            missing = [column for column in list(values) + list(match or {}) if column not in df.columns]
+            if missing:
+                raise KeyError(f"{worksheet} has no column(s) {missing}")
+            for row in range(start, stop):
+                _check_row(worksheet, row, df.iloc[row].to_dict(), match)
+            for column, value in values.items():
+                if df[column].dtype != object:
+                    df[column] = df[column].astype(object)
+                df.iloc[start:stop, df.columns.get_loc(column)] = value
+            self._versions[worksheet] = self._versions.get(worksheet, 0) + 1
+            self.stats["writes"] += 1
+            self.stats["cells_written"] += len(values) * (stop - start)
+
+    def update_cells(self, worksheet, row, values, match=None):
+        self.update_range(worksheet, row, row + 1, values, match)
+
+    def ensure_worksheet(self, worksheet, columns):
+        with self._lock:
+            self._sheets.setdefault(worksheet, pd.DataFrame(columns=columns))
+
+    def list_worksheets(self):
+        with self._lock:
+            return list(self._sheets)
+
+    def revision(self, worksheet=None):
+        with self._lock:
+            return self._versions.get(worksheet, 0)
+
+    def version(self, worksheet):
+        return self.revision(worksheet)
+
+    def row_count(self, worksheet):
+        with self._lock:
+            return len(self._sheets.get(worksheet, ()))
+
+
+def storage_setting(key, default):
+    """Read a storage setting from the environment or the [storage] secrets section"""
+    value = os.environ.get(f"STORAGE_{key.upper()}")
+    if value:
+        return value
+    try:
+        return st.secrets["storage"][key]
+    except Exception:
+        return default
+
+
+@st.cache_resource
+def get_connection():
+    """Return the storage backend shared by every session in this process"""
+    backend = storage_setting("backend", "gsheets").lower()
+    if backend == "sqlite":
+        conn = SQLiteBackend(storage_setting("sqlite_path", "data/app.db"))
+    elif backend == "memory":
+        conn = MemoryBackend()
+    else:
+        conn = GSheetsBackend()
+    # Conflicts and moved rows are answers from the sheet, not outages
+    conn = ResilientBackend(
+        conn,
+        non_retryable=(ConflictError, StaleRowError),
+        conflict_errors=(ConflictError,),
+        failure_threshold=int(storage_setting("breaker_failure_threshold", BREAKER_FAILURE_THRESHOLD)),
+        reset_seconds=float(storage_setting("breaker_reset_seconds", BREAKER_RESET_SECONDS)),
+    )
+    if str(storage_setting("backups", "on")).lower() not in ("off", "false"):
+        # Imported here: backups builds on this module
+        from backups import BackedUpBackend, get_backup_store
+        conn = BackedUpBackend(conn, get_backup_store())
+    conn = PartitionedBackend(conn, cutover=storage_setting("partition_cutover", None))
+    cache = SheetCache(
+        max_bytes=int(float(storage_setting("cache_max_mb", CACHE_MAX_BYTES / 2**20)) * 2**20),
+        max_entries=int(storage_setting("cache_max_entries", CACHE_MAX_ENTRIES)),
+    )
+    return CachedBackend(conn, cache)
@@ -0,0 +1,325 @@
+# write_queue.py
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from resilience import CircuitOpenError, is_transient
+from storage import append_rows, sheet_values, storage_setting
+
+JOURNAL_PATH = "data/write_journal.db"
+FLUSH_INTERVAL_SECONDS = 5
+FLUSH_MAX_ROWS = 200
+# Failed appends (other than outages) an entry gets before it is set aside as a dead letter
+FLUSH_MAX_ATTEMPTS = 5
+# A claim older than this belongs to a flush that died; its entries are taken over
+CLAIM_TIMEOUT_SECONDS = 300
+
+# Columns added to the pending table after it first shipped
+_JOURNAL_MIGRATIONS = {
+    "claimed_by": "TEXT",
+    "claimed_at": "REAL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "dead": "INTEGER NOT NULL DEFAULT 0",
+    "last_error": "TEXT",
+}
+
+
+class WriteBehindQueue:
+    """Durable write-behind queue: rows are journaled to disk and appended to the sheets in batches
+
+    The journal may be shared by several processes (app.py and main.py). A flush first
+    claims its entries in the journal, so no two processes append the same rows. An
+    entry whose append keeps failing for a reason other than an outage is retried on its
+    own, and after max_attempts failures it becomes a dead letter: kept in the journal
+    but no longer flushed, until revive() puts it back.
+    """
+
+    def __init__(self, conn, journal_path=JOURNAL_PATH, flush_interval=FLUSH_INTERVAL_SECONDS,
+                 max_rows=FLUSH_MAX_ROWS, max_attempts=FLUSH_MAX_ATTEMPTS, claim_timeout=CLAIM_TIMEOUT_SECONDS):
+        self.conn = conn
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_attempts = max_attempts
+        self.claim_timeout = claim_timeout
+
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self._journal = sqlite3.connect(journal_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._journal.execute("PRAGMA journal_mode=WAL")
+        self._journal.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, worksheet TEXT NOT NULL, "
+            "columns TEXT NOT NULL, rows TEXT NOT NULL, row_count INTEGER NOT NULL, enqueued_at REAL NOT NULL)"
+        )
+        existing = {row[1] for row in self._journal.execute("PRAGMA table_info(pending)")}
+        for column, definition in _JOURNAL_MIGRATIONS.items():
+            if column not in existing:
+                try:
+                    self._journal.execute(f"ALTER TABLE pending ADD COLUMN {column} {definition}")
+                except sqlite3.OperationalError:
+                    pass  # another process sharing the journal added it first
+        self._journal_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued_rows": 0,
+            "flushed_rows": 0,
+            "flushes": 0,
+            "failures": 0,
+            "dead_lettered": 0,
+            "last_error": None,
+            "last_flush_seconds": None,
+            "max_flush_seconds": 0.0,
+            "total_flush_seconds": 0.0,
+        }
+
+        self._worker = threading.Thread(target=self._run, name="write-behind-queue", daemon=True)
+        self._worker.start()
+
+    def enqueue(self, worksheet, data, columns=None):
+        """Journal rows for a worksheet and return immediately"""
+        if columns is not None:
+            data = data.reindex(columns=columns)
+        if data.empty:
+            return 0
+        payload = (
+            worksheet,
+            json.dumps(list(data.columns)),
+            json.dumps(sheet_values(data, missing=None), default=str),
+            len(data),
+            time.time(),
+        )
+        with self._journal_lock:
+            self._journal.execute(
+                "INSERT INTO pending (worksheet, columns, rows, row_count, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                payload,
+            )
+        with self._stats_lock:
+            self._stats["enqueued_rows"] += len(data)
+        if self.depth() >= self.max_rows:
+            self._wakeup.set()
+        return len(data)
+
+    def depth(self, worksheet=None):
+        """Number of journaled rows not yet written to the sheet, dead letters aside"""
+        query = "SELECT COALESCE(SUM(row_count), 0) FROM pending WHERE dead = 0"
+        params = ()
+        if worksheet is not None:
+            query += " AND worksheet = ?"
+            params = (worksheet,)
+        with self._journal_lock:
+            return self._journal.execute(query, params).fetchone()[0]
+
+    def _entries(self, worksheet=None):
+        query = "SELECT id, worksheet, columns, rows FROM pending WHERE dead = 0"
+        params = ()
+        if worksheet is not None:
+            query += " AND worksheet = ?"
+            params = (worksheet,)
+        with self._journal_lock:
+            return self._journal.execute(query + " ORDER BY id", params).fetchall()
+
+    def dead_letters(self):
+        """Entries set aside after max_attempts failed appends: id, worksheet, rows, attempts and last error"""
+        with self._journal_lock:
+            rows = self._journal.execute(
+                "SELECT id, worksheet, row_count, attempts, last_error, enqueued_at FROM pending WHERE dead = 1 ORDER BY id"
+            ).fetchall()
+        return pd.DataFrame(rows, columns=["id", "worksheet", "rows", "attempts", "last_error", "enqueued_at"])
+
+    def revive(self, entry_ids=None):
+        """Put dead letters (all, or the given ids) back in the queue with a fresh attempt count"""
+        query = "UPDATE pending SET dead = 0, attempts = 0, claimed_by = NULL WHERE dead = 1"
+        params = []
+        if entry_ids is not None:
+            entry_ids = list(entry_ids)
+            query += f" AND id IN ({', '.join('?' * len(entry_ids))})"
+            params = entry_ids
+        if entry_ids == []:
+            return 0
+        with self._journal_lock:
+            return self._journal.execute(query, params).rowcount
+
+    def _claim(self, worksheet=None):
+        """Mark unclaimed (or abandoned) entries as this flush's in one statement; returns (token, entries)"""
+        token = f"{os.getpid()}:{uuid.uuid4().hex}"
+        now = time.time()
+        query = (
+            "UPDATE pending SET claimed_by = ?, claimed_at = ? "
+            "WHERE dead = 0 AND (claimed_by IS NULL OR claimed_at < ?)"
+        )
+        params = [token, now, now - self.claim_timeout]
+        if worksheet is not None:
+            query += " AND worksheet = ?"
+            params.append(worksheet)
+        with self._journal_lock:
+            self._journal.execute(query, params)
+            entries = self._journal.execute(
+                "SELECT id, worksheet, columns, rows, attempts FROM pending WHERE claimed_by = ? ORDER BY id", (token,)
+            ).fetchall()
+        return token, entries
+
+    def _release(self, token, ids, error, counted):
+        """Hand failed entries back; a counted failure uses up one attempt and may dead-letter them"""
+        marks = ", ".join("?" * len(ids))
+        with self._journal_lock:
+            if counted:
+                self._journal.execute(
+                    "UPDATE pending SET claimed_by = NULL, last_error = ?, attempts = attempts + 1, "
+                    f"dead = (attempts + 1 >= ?) WHERE claimed_by = ? AND id IN ({marks})",
+                    [error, self.max_attempts, token] + ids,
+                )
+                dead = self._journal.execute(
+                    f"SELECT COALESCE(SUM(row_count), 0) FROM pending WHERE dead = 1 AND id IN ({marks})", ids
+                ).fetchone()[0]
+            else:
+                self._journal.execute(
+                    f"UPDATE pending SET claimed_by = NULL, last_error = ? WHERE claimed_by = ? AND id IN ({marks})",
+                    [error, token] + ids,
+                )
+                dead = 0
+        return dead
+
+    def pending(self, worksheet):
+        """Rows for a worksheet that are still waiting in the journal"""
+        frames = [
+            pd.DataFrame(json.loads(rows), columns=json.loads(columns))
+            for _, _, columns, rows in self._entries(worksheet)
+        ]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def read(self, worksheet, **options):
+        """Read a worksheet with this queue's pending rows for it appended, so writers see their own rows"""
+        return self.with_pending(worksheet, self.conn.read(worksheet=worksheet, **options))
+
+    def with_pending(self, worksheet, data):
+        """Append this queue's pending rows for a worksheet to data already read from it"""
+        pending = self.pending(worksheet)
+        if pending.empty:
+            return data
+        if not data.empty:
+            pending = pending.reindex(columns=data.columns)
+        return pd.concat([data, pending], ignore_index=True)
+
+    def flush(self, worksheet=None):
+        """Write every pending row (optionally for one worksheet) as one append per worksheet
+
+        Entries that have failed before are appended one at a time, so a row the sheet
+        rejects does not hold back the rest.
+        """
+        with self._flush_lock:
+            token, entries = self._claim(worksheet)
+            groups = {}
+            for entry in entries:
+                groups.setdefault(entry[1], []).append(entry)
+            batches = []
+            for name, group in groups.items():
+                if any(attempts for *_, attempts in group):
+                    batches.extend((name, [entry]) for entry in group)
+                else:
+                    batches.append((name, group))
+
+            flushed = 0
+            for name, group in batches:
+                ids = [entry[0] for entry in group]
+                start = time.perf_counter()
+                try:
+                    batch = pd.concat(
+                        [pd.DataFrame(json.loads(rows), columns=json.loads(columns)) for _, _, columns, rows, _ in group],
+                        ignore_index=True,
+                    )
+                    append_rows(self.conn, name, batch)
+                except Exception as e:
+                    # Outages are waited out; anything else is the rows' fault and uses up an attempt
+                    counted = not isinstance(e, CircuitOpenError) and not is_transient(e)
+                    dead = self._release(token, ids, f"{type(e).__name__}: {e}", counted)
+                    with self._stats_lock:
+                        self._stats["failures"] += 1
+                        self._stats["dead_lettered"] += dead
+                        self._stats["last_error"] = f"{name}: {e}"
+                    continue
+
+                with self._journal_lock:
+                    self._journal.executemany(
+                        "DELETE FROM pending WHERE id = ? AND claimed_by = ?", [(i, token) for i in ids]
+                    )
+                elapsed = time.perf_counter() - start
+                flushed += len(batch)
+                with self._stats_lock:
+                    self._stats["flushes"] += 1
+                    self._stats["flushed_rows"] += len(batch)
+                    self._stats["last_flush_seconds"] = elapsed
+                    self._stats["max_flush_seconds"] = max(self._stats["max_flush_seconds"], elapsed)
+                    self._stats["total_flush_seconds"] += elapsed
+            return flushed
+
+    def stats(self):
+        """Queue metrics for monitoring: depth, flush latency and failure counts"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["depth"] = self.depth()
+        with self._journal_lock:
+            stats["dead_letters"] = self._journal.execute(
+                "SELECT COALESCE(SUM(row_count), 0) FROM pending WHERE dead = 1"
+            ).fetchone()[0]
+        stats["avg_flush_seconds"] = (
+            stats["total_flush_seconds"] / stats["flushes"] if stats["flushes"] else None
+        )
+        return stats
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats["failures"] += 1
+                    self._stats["last_error"] = str(e)
+
+    def close(self):
+        """Stop the worker after a final flush"""
+        self._stopped.set()
+        self._wakeup.set()
+        self._worker.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+
+@st.cache_resource
+def get_write_queue(_conn):
+    """Return the write-behind queue shared by every session in this process"""
+    queue = WriteBehindQueue(
+        _conn,
+        journal_path=storage_setting("journal_path", JOURNAL_PATH),
+        flush_interval=float(storage_setting("flush_interval", FLUSH_INTERVAL_SECONDS)),
+        max_rows=int(storage_setting("flush_max_rows", FLUSH_MAX_ROWS)),
+        max_attempts=int(storage_setting("flush_max_attempts", FLUSH_MAX_ATTEMPTS)),
+    )
+    atexit.register(queue.close)
+    return queue
+
+
+def append_or_enqueue(conn, worksheet, data, columns=None):
+    """Append rows now, or journal them for the write-behind queue while the sheet's breaker is open
+
+    Returns True if the rows were written, False if they were queued.
+    """
+    try:
+        append_rows(conn, worksheet, data, columns=columns)
+        return True
+    except CircuitOpenError:
+        get_write_queue(conn).enqueue(worksheet, data, columns=columns)
+        return False